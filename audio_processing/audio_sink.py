@@ -0,0 +1,170 @@
+import time
+import wave
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from config import Config
+
+
+class AudioSink(ABC):
+    """
+    Where synthesized speech is played. PCM is written in small blocks, so
+    playback can be cut at the next block boundary.
+    """
+
+    @abstractmethod
+    def open(self, rate: int, channels: int = 1, sample_width: int = 2) -> None:
+        ...
+
+    @abstractmethod
+    def write(self, block: bytes) -> None:
+        ...
+
+    def abort(self) -> None:
+        """Drop whatever is buffered but not played yet."""
+
+    def close(self) -> None:
+        pass
+
+
+class PyAudioSink(AudioSink):
+    """The default output device. The stream stays open while the format doesn't change."""
+
+    def __init__(self, frames_per_buffer: int = 512):
+        self.frames_per_buffer = frames_per_buffer
+        self.pa = None
+        self.stream = None
+        self.format = None
+
+    def open(self, rate: int, channels: int = 1, sample_width: int = 2) -> None:
+        # Imported here so the null sink works on machines without PortAudio
+        import pyaudio
+        if self.stream and self.format == (rate, channels, sample_width):
+            if self.stream.is_stopped():
+                self.stream.start_stream()
+            return
+        self.close()
+        self.pa = pyaudio.PyAudio()
+        self.stream = self.pa.open(
+            format=self.pa.get_format_from_width(sample_width),
+            channels=channels,
+            rate=rate,
+            output=True,
+            frames_per_buffer=self.frames_per_buffer
+        )
+        self.format = (rate, channels, sample_width)
+
+    def write(self, block: bytes) -> None:
+        self.stream.write(block)
+
+    def abort(self) -> None:
+        if self.stream and not self.stream.is_stopped():
+            self.stream.stop_stream()
+
+    def close(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.pa:
+            self.pa.terminate()
+            self.pa = None
+        self.format = None
+
+
+class NullSink(AudioSink):
+    """
+    Discards audio, taking as long as playing it would unless `realtime` is
+    False. For tests and for measuring interrupt latency without a speaker.
+    In realtime mode `gaps` collects the silence before each sentence that
+    followed another without being cut (seconds), and `sentence_starts` when
+    each sentence started playing.
+    """
+
+    def __init__(self, realtime: bool = True):
+        self.realtime = realtime
+        self.bytes_per_second = 0
+        self.played_seconds = 0.0
+        self.playing_until: Optional[float] = None  # When the audio written so far has played
+        self.sentence_start = False
+        self.gaps: List[float] = []
+        self.sentence_starts: List[float] = []
+
+    def open(self, rate: int, channels: int = 1, sample_width: int = 2) -> None:
+        self.bytes_per_second = rate * channels * sample_width
+        self.sentence_start = True
+
+    def _gap(self, now: float) -> float:
+        """Silence between the previous sentence and this one, 0 after an interruption."""
+        if not self.sentence_start or self.playing_until is None:
+            return 0.0
+        self.sentence_start = False
+        gap = max(now - self.playing_until, 0.0)
+        self.gaps.append(gap)
+        return gap
+
+    def write(self, block: bytes) -> None:
+        duration = len(block) / self.bytes_per_second
+        self.played_seconds += duration
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self.sentence_start:
+            self.sentence_starts.append(now)
+        self._gap(now)
+        self.sentence_start = False
+        if self.playing_until is None or self.playing_until < now:
+            self.playing_until = now
+        self.playing_until += duration
+        # Like a device buffer: the write returns once the previous block has played
+        delay = self.playing_until - duration - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def abort(self) -> None:
+        self.playing_until = None
+
+
+class FileSink(NullSink):
+    """
+    Writes what would have been heard to a WAV file in real time, with the
+    gaps between sentences as silence, so the pacing can be listened to.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(realtime=True)
+        self.path = path
+        self.wav = None
+
+    def open(self, rate: int, channels: int = 1, sample_width: int = 2) -> None:
+        if self.wav is None:
+            self.wav = wave.open(self.path, "wb")
+            self.wav.setnchannels(channels)
+            self.wav.setsampwidth(sample_width)
+            self.wav.setframerate(rate)
+        elif (self.wav.getframerate(), self.wav.getnchannels(), self.wav.getsampwidth()) != (rate, channels, sample_width):
+            raise ValueError(f"{self.path} is {self.wav.getframerate()} Hz, can't append {rate} Hz audio")
+        super().open(rate, channels, sample_width)
+
+    def _gap(self, now: float) -> float:
+        gap = super()._gap(now)
+        frame_bytes = self.wav.getnchannels() * self.wav.getsampwidth()
+        self.wav.writeframes(bytes(int(gap * self.wav.getframerate()) * frame_bytes))
+        return gap
+
+    def write(self, block: bytes) -> None:
+        self.wav.writeframes(block)
+        super().write(block)
+
+    def close(self) -> None:
+        if self.wav:
+            self.wav.close()
+            self.wav = None
+
+
+def create_sink(name: str) -> AudioSink:
+    if name == "null":
+        return NullSink()
+    if name == "file":
+        return FileSink(Config.TTS_AUDIO_FILE)
+    if name == "pyaudio":
+        return PyAudioSink()
+    raise ValueError(f"Unknown audio sink {name!r}, expected 'pyaudio', 'file' or 'null'")
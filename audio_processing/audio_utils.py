@@ -0,0 +1,70 @@
+import io
+import wave
+from typing import Optional, Tuple
+import numpy as np
+from utils.log import print_log
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+def pcm16_to_float32(data: bytes) -> np.ndarray:
+    """Little-endian 16-bit PCM bytes to float32 samples in [-1, 1)."""
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def read_wav(path: str) -> Tuple[np.ndarray, int]:
+    """Read a 16-bit WAV file as mono float32 samples."""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        audio = pcm16_to_float32(wf.readframes(wf.getnframes()))
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, rate
+
+
+def resample(audio: np.ndarray, from_rate: int, to_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Band-limited resampling in the frequency domain (one rfft/irfft pair, no
+    Python loop). Fine for the few seconds of speech recorded per turn.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if from_rate == to_rate or audio.size == 0:
+        return audio
+    length = int(round(audio.size * to_rate / from_rate))
+    spectrum = np.fft.rfft(audio)
+    bins = length // 2 + 1
+    if bins <= spectrum.size:
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.pad(spectrum, (0, bins - spectrum.size))
+    resampled = np.fft.irfft(spectrum, n=length) * (length / audio.size)
+    return resampled.astype(np.float32)
+
+
+def _write_wav(target, audio: np.ndarray, rate: int) -> None:
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(target, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm.tobytes())
+
+
+def wav_bytes(audio: np.ndarray, rate: int = WHISPER_SAMPLE_RATE) -> bytes:
+    """Encode float32 samples as an in-memory 16-bit mono WAV file."""
+    buffer = io.BytesIO()
+    _write_wav(buffer, audio, rate)
+    return buffer.getvalue()
+
+
+def dump_wav(path: str, audio: np.ndarray, rate: int = WHISPER_SAMPLE_RATE) -> Optional[str]:
+    """Write float32 samples as a 16-bit mono WAV file, for debugging what was recorded."""
+    try:
+        _write_wav(path, audio, rate)
+        return path
+    except OSError as e:
+        print_log(f"Could not write audio dump {path}: {e}", "red")
+        return None
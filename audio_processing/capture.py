@@ -0,0 +1,213 @@
+import time
+import threading
+from typing import Optional
+import numpy as np
+from config import Config
+from utils.log import print_log
+from .audio_utils import read_wav, resample
+from .ring_buffer import SharedRingBuffer
+
+
+class PyAudioInput:
+    """The default microphone, read in chunks of 16-bit mono samples."""
+
+    def __init__(self, rate: int, chunk: int):
+        self.rate = rate
+        self.chunk = chunk
+        self.pa = None
+        self.stream = None
+
+    def open(self) -> None:
+        # Imported here so the file input works on machines without PortAudio
+        import pyaudio
+        self.pa = pyaudio.PyAudio()
+        self.stream = self.pa.open(
+            rate=self.rate,
+            channels=1,
+            format=pyaudio.paInt16,
+            input=True,
+            frames_per_buffer=self.chunk
+        )
+
+    def read(self) -> Optional[np.ndarray]:
+        return np.frombuffer(self.stream.read(self.chunk, exception_on_overflow=False), dtype=np.int16)
+
+    def close(self) -> None:
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.pa:
+            self.pa.terminate()
+
+
+class FileInput:
+    """
+    Fake input device that plays a 16-bit WAV file, for tests and replays.
+    Chunks are paced in real time unless `realtime` is False; after the file ends
+    it loops, or reports the end of the stream.
+    """
+
+    def __init__(self, path: str, rate: int, chunk: int, realtime: bool = True, loop: bool = False):
+        self.path = path
+        self.rate = rate
+        self.chunk = chunk
+        self.realtime = realtime
+        self.loop = loop
+        self.samples = np.zeros(0, dtype=np.int16)
+        self.position = 0
+        self.next_chunk_at = 0.0
+
+    def open(self) -> None:
+        audio, rate = read_wav(self.path)
+        audio = resample(audio, rate, self.rate)
+        self.samples = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        self.position = 0
+        self.next_chunk_at = time.monotonic()
+
+    def read(self) -> Optional[np.ndarray]:
+        if self.position >= self.samples.size:
+            if not self.loop or self.samples.size == 0:
+                return None
+            self.position = 0
+
+        if self.realtime:
+            delay = self.next_chunk_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_chunk_at += self.chunk / self.rate
+
+        samples = self.samples[self.position:self.position + self.chunk]
+        self.position += self.chunk
+        return samples
+
+    def close(self) -> None:
+        pass
+
+
+def create_input_device(rate: int, chunk: int):
+    """The microphone, or the WAV file in Config.AUDIO_INPUT_FILE when one is set."""
+    if Config.AUDIO_INPUT_FILE:
+        print_log(f"Using {Config.AUDIO_INPUT_FILE} as audio input", "yellow")
+        return FileInput(Config.AUDIO_INPUT_FILE, rate, chunk)
+    return PyAudioInput(rate, chunk)
+
+
+class Subscription:
+    """A consumer's view of the capture stream: its own frame size and read position."""
+
+    def __init__(self, service: "AudioCaptureService", frame_size: int, position: int):
+        self.service = service
+        self.frame_size = frame_size
+        self.position = position
+        self.dropped = 0  # Samples skipped because this consumer fell too far behind
+
+    def read(self, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Return the next frame of int16 samples, waiting up to `timeout` seconds for
+        it. Returns None on timeout or once the input has ended.
+        """
+        ring = self.service.ring
+        while True:
+            frame = ring.read(self.position, self.frame_size)
+            if frame is not None:
+                self.position += self.frame_size
+                return frame
+
+            oldest = ring.oldest()
+            if self.position < oldest:
+                skipped = oldest - self.position
+                self.dropped += skipped
+                self.position += skipped
+                print_log(f"Audio consumer fell behind, skipped {skipped} samples", "red")
+                continue
+
+            if not self.service.wait_for(self.position + self.frame_size, timeout):
+                return None
+
+    def seek(self, position: int) -> None:
+        self.position = max(position, self.service.ring.oldest())
+
+
+class AudioCaptureService:
+    """
+    Owns the input device for the whole session. One thread reads it at a single
+    rate into a shared ring buffer; wake-word detection, the recorder and level
+    meters subscribe with their own frame sizes and positions instead of each
+    opening the device. Because the buffer keeps the last `buffer_seconds`, a
+    consumer can start reading from an earlier position, e.g. the recorder picks
+    up right where the wake word ended.
+    """
+
+    def __init__(self, device, rate: int = 16000, buffer_seconds: float = 20.0):
+        self.device = device
+        self.rate = rate
+        self.ring = SharedRingBuffer(int(rate * buffer_seconds))
+        self.condition = threading.Condition()  # Only used to wake up waiting readers
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.finished = False
+        # (position, time.monotonic()) right after the latest write, to tell when a sample was captured
+        self.last_write = (0, time.monotonic())
+
+    def start(self) -> None:
+        self.device.open()
+        self.running = True
+        self.finished = False
+        self.thread = threading.Thread(target=self._run, name="AudioCapture", daemon=True)
+        self.thread.start()
+        print_log(f"Audio capture started at {self.rate} Hz", "yellow")
+
+    def _run(self) -> None:
+        try:
+            while self.running:
+                samples = self.device.read()
+                if samples is None:
+                    print_log("Audio input ended", "yellow")
+                    break
+                self.ring.write(samples)
+                self.last_write = (self.ring.written, time.monotonic())
+                with self.condition:
+                    self.condition.notify_all()
+        except Exception as e:
+            print_log(f"Audio capture failed: {e}", "red")
+        finally:
+            self.device.close()
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+
+    def stop(self) -> None:
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    @property
+    def position(self) -> int:
+        """Absolute position of the next sample to be captured."""
+        return self.ring.written
+
+    def time_at(self, position: int) -> float:
+        """Approximate time.monotonic() at which the sample at `position` was captured."""
+        written, at = self.last_write
+        return at - (written - position) / self.rate
+
+    def wait_for(self, position: int, timeout: Optional[float] = None) -> bool:
+        """Wait until `position` samples were captured; False on timeout or end of input."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.ring.written >= position or self.finished, timeout)
+            return self.ring.written >= position
+
+    def subscribe(self, frame_size: int, start: Optional[int] = None) -> Subscription:
+        """Read frames of `frame_size` samples from `start` (an earlier position) or from now."""
+        subscription = Subscription(self, frame_size, self.position)
+        if start is not None:
+            subscription.seek(start)
+        return subscription
+
+    def level(self, seconds: float = 0.1) -> float:
+        """RMS level (0 to 1) of the most recent audio, for level meters."""
+        count = min(int(self.rate * seconds), self.ring.written, self.ring.capacity)
+        samples = self.ring.read(self.ring.written - count, count) if count else None
+        if samples is None or samples.size == 0:
+            return 0.0
+        return float(np.sqrt(np.mean((samples.astype(np.float32) / 32768.0) ** 2)))
@@ -0,0 +1,228 @@
+import json
+import time
+import wave
+import argparse
+from abc import ABC, abstractmethod
+from ctypes import c_int, c_short, byref
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from config import Config
+from utils.log import print_log
+from .audio_utils import read_wav, resample
+
+
+class KeywordDetector(ABC):
+    """
+    Wake-word engine interface: frames of `frame_length` int16 samples at
+    `sample_rate` go in, the index of the keyword heard (or -1) comes out.
+    """
+
+    sample_rate: int = 16000
+    frame_length: int = 512
+    keywords: List[str] = []
+
+    @abstractmethod
+    def process(self, frame: np.ndarray) -> int:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+# The pvporcupine release whose private members (`_process_func`, `_handle`,
+# `PicovoiceStatuses`) the fast path was checked against, pinned in requirements.txt
+NATIVE_PROCESS_VERSION = "3.0.4"
+
+
+class PorcupineDetector(KeywordDetector):
+    """
+    Picovoice Porcupine. `Porcupine.process` rebuilds every frame as a ctypes
+    array from Python ints (~100 µs per frame). With the pvporcupine release
+    the fast path was verified against, the frame's NumPy memory is passed to
+    the binding's native process function directly; any other release goes
+    through the public `process`, with the frame converted by `tolist()`.
+    """
+
+    def __init__(self, access_key: str, keyword_paths: Sequence[str]):
+        # Imported here so the stub detector works without the Picovoice SDK
+        import pvporcupine
+        self.porcupine = pvporcupine.create(access_key=access_key, keyword_paths=list(keyword_paths))
+        self.sample_rate = self.porcupine.sample_rate
+        self.frame_length = self.porcupine.frame_length
+        self.keywords = [Path(path).stem for path in keyword_paths]
+        self.frame_type = c_short * self.frame_length
+        self.result = c_int()
+        self.native_process = None
+        self.success = None
+        version = self._installed_version()
+        if version == NATIVE_PROCESS_VERSION:
+            self.native_process = getattr(self.porcupine, "_process_func", None)
+            self.success = getattr(getattr(self.porcupine, "PicovoiceStatuses", None), "SUCCESS", None)
+        else:
+            print_log(f"pvporcupine {version} is not {NATIVE_PROCESS_VERSION}, using its public process()", "orange")
+
+    @staticmethod
+    def _installed_version() -> Optional[str]:
+        try:
+            return metadata.version("pvporcupine")
+        except metadata.PackageNotFoundError:
+            return None
+
+    def process(self, frame: np.ndarray) -> int:
+        if self.native_process is None or self.success is None or frame.size != self.frame_length:
+            return self.porcupine.process(frame.tolist())
+        if frame.dtype != np.int16 or not frame.flags.c_contiguous or not frame.flags.writeable:
+            frame = np.array(frame, dtype=np.int16)
+        status = self.native_process(self.porcupine._handle, self.frame_type.from_buffer(frame), byref(self.result))
+        if status is not self.success:
+            # Let the binding raise its own, descriptive exception
+            return self.porcupine.process(frame.tolist())
+        return self.result.value
+
+    def close(self) -> None:
+        self.porcupine.delete()
+
+
+class StubDetector(KeywordDetector):
+    """
+    Stand-in that needs no access key: "detects" keyword `keyword_index` when a
+    frame is `ratio` times louder than the running background level, at most once
+    per `refractory` seconds. Enough to drive the app and the replay harness
+    without Picovoice.
+    """
+
+    def __init__(
+        self,
+        keywords: Sequence[str] = ("hey-camille",),
+        sample_rate: int = 16000,
+        frame_length: int = 512,
+        keyword_index: int = 0,
+        ratio: float = 8.0,
+        refractory: float = 2.0
+    ):
+        self.keywords = list(keywords)
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.keyword_index = keyword_index
+        self.ratio = ratio
+        self.refractory_frames = int(refractory * sample_rate / frame_length)
+        self.background: Optional[float] = None
+        self.frames_since_detection = self.refractory_frames
+
+    def process(self, frame: np.ndarray) -> int:
+        rms = float(np.sqrt(np.mean(frame.astype(np.float32) ** 2)))
+        self.frames_since_detection += 1
+        if self.background is None:
+            self.background = max(rms, 1.0)
+            return -1
+        if rms > self.background * self.ratio and self.frames_since_detection >= self.refractory_frames:
+            self.frames_since_detection = 0
+            return self.keyword_index
+        self.background = 0.98 * self.background + 0.02 * max(rms, 1.0)
+        return -1
+
+
+def create_detector(keyword_paths: Sequence[str]) -> KeywordDetector:
+    """The wake-word engine selected by Config.WAKE_WORD_ENGINE."""
+    if Config.WAKE_WORD_ENGINE == "stub":
+        print_log("Using the stub wake word detector", "yellow")
+        return StubDetector(keywords=[Path(path).stem for path in keyword_paths])
+    return PorcupineDetector(Config.PICOVOICE_ACCESS_KEY, keyword_paths)
+
+
+def _frames(path: str, detector: KeywordDetector) -> np.ndarray:
+    """The WAV file as a (frames, frame_length) int16 array, a view over the file data when no conversion is needed."""
+    with wave.open(path, "rb") as wf:
+        native = wf.getnchannels() == 1 and wf.getsampwidth() == 2 and wf.getframerate() == detector.sample_rate
+        data = bytearray(wf.readframes(wf.getnframes())) if native else None
+    if native:
+        samples = np.frombuffer(data, dtype=np.int16)
+    else:
+        audio, rate = read_wav(path)
+        samples = (np.clip(resample(audio, rate, detector.sample_rate), -1.0, 1.0) * 32767).astype(np.int16)
+    count = samples.size // detector.frame_length
+    return samples[:count * detector.frame_length].reshape(count, detector.frame_length)
+
+
+def replay(detector: KeywordDetector, path: str, max_delay: float = 1.5, max_early: float = 1.0) -> Dict[str, Any]:
+    """
+    Feed a WAV file through `detector` as fast as it goes and measure it.
+
+    Labels come from a JSON file next to it (`name.json`) holding
+    `{"keywords": [{"index": 0, "end": 3.2}, ...]}`, the times at which each
+    wake phrase ends. A detection of the same keyword from `max_early` seconds
+    before to `max_delay` seconds after a labelled end is a hit; any other
+    detection is a false accept.
+    """
+    frames = _frames(path, detector)
+    frame_duration = detector.frame_length / detector.sample_rate
+    detections = []
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    for index, frame in enumerate(frames):
+        keyword = detector.process(frame)
+        if keyword >= 0:
+            detections.append((keyword, (index + 1) * frame_duration))
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    duration = len(frames) * frame_duration
+
+    report: Dict[str, Any] = {
+        "file": path,
+        "frames": len(frames),
+        "cpu_us_per_frame": cpu / max(len(frames), 1) * 1e6,
+        "realtime_factor": wall / duration if duration else 0.0,
+        "detections": len(detections)
+    }
+
+    labels_path = Path(path).with_suffix(".json")
+    labels = json.loads(labels_path.read_text(encoding="utf-8")).get("keywords", []) if labels_path.exists() else []
+    unmatched = list(labels)
+    delays, false_accepts = [], 0
+    for keyword, at in detections:
+        match = next((label for label in unmatched if label["index"] == keyword and -max_early <= at - label["end"] <= max_delay), None)
+        if match:
+            unmatched.remove(match)
+            delays.append(at - match["end"])
+        else:
+            false_accepts += 1
+
+    report["false_accepts"] = false_accepts
+    report["duration_hours"] = duration / 3600
+    if labels:
+        report["hits"] = len(delays)
+        report["misses"] = len(unmatched)
+        report["mean_delay"] = float(np.mean(delays)) if delays else None
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay WAV files through a wake word detector")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--engine", choices=["porcupine", "stub"], default=Config.WAKE_WORD_ENGINE)
+    parser.add_argument("--keywords", nargs="+", default=Config.WAKE_WORD_PATHS)
+    args = parser.parse_args()
+
+    Config.WAKE_WORD_ENGINE = args.engine
+    detector = create_detector(args.keywords)
+    reports = []
+    try:
+        for file in args.files:
+            report = replay(detector, file)
+            reports.append(report)
+            print(json.dumps(report))
+    finally:
+        detector.close()
+
+    frames = sum(report["frames"] for report in reports)
+    hours = sum(report["duration_hours"] for report in reports)
+    cpu = sum(report["cpu_us_per_frame"] * report["frames"] for report in reports) / max(frames, 1)
+    delays = [report["mean_delay"] for report in reports if report.get("mean_delay") is not None]
+    false_accepts = sum(report["false_accepts"] for report in reports)
+    print(
+        f"{len(reports)} files, {hours * 60:.1f} min: {cpu:.1f} µs CPU/frame, "
+        f"{false_accepts / hours if hours else 0:.2f} false accepts/hour"
+        + (f", mean detection delay {np.mean(delays):.3f}s" if delays else "")
+    )
@@ -0,0 +1,73 @@
+import os
+import wave
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from utils.log import print_log
+from .speech_synthesis import SynthesizedAudio
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class PhraseCache:
+    """
+    Rendered audio of fixed phrases (acknowledgements and the like), kept in
+    memory and as WAV files under `directory`, keyed by engine, voice ID and
+    text. A hit skips synthesis, so the phrase plays as soon as it is queued.
+    """
+
+    def __init__(self, directory: str, engine: str, voice_id: str):
+        # One folder per voice, a different voice never plays another's audio
+        self.directory = Path(directory) / _digest(f"{engine}\0{voice_id}")[:16]
+        self.audio: Dict[str, SynthesizedAudio] = {}
+
+    def _path(self, text: str) -> Path:
+        return self.directory / f"{_digest(text)}.wav"
+
+    def get(self, text: str) -> Optional[SynthesizedAudio]:
+        """Audio of `text` from memory, else from disk, else None."""
+        audio = self.audio.get(text)
+        if audio is not None:
+            return audio
+        path = self._path(text)
+        if not path.exists():
+            return None
+        try:
+            with wave.open(str(path), "rb") as wf:
+                audio = SynthesizedAudio(wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels(), wf.getsampwidth())
+        except (OSError, EOFError, wave.Error) as e:
+            print_log(f"Ignoring unreadable cached phrase {path}: {e}", "red")
+            return None
+        self.audio[text] = audio
+        return audio
+
+    def put(self, text: str, audio: SynthesizedAudio) -> None:
+        self.audio[text] = audio
+        path = self._path(text)
+        temporary = path.with_suffix(".tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with wave.open(str(temporary), "wb") as wf:
+                wf.setnchannels(audio.channels)
+                wf.setsampwidth(audio.sample_width)
+                wf.setframerate(audio.rate)
+                wf.writeframes(audio.pcm)
+            os.replace(temporary, path)
+        except OSError as e:
+            print_log(f"Could not save cached phrase {path}: {e}", "red")
+
+    def render(self, synthesizer, text: str) -> SynthesizedAudio:
+        """Audio of `text`, synthesized and stored on the first request only."""
+        audio = self.get(text)
+        if audio is None:
+            audio = synthesizer.synthesize(text)
+            self.put(text, audio)
+        return audio
+
+    def prerender(self, synthesizer, phrases: Iterable[str]) -> None:
+        """Load or render `phrases` ahead of their first use."""
+        for text in phrases:
+            self.render(synthesizer, text)
+        print_log(f"{len(self.audio)} cached phrases ready")
@@ -1,85 +1,71 @@
-import wave
 import logging
+from typing import Callable, Optional
 import numpy as np
-import pyaudio
-from utils.colors import colors
+from config import Config
 from utils.log import print_log
+from .audio_utils import WHISPER_SAMPLE_RATE, resample, dump_wav
+from .capture import AudioCaptureService
+from .vad import VoiceActivityDetector, Endpointer, SPEECH_START
 
 
 logger = logging.getLogger(__name__)
 
 class AudioRecorder:
-    def __init__(self, format=pyaudio.paInt16, channels=1, rate=8000, chunk=1024):
-        self.format = format
-        self.channels = channels
-        self.rate = rate
-        self.chunk = chunk
-        self.audio = pyaudio.PyAudio()
-
-    def bytes_to_float_array(self, a_bytes):
-        # Convert bytes to int (assuming 2 bytes per sample)
-        a_int = np.frombuffer(a_bytes, dtype=np.int16)
-        # Normalize to float between -1 and 1
-        return a_int.astype(np.float32) / 32768.0
-
-    def calibrate_noise_floor(self, stream, calibration_duration=1):
-        print_log(f"Calibrating noise floor...", "yellow")
-        frames = []
-        for _ in range(int(self.rate / self.chunk * calibration_duration)):
-            data = stream.read(self.chunk)
-            frames.append(data)
-
-        # Convert frames to float array
-        audio_data = self.bytes_to_float_array(b''.join(frames))
-
-        # Calculate the RMS of the noise floor
-        noise_floor_rms = np.sqrt(np.mean(audio_data ** 2))
-        print_log(f"Noise floor RMS: {colors['reset']}{noise_floor_rms}", "yellow")
-
-        # Set the silence threshold slightly above the noise floor
-        silence_threshold = noise_floor_rms * 1.5  # Adjust the multiplier as needed
-        print_log(f"Silence threshold set to: {colors['reset']}{silence_threshold}", "yellow")
-        return silence_threshold
-
-    def record_audio(self, max_silent_chunks=15):
-        stream = self.audio.open(format=self.format, channels=self.channels,
-                               rate=self.rate, input=True, frames_per_buffer=self.chunk)
-        
-        silence_threshold = self.calibrate_noise_floor(stream)
-        frames = []
-        silent_chunk_count = 0
+    def __init__(self, capture: AudioCaptureService, chunk: int = 512):
+        self.capture = capture
+        self.rate = capture.rate
+        self.chunk = chunk  # 32 ms frames at 16 kHz
+        # Kept across turns, so the noise floor doesn't have to be measured again
+        self.vad = VoiceActivityDetector(self.rate, chunk)
+        self.endpointer = Endpointer(self.vad)
+
+    def record_audio(
+        self,
+        start: Optional[int] = None,
+        on_audio: Optional[Callable[[np.ndarray], None]] = None,
+        playing: Optional[Callable[[float], bool]] = None
+    ) -> np.ndarray:
+        """
+        Record one utterance and return it as a mono float32 buffer at 16 kHz,
+        ready for Whisper. Audio is read from the shared capture service, from
+        `start` (an earlier capture position, e.g. where the wake word ended) or
+        from now. Frames captured while `playing(capture_time)` is true, i.e. while
+        the assistant was speaking, are skipped, so its own voice is not taken for
+        the user's. Recording stops once the endpointer hears the end of speech.
+        Nothing is written to disk unless Config.AUDIO_DEBUG_DUMP names a file.
+
+        `on_audio` receives the utterance's 16 kHz audio while it is recorded,
+        from the start of speech (pre-roll included), e.g. for streaming transcription.
+        """
+        subscription = self.capture.subscribe(self.chunk, start)
+        self.endpointer.reset()
+        fed = 0
+        skipped = 0
 
         print_log("Starting audio recording")
-        try:
-            while True:
-                data = stream.read(self.chunk, exception_on_overflow=False)
-                if not data:
-                    break
-
-                audio_data = self.bytes_to_float_array(data)
-                rms = np.sqrt(np.mean(audio_data ** 2))
-
-                if rms < silence_threshold:
-                    silent_chunk_count += 1
-                    if silent_chunk_count > max_silent_chunks:
-                        print_log("Silence detected, stopping recording")
-                        break
-                else:
-                    silent_chunk_count = 0
-
-                frames.append(data)
-
-        finally:
-            print_log("Stopping audio recording")
-            stream.stop_stream()
-            stream.close()
-
-        # Save audio file
-        wf = wave.open("temp_audio.wav", 'wb')
-        wf.setnchannels(self.channels)
-        wf.setsampwidth(self.audio.get_sample_size(self.format))
-        wf.setframerate(self.rate)
-        wf.writeframes(b''.join(frames))
-        wf.close()
-
-        return "temp_audio.wav"
+        while True:
+            frame = subscription.read(timeout=2.0)
+            if frame is None:
+                print_log("No audio from the capture service, stopping recording", "red")
+                break
+            if playing and playing(self.capture.time_at(subscription.position - self.chunk)):
+                skipped += 1
+                continue
+
+            event = self.endpointer.process(frame.astype(np.float32) / 32768.0)
+            if on_audio and self.endpointer.length > fed:
+                on_audio(resample(self.endpointer.buffer[fed:self.endpointer.length], self.rate, WHISPER_SAMPLE_RATE))
+                fed = self.endpointer.length
+            if event == SPEECH_START:
+                print_log("Speech detected")
+            elif event is not None:
+                print_log(f"Stopping recording: {event.replace('_', ' ')}")
+                break
+
+        # The buffer is reused by the next turn
+        audio = resample(self.endpointer.audio().copy(), self.rate, WHISPER_SAMPLE_RATE)
+        print_log(f"Recorded {audio.size / WHISPER_SAMPLE_RATE:.2f}s of audio, skipped {skipped * self.chunk / self.rate:.2f}s of speech playback")
+
+        if Config.AUDIO_DEBUG_DUMP:
+            dump_wav(Config.AUDIO_DEBUG_DUMP, audio, WHISPER_SAMPLE_RATE)
+        return audio
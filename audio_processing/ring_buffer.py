@@ -0,0 +1,95 @@
+from typing import Optional
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-size float32 buffer that keeps the most recent `capacity` samples.
+    The storage is allocated once; writes copy into it with at most two slices.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+        self.position = 0  # Next index to write
+        self.size = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        samples = samples[-self.capacity:]
+        count = samples.size
+        end = self.position + count
+        if end <= self.capacity:
+            self.buffer[self.position:end] = samples
+        else:
+            split = self.capacity - self.position
+            self.buffer[self.position:] = samples[:split]
+            self.buffer[:count - split] = samples[split:]
+        self.position = end % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def read(self) -> np.ndarray:
+        """The buffered samples, oldest first (a copy)."""
+        if self.size < self.capacity:
+            return self.buffer[self.position - self.size:self.position].copy()
+        return np.concatenate((self.buffer[self.position:], self.buffer[:self.position]))
+
+    def clear(self) -> None:
+        self.position = 0
+        self.size = 0
+
+
+class SharedRingBuffer:
+    """
+    Single-producer, multi-consumer ring of int16 samples.
+
+    The producer copies samples in and then advances `written`, the total number
+    of samples ever written. Readers keep their own absolute positions and never
+    take a lock: after copying a span they check it wasn't overwritten meanwhile.
+    Advancing an int attribute is atomic in CPython, so readers either see a
+    span completely or not at all.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.written = 0
+        self.max_write = 0  # Largest write so far: how far ahead of `written` a write in progress reaches
+
+    def write(self, samples: np.ndarray) -> None:
+        samples = samples[-self.capacity:]
+        count = samples.size
+        self.max_write = max(self.max_write, count)
+        start = self.written % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            self.buffer[start:end] = samples
+        else:
+            split = self.capacity - start
+            self.buffer[start:] = samples[:split]
+            self.buffer[:count - split] = samples[split:]
+        self.written += count
+
+    def oldest(self) -> int:
+        """
+        Absolute position of the oldest sample that is safe to read: still in the
+        buffer and out of reach of a write in progress.
+        """
+        return max(self.written + self.max_write - self.capacity, 0)
+
+    def read(self, position: int, count: int) -> Optional[np.ndarray]:
+        """
+        Copy `count` samples starting at absolute `position`. Returns None if they
+        haven't all been written yet or were overwritten before the copy finished.
+        """
+        if position + count > self.written or position < self.oldest():
+            return None
+        start = position % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            samples = self.buffer[start:end].copy()
+        else:
+            samples = np.concatenate((self.buffer[start:], self.buffer[:end - self.capacity]))
+        # The producer may have lapped us while copying
+        if position < self.oldest():
+            return None
+        return samples
@@ -0,0 +1,80 @@
+import io
+import time
+import wave
+from dataclasses import dataclass
+import numpy as np
+
+
+@dataclass
+class SynthesizedAudio:
+    pcm: bytes
+    rate: int
+    channels: int = 1
+    sample_width: int = 2
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (self.rate * self.channels * self.sample_width)
+
+
+class Pyttsx4Synthesizer:
+    """
+    Renders text to PCM in memory with pyttsx4 instead of letting the engine
+    play it, so playback can be cut between blocks.
+    """
+
+    # Format of the raw data pyttsx4 writes to an in-memory stream
+    RAW_RATE = 22050
+
+    def __init__(self, voice_id: str):
+        # Imported here so the tone engine works without pyttsx4
+        import pyttsx4
+        self.engine = pyttsx4.init()
+        self.engine.setProperty('voice', voice_id)
+
+    def say(self, text: str) -> None:
+        """Speak through the engine's own output, for the start-up cue."""
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    def synthesize(self, text: str) -> SynthesizedAudio:
+        buffer = io.BytesIO()
+        self.engine.save_to_file(text, buffer)
+        self.engine.runAndWait()
+        data = buffer.getvalue()
+        if data[:4] == b"RIFF":
+            with wave.open(io.BytesIO(data), "rb") as wf:
+                return SynthesizedAudio(wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels(), wf.getsampwidth())
+        return SynthesizedAudio(data, self.RAW_RATE)
+
+
+class ToneSynthesizer:
+    """
+    Stand-in engine without pyttsx4: a quiet tone lasting `seconds_per_char`
+    per character, roughly the pace of speech. For tests and benchmarks;
+    `render_factor` makes rendering take that fraction of the audio duration,
+    like a real engine would.
+    """
+
+    def __init__(self, rate: int = 22050, seconds_per_char: float = 0.06, render_factor: float = 0.0):
+        self.rate = rate
+        self.seconds_per_char = seconds_per_char
+        self.render_factor = render_factor
+
+    def say(self, text: str) -> None:
+        pass
+
+    def synthesize(self, text: str) -> SynthesizedAudio:
+        samples = int(len(text) * self.seconds_per_char * self.rate)
+        tone = 0.1 * np.sin(2 * np.pi * 220 * np.arange(samples) / self.rate)
+        if self.render_factor:
+            time.sleep(samples / self.rate * self.render_factor)
+        return SynthesizedAudio((tone * 32767).astype("<i2").tobytes(), self.rate)
+
+
+def create_synthesizer(name: str, voice_id: str):
+    if name == "tone":
+        return ToneSynthesizer()
+    if name == "pyttsx4":
+        return Pyttsx4Synthesizer(voice_id)
+    raise ValueError(f"Unknown TTS engine {name!r}, expected 'pyttsx4' or 'tone'")
@@ -1,105 +1,394 @@
-import pyttsx4
+import time
+import random
+import argparse
+import tempfile
+import threading
 import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+from config import Config
 from utils.log import print_log
+from nlp.streaming import split_sentences
+from .audio_sink import NullSink, create_sink
+from .phrase_cache import PhraseCache
+from .speech_synthesis import SynthesizedAudio, ToneSynthesizer, create_synthesizer
+from .tts_events import FINISHED, INTERRUPTED, READY, SENTENCE, STARTED, TTSEvent, TTSEventChannel
+
+# Control messages, sent on their own pipe so they overtake queued phrases
+STOP_CURRENT = "stop_current"  # Cut the phrase being spoken, continue with the queue
+FLUSH_QUEUE = "flush_queue"  # Drop queued phrases up to a sequence number
+SILENCE = "silence"  # Both of the above
+PRIORITY_SPEAK = "priority_speak"  # Cut the current phrase and say this one before the queue
+
+
+PRIORITY_SEQUENCE = -1  # Sequence number of sentences from priority_speak
+
+
+class _SpeechLoop:
+    """
+    Runs in the TTS process as a pipeline of three threads:
+
+    - the receiver reads the phrase and control pipes and splits phrases into sentences,
+    - the synthesizer renders queued sentences to PCM, at most `lookahead`
+      sentences ahead of the one playing (0 renders only while nothing plays),
+    - the player (the thread calling `run`) plays rendered sentences back to back
+      in blocks, checking for interruptions between blocks.
+
+    So the next sentence is usually ready by the time the current one ends.
+    Phrases queued with `cache` are played from `phrase_cache` when it has them.
+    """
+
+    def __init__(
+        self,
+        make_synthesizer,
+        sink,
+        phrases,
+        control,
+        emit: Callable[[TTSEvent], None],
+        block_seconds: float,
+        lookahead: int = 2,
+        phrase_cache: Optional[PhraseCache] = None,
+        prerender: Sequence[str] = ()
+    ):
+        self.make_synthesizer = make_synthesizer
+        self.sink = sink
+        self.phrases = phrases
+        self.control = control
+        self.emit = emit
+        self.block_seconds = block_seconds
+        self.lookahead = lookahead
+        self.phrase_cache = phrase_cache
+        self.prerender = prerender
+        # Sentences to synthesize and whether to use the cache for them, None shuts down
+        self.pending: Deque[Tuple[int, Optional[str], bool]] = deque()
+        self.rendered: Deque[Tuple[int, Optional[str], Optional[SynthesizedAudio]]] = deque()
+        self.received = 0  # Highest phrase sequence received
+        self.reported = 0  # Sequence of the last FINISHED event
+        self.flushed_until = -1
+        self.generation = 0  # Bumped by every flush, priority renders started before one are dropped
+        self.synthesizing = False
+        self.playing = False
+        self.interrupt = False
+        self.speaking = False
+        self.condition = threading.Condition()
+        self.emit_lock = threading.Lock()  # The player and the receiver both send events
+
+    def _send(self, kind: str, sequence: int = 0, text: str = "") -> None:
+        with self.emit_lock:
+            try:
+                self.emit(TTSEvent(kind, time.monotonic(), sequence, text))
+            except OSError as e:
+                print_log(f"Could not send TTS event: {str(e)}", "red")
+
+    def _report_finished(self) -> None:
+        """Called with the condition held: send FINISHED once nothing is left to say."""
+        busy = self.pending or self.rendered or self.synthesizing or self.playing
+        if busy or not (self.speaking or self.received > self.reported):
+            return
+        self.speaking = False
+        self.reported = self.received
+        self._send(FINISHED, self.received)
+
+    # Receiver
+
+    def _queue_phrase(self, sequence: int, phrase: Optional[str], cache: bool = False) -> None:
+        if phrase is None:
+            self.pending.append((sequence, None, False))
+            return
+        self.received = max(self.received, sequence)
+        if sequence <= self.flushed_until:
+            return
+        elif cache and self.phrase_cache:
+            # Cached as a whole, these are short anyway
+            self.pending.append((sequence, phrase, True))
+        else:
+            self.pending.extend((sequence, sentence, False) for sentence in split_sentences(phrase))
+
+    def _flush(self, until: int) -> None:
+        self.flushed_until = max(self.flushed_until, until)
+        self.generation += 1
+        # Phrases still in the pipe are dropped as they arrive
+        self.pending = deque(item for item in self.pending if item[1] is None or item[0] > self.flushed_until)
+        self.rendered = deque(item for item in self.rendered if item[1] is None or item[0] > self.flushed_until)
+
+    def _apply_control(self, command: str, argument) -> None:
+        print_log(f"TTS control: {command}", "orange")
+        if command in (FLUSH_QUEUE, SILENCE):
+            self._flush(argument)
+        elif command == PRIORITY_SPEAK:
+            self.pending.extendleft(reversed([(PRIORITY_SEQUENCE, sentence, False) for sentence in split_sentences(argument)]))
+        if command in (STOP_CURRENT, SILENCE, PRIORITY_SPEAK) and self.playing:
+            self.interrupt = True
+
+    def _receive(self) -> None:
+        connections = [self.phrases, self.control]
+        while True:
+            for connection in wait(connections):
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    if connection is self.control:
+                        connections.remove(connection)
+                        continue
+                    message = (0, None, False)  # The parent is gone, shut down
+                with self.condition:
+                    if connection is self.phrases:
+                        self._queue_phrase(*message)
+                    else:
+                        self._apply_control(*message)
+                    # Flushed or empty phrases finish without being spoken
+                    self._report_finished()
+                    self.condition.notify_all()
+                if connection is self.phrases and message[1] is None:
+                    return
+
+    # Synthesizer
+
+    def _synthesize(self) -> None:
+        try:
+            synthesizer = self.make_synthesizer()
+            synthesizer.say("Loading...")
+            print_log("TTS engine initialized successfully")
+            if self.phrase_cache:
+                self.phrase_cache.prerender(synthesizer, self.prerender)
+            self._send(READY)
+        except Exception as e:
+            print_log(f"Error initializing TTS engine: {str(e)}", "red")
+            with self.condition:
+                self.rendered.append((0, None, None))
+                self.condition.notify_all()
+            return
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.pending and len(self.rendered) + self.playing <= self.lookahead
+                )
+                sequence, sentence, cached = self.pending.popleft()
+                generation = self.generation
+                self.synthesizing = True
+
+            audio = None
+            if sentence is not None:
+                try:
+                    if cached:
+                        audio = self.phrase_cache.render(synthesizer, sentence)
+                    else:
+                        audio = synthesizer.synthesize(sentence)
+                except Exception as e:
+                    print_log(f"Error synthesizing TTS phrase: {str(e)}", "red")
+
+            with self.condition:
+                self.synthesizing = False
+                flushed = (
+                    generation != self.generation if sequence == PRIORITY_SEQUENCE
+                    else sequence <= self.flushed_until
+                )
+                if sentence is None:
+                    self.rendered.append((sequence, None, None))
+                elif audio is not None and not flushed:
+                    if sequence == PRIORITY_SEQUENCE:
+                        # After earlier priority sentences, before everything else
+                        position = next(
+                            (index for index, item in enumerate(self.rendered) if item[0] != PRIORITY_SEQUENCE),
+                            len(self.rendered)
+                        )
+                        self.rendered.insert(position, (sequence, sentence, audio))
+                    else:
+                        self.rendered.append((sequence, sentence, audio))
+                self._report_finished()
+                self.condition.notify_all()
+            if sentence is None:
+                return
+
+    # Player
+
+    def _play(self, audio: SynthesizedAudio) -> bool:
+        """Play `audio` in blocks; False if it was interrupted."""
+        self.sink.open(audio.rate, audio.channels, audio.sample_width)
+        frame_bytes = audio.channels * audio.sample_width
+        block_bytes = max(int(audio.rate * self.block_seconds), 1) * frame_bytes
+        for start in range(0, len(audio.pcm), block_bytes):
+            if self.interrupt:
+                self.sink.abort()
+                print_log("TTS phrase interrupted", "orange")
+                return False
+            self.sink.write(audio.pcm[start:start + block_bytes])
+        return True
+
+    def run(self) -> None:
+        threading.Thread(target=self._receive, name="TTSReceiver", daemon=True).start()
+        threading.Thread(target=self._synthesize, name="TTSSynthesizer", daemon=True).start()
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.rendered)
+                sequence, sentence, audio = self.rendered.popleft()
+                if sentence is None:
+                    print_log("Received shutdown signal")
+                    return
+                self.playing = True
+                self.interrupt = False
+                if not self.speaking:
+                    self.speaking = True
+                    self._send(STARTED, sequence)
+                self._send(SENTENCE, sequence, sentence)
+                self.condition.notify_all()
+
+            try:
+                if not self._play(audio):
+                    self._send(INTERRUPTED, sequence, sentence)
+            except Exception as e:
+                print_log(f"Error playing TTS phrase: {str(e)}", "red")
+
+            with self.condition:
+                self.playing = False
+                self._report_finished()
+                self.condition.notify_all()
+
+
+def _tts_process(voice_id, engine, sink_name, block_seconds, lookahead, prerender, phrases, control, events):
+    """Entry point of the TTS process."""
+    print_log("TTS worker process starting")
+    sink = None
+    try:
+        sink = create_sink(sink_name)
+        loop = _SpeechLoop(
+            lambda: create_synthesizer(engine, voice_id),
+            sink, phrases, control, events.send, block_seconds, lookahead,
+            PhraseCache(Config.TTS_CACHE_DIR, engine, voice_id), prerender
+        )
+        loop.run()
+    except Exception as e:
+        print_log(f"Error in TTS worker process: {str(e)}", "red")
+    finally:
+        if sink:
+            sink.close()
+        print_log("TTS worker process shutting down")
 
 
 class TTSWorker:
-    def __init__(self, voice_id):
+    def __init__(
+        self,
+        voice_id,
+        engine: Optional[str] = None,
+        sink: Optional[str] = None,
+        block_seconds: float = 0.05,
+        lookahead: Optional[int] = None,
+        prerender: Sequence[str] = ()
+    ):
         """
         Initialize the TTSWorker.
 
         Args:
             voice_id (str): The voice ID for the TTS engine.
+            engine (str): "pyttsx4" or "tone" (no speech engine needed), Config.TTS_ENGINE by default.
+            sink (str): "pyaudio" or "null" (discards audio), Config.TTS_AUDIO_SINK by default.
+            block_seconds (float): Playback block size, the longest an interruption waits.
+            lookahead (int): Sentences synthesized ahead of playback, Config.TTS_LOOKAHEAD by default.
+            prerender (list): Fixed phrases to have in the phrase cache before they are first spoken.
         """
         self.voice_id = voice_id
+        self.engine = engine or Config.TTS_ENGINE
+        self.sink = sink or Config.TTS_AUDIO_SINK
+        self.block_seconds = block_seconds
+        self.lookahead = Config.TTS_LOOKAHEAD if lookahead is None else lookahead
+        self.prerender = list(prerender)
         # Use a context manager for proper process synchronization
         self.ctx = multiprocessing.get_context('spawn')  # Use spawn context for better cross-platform compatibility
-        self.queue = self.ctx.Queue()
+        self.phrase_reader, self.phrase_writer = self.ctx.Pipe(duplex=False)
+        self.control_reader, self.control_writer = self.ctx.Pipe(duplex=False)
+        self.send_lock = threading.Lock()  # speak() is called from the LLM thread and the main loop
+        self.sequence = 0
         self.process = None
-        self.state_event = self.ctx.Event()
-        self.state_dict = self.ctx.Manager().dict({"speaking": False})
+        # State changes come back as TTSEvents on their own pipe, see TTSEventChannel
+        self.event_reader, self.event_writer = self.ctx.Pipe(duplex=False)
+        self.events = TTSEventChannel(self.event_reader)
         print_log(f"TTSWorker initialized with voice_id: {voice_id}")
 
-    def tts_worker(self, queue, state_event, state_dict):
-        """Worker function to handle TTS in a separate process."""
-        print_log("TTS worker process starting")
-        try:
-            engine = pyttsx4.init()
-            engine.setProperty('voice', self.voice_id)
-            engine.say("Loading...")
-            engine.runAndWait()
-            print_log("TTS engine initialized successfully")
-
-            while True:
-                try:
-                    phrase = queue.get()
-                    if phrase is None:
-                        print_log("Received shutdown signal")
-                        break
-
-                    print_log(f"Processing phrase: {phrase}")
-                    state_dict["speaking"] = True
-                    state_event.set()
-
-                    engine.say(phrase)
-                    engine.runAndWait()
-
-                    state_dict["speaking"] = False
-                    state_event.set()
-                    
-                    print_log("TTS processing complete")
-
-                except Exception as e:
-                    print_log(f"Error processing TTS phrase: {str(e)}", "red")
-
-        except Exception as e:
-            print_log(f"Error in TTS worker process: {str(e)}", "red")
-        finally:
-            print_log("TTS worker process shutting down")
-
     def start(self):
         """Start the TTS worker process."""
         print_log("Starting TTS worker process")
         self.process = self.ctx.Process(
-            target=self.tts_worker,
-            args=(self.queue, self.state_event, self.state_dict)
+            target=_tts_process,
+            args=(
+                self.voice_id, self.engine, self.sink, self.block_seconds, self.lookahead, self.prerender,
+                self.phrase_reader, self.control_reader, self.event_writer
+            )
         )
         self.process.daemon = True  # Make process daemon so it exits when main process exits
         self.process.start()
+        # Only the child writes events; closing our copy lets the reader see EOF when it exits
+        self.event_writer.close()
+        self.events.start()
         print_log(f"TTS worker process started with PID: {self.process.pid}")
 
-    def speak(self, phrase):
-        """Add a phrase to the TTS queue and set state in main thread."""
+    def _send_control(self, command: str, argument=None) -> None:
+        with self.send_lock:
+            self.control_writer.send((command, argument))
+
+    def speak(self, phrase, cache: bool = False):
+        """
+        Queue a phrase; it is spoken after the phrases queued before it. With
+        `cache`, for fixed phrases, its audio is rendered once and replayed.
+        """
         try:
             print_log(f"Queueing phrase: {phrase}")
-            self.queue.put(phrase)
+            with self.send_lock:
+                self.sequence += 1
+                self.phrase_writer.send((self.sequence, phrase, cache))
         except Exception as e:
             print_log(f"Error queueing phrase: {str(e)}", "red")
 
+    def stop_current(self):
+        """Cut the phrase being spoken at the next audio block and go on with the queue."""
+        self._send_control(STOP_CURRENT)
+
+    def flush(self):
+        """Drop the phrases queued so far, without cutting the current one."""
+        with self.send_lock:
+            self.control_writer.send((FLUSH_QUEUE, self.sequence))
+
+    def priority_speak(self, phrase):
+        """Cut the current phrase and say this one before anything queued."""
+        self._send_control(PRIORITY_SPEAK, phrase)
+
     def silence(self):
-        """Silence the TTS worker by clearing the queue and restarting the process."""
+        """Stop speaking: cut the current phrase and drop the queue. The worker keeps running."""
         print_log("Silencing TTS Worker.", "orange")
-        self.stopForcefully()
-        self.start()
-    
+        with self.send_lock:
+            self.control_writer.send((SILENCE, self.sequence))
+
+    @property
+    def speaking(self) -> bool:
+        return self.events.speaking
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the speech engine is loaded; False on timeout or if the process failed."""
+        return self.events.wait_until_ready(timeout)
+
+    def wait_until_done(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far was spoken or dropped; False on timeout."""
+        return self.events.wait_until_finished(self.sequence, timeout)
+
     def stop(self):
         """Stop the TTS worker process gracefully."""
         if self.process and self.process.is_alive():
             print_log("Stopping TTS worker process")
             try:
-                self.queue.put(None)
-                self.process.join(timeout=5)  # Wait up to 2 seconds for process to finish
-
-                # Force animation state back to waiting
-                self.state_dict["speaking"] = False
-                self.state_event.set()
-
+                self.silence()
+                with self.send_lock:
+                    self.phrase_writer.send((self.sequence + 1, None, False))
+                self.process.join(timeout=5)
                 if self.process.is_alive():
                     self.stopForcefully()
+
+                # Force animation state back to waiting
+                self.events.close(self.sequence)
             except Exception as e:
                 print_log(f"Error stopping TTS worker: {str(e)}", "red")
         print_log("TTS worker process stopped")
-    
+
     def stopForcefully(self):
         try:
             print_log("TTS worker process didn't terminate gracefully, terminating forcefully", "red")
@@ -107,3 +396,108 @@ class TTSWorker:
             self.process.join()
         except Exception as e:
             print_log(f"Error forcefully stopping TTS worker: {str(e)}", "red")
+
+
+def measure_interrupt_latency(runs: int = 5) -> None:
+    """Time from silence() to the worker reporting it stopped speaking, with the tone engine and null sink."""
+    worker = TTSWorker("benchmark", engine="tone", sink="null")
+    worker.start()
+    latencies = []
+    try:
+        for _ in range(runs):
+            worker.speak("This sentence is long enough to still be playing when it gets interrupted. " * 3)
+            worker.events.wait_until_speaking(10)
+            # Not a whole number of blocks in, or every run would land at the same point in a block
+            time.sleep(random.uniform(0.5, 0.5 + worker.block_seconds))
+
+            started = time.perf_counter()
+            worker.silence()
+            worker.wait_until_done(10)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        worker.stop()
+    latencies.sort()
+    print(f"Interrupt latency over {runs} runs: median {latencies[len(latencies) // 2]:.1f} ms, max {latencies[-1]:.1f} ms")
+
+
+def measure_sentence_gaps(lookahead: int, render_factor: float = 0.3, sentences: int = 6) -> List[float]:
+    """
+    Gaps between consecutive sentences of one multi-sentence reply, running the
+    speech loop in-process with a tone engine that takes `render_factor` of each
+    sentence's duration to render, and the null sink.
+    """
+    phrase_reader, phrase_writer = multiprocessing.Pipe(duplex=False)
+    control_reader, control_writer = multiprocessing.Pipe(duplex=False)
+    sink = NullSink()
+    loop = _SpeechLoop(
+        lambda: ToneSynthesizer(seconds_per_char=0.03, render_factor=render_factor),
+        sink, phrase_reader, control_reader, lambda event: None, 0.05, lookahead
+    )
+    player = threading.Thread(target=loop.run)
+    player.start()
+    reply = " ".join(f"This is sentence number {index + 1} of the benchmark reply." for index in range(sentences))
+    phrase_writer.send((1, reply, False))
+    phrase_writer.send((2, None, False))
+    player.join()
+    return sink.gaps
+
+
+def measure_acknowledgement_latency(cache_dir: str, runs: int = 5, render_factor: float = 0.3) -> List[float]:
+    """
+    Time from queueing a fixed phrase to its first audio block, in-process
+    with the tone engine and the null sink. The first run renders the phrase
+    (unless it is already in `cache_dir`), the following ones replay it.
+    """
+    phrase_reader, phrase_writer = multiprocessing.Pipe(duplex=False)
+    control_reader, control_writer = multiprocessing.Pipe(duplex=False)
+    sink = NullSink()
+    loop = _SpeechLoop(
+        lambda: ToneSynthesizer(render_factor=render_factor),
+        sink, phrase_reader, control_reader, lambda event: None, 0.05, 2,
+        PhraseCache(cache_dir, "tone", "benchmark")
+    )
+    player = threading.Thread(target=loop.run)
+    player.start()
+    latencies = []
+    for sequence in range(1, runs + 1):
+        queued_at = time.monotonic()
+        phrase_writer.send((sequence, "Yes Carlos", True))
+        while len(sink.sentence_starts) < sequence:
+            time.sleep(0.001)
+        latencies.append(sink.sentence_starts[-1] - queued_at)
+        # Let it finish, the next run starts from silence
+        while loop.speaking:
+            time.sleep(0.01)
+    phrase_writer.send((runs + 1, None, False))
+    player.join()
+    return latencies
+
+
+def _print_sentence_gaps(lookaheads: List[int]) -> None:
+    for lookahead in lookaheads:
+        gaps = sorted(measure_sentence_gaps(lookahead))
+        print(
+            f"Lookahead {lookahead}: {len(gaps)} gaps, median {gaps[len(gaps) // 2] * 1000:.1f} ms, "
+            f"max {gaps[-1] * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTS worker benchmarks, without a speech engine or audio device")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    interrupt = subcommands.add_parser("interrupt", help="Latency from silence() to speech stopping")
+    interrupt.add_argument("--runs", type=int, default=5)
+    gaps = subcommands.add_parser("gaps", help="Silence between the sentences of a multi-sentence reply")
+    gaps.add_argument("--lookahead", type=int, nargs="+", default=[0, 2])
+    acknowledgement = subcommands.add_parser("ack", help="Latency of a fixed phrase, rendered then cached")
+    acknowledgement.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "interrupt":
+        measure_interrupt_latency(args.runs)
+    elif args.command == "ack":
+        with tempfile.TemporaryDirectory() as directory:
+            latencies = measure_acknowledgement_latency(directory, args.runs)
+        print(f"First use {latencies[0] * 1000:.1f} ms, cached " + ", ".join(f"{latency * 1000:.1f}" for latency in latencies[1:]) + " ms")
+    else:
+        _print_sentence_gaps(args.lookahead)
@@ -0,0 +1,142 @@
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, List, Optional
+from utils.log import print_log
+
+# Kinds of events sent by the TTS process
+READY = "ready"  # The engine is loaded and the phrase cache filled, phrases are spoken without delay
+STARTED = "started"  # Speech began after silence
+SENTENCE = "sentence"  # A sentence started playing (text and sequence of its phrase attached)
+INTERRUPTED = "interrupted"  # The playing sentence was cut by a control message
+FINISHED = "finished"  # Nothing left to say; sequence is the last phrase received
+
+
+@dataclass(frozen=True)
+class TTSEvent:
+    kind: str
+    time: float  # time.monotonic() in the TTS process, a system-wide clock
+    sequence: int = 0
+    text: str = ""
+
+
+class TTSEventChannel:
+    """
+    Parent side of the TTS state pipe. A thread receives events as they are
+    sent, passes them to subscribed callbacks (on that thread) and wakes up
+    anyone blocked in `wait` or `wait_until_finished`.
+    """
+
+    def __init__(self, connection, history: int = 64):
+        self.connection = connection
+        self.condition = threading.Condition()
+        self.callbacks: List[Callable[[TTSEvent], None]] = []
+        self.history: Deque[TTSEvent] = deque(maxlen=history)
+        self.count = 0  # Events received so far
+        self.ready = False
+        self.closed = False  # The TTS process is gone
+        self.speaking = False
+        self.finished_sequence = 0
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._run, name="TTSEvents", daemon=True)
+        self.thread.start()
+
+    def _publish(self, event: TTSEvent) -> None:
+        with self.condition:
+            self.history.append(event)
+            self.count += 1
+            if event.kind == READY:
+                self.ready = True
+            elif event.kind in (STARTED, SENTENCE):
+                self.speaking = True
+            elif event.kind == FINISHED:
+                self.speaking = False
+                self.finished_sequence = max(self.finished_sequence, event.sequence)
+            callbacks = list(self.callbacks)
+            self.condition.notify_all()
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print_log(f"Error in TTS event callback: {str(e)}", "red")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                event = self.connection.recv()
+            except (EOFError, OSError):
+                with self.condition:
+                    self.closed = True
+                    self.condition.notify_all()
+                return
+            self._publish(event)
+
+    def subscribe(self, callback: Callable[[TTSEvent], None]) -> None:
+        with self.condition:
+            self.callbacks.append(callback)
+
+    def unsubscribe(self, callback: Callable[[TTSEvent], None]) -> None:
+        with self.condition:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+
+    def wait(self, kinds: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> Optional[TTSEvent]:
+        """The next event (of one of `kinds`) received after this call, None on timeout."""
+        kinds = set(kinds) if kinds is not None else None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            seen = self.count
+            while True:
+                new = min(self.count - seen, len(self.history))
+                for event in list(self.history)[len(self.history) - new:]:
+                    if kinds is None or event.kind in kinds:
+                        return event
+                seen = self.count
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the TTS process reports it is ready; False on timeout or if it exited first."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.ready or self.closed, timeout)
+            return self.ready
+
+    def wait_until_speaking(self, timeout: Optional[float] = None) -> bool:
+        with self.condition:
+            return self.condition.wait_for(lambda: self.speaking, timeout)
+
+    def speaking_at(self, at: float, tail: float = 0.0) -> bool:
+        """
+        Whether speech was playing at `at` (time.monotonic()), or had ended less
+        than `tail` seconds before, going by the events received so far.
+        """
+        with self.condition:
+            events = list(self.history)
+        speaking = False
+        ended: Optional[float] = None
+        for event in events:
+            if event.time > at:
+                break
+            if event.kind in (STARTED, SENTENCE):
+                speaking = True
+            elif event.kind == FINISHED:
+                speaking = False
+                ended = event.time
+        return speaking or (ended is not None and at - ended < tail)
+
+    def wait_until_finished(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """Block until every phrase up to `sequence` was spoken or dropped; False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.speaking and self.finished_sequence >= sequence, timeout
+            )
+
+    def close(self, sequence: int) -> None:
+        """After the TTS process ended: report phrases up to `sequence` finished if it never did."""
+        if self.speaking or self.finished_sequence < sequence:
+            self._publish(TTSEvent(FINISHED, time.monotonic(), sequence))
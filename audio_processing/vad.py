@@ -0,0 +1,251 @@
+import sys
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from utils.log import print_log
+from .audio_utils import read_wav
+from .ring_buffer import RingBuffer
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+NO_SPEECH = "no_speech"
+MAX_DURATION = "max_duration"
+
+
+def frame_features(frame: np.ndarray) -> Tuple[float, float, float]:
+    """Return (RMS energy, zero-crossing rate, spectral flatness) of one frame."""
+    rms = float(np.sqrt(np.mean(frame ** 2)))
+    zcr = float(np.mean(np.signbit(frame[1:]) != np.signbit(frame[:-1])))
+    power = np.abs(np.fft.rfft(frame * np.hanning(frame.size))) ** 2 + 1e-12
+    flatness = float(np.exp(np.mean(np.log(power))) / np.mean(power))
+    return rms, zcr, flatness
+
+
+class VoiceActivityDetector:
+    """
+    Frame-level speech detector with a running noise-floor estimate.
+
+    A frame is speech when its energy is well above the noise floor, or
+    moderately above it with a tonal spectrum (low spectral flatness), which is
+    how voiced speech differs from fan hum or hiss at a similar level. Broadband
+    frames with a high zero-crossing rate need the full energy margin.
+
+    The noise floor follows the quietest frames quickly and rises slowly on
+    non-speech frames. The detector lives as long as the recorder, so after the
+    first few frames of the first turn no calibration pause is needed.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        frame_size: int,
+        speech_ratio: float = 3.0,
+        tonal_ratio: float = 1.8,
+        tonal_flatness: float = 0.35,
+        noisy_zcr: float = 0.45,
+        calibration_frames: int = 6,
+        min_noise_floor: float = 1e-4
+    ):
+        self.rate = rate
+        self.frame_size = frame_size
+        self.speech_ratio = speech_ratio
+        self.tonal_ratio = tonal_ratio
+        self.tonal_flatness = tonal_flatness
+        self.noisy_zcr = noisy_zcr
+        self.calibration_frames = calibration_frames
+        self.min_noise_floor = min_noise_floor
+        self.noise_floor: Optional[float] = None
+        self.calibration: List[float] = []
+
+    @property
+    def frame_duration(self) -> float:
+        return self.frame_size / self.rate
+
+    def _update_noise_floor(self, rms: float, speech: bool) -> None:
+        if rms < self.noise_floor:
+            self.noise_floor = 0.7 * self.noise_floor + 0.3 * rms
+        elif not speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        else:
+            # Creep up during speech too, so a louder room can't look like endless speech
+            self.noise_floor *= 1.002
+        self.noise_floor = max(self.noise_floor, self.min_noise_floor)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms, zcr, flatness = frame_features(frame)
+
+        if self.noise_floor is None:
+            # Treat the first frames ever heard as background noise
+            self.calibration.append(rms)
+            if len(self.calibration) >= self.calibration_frames:
+                self.noise_floor = max(float(np.median(self.calibration)), self.min_noise_floor)
+                self.calibration = []
+                print_log(f"Noise floor RMS: {self.noise_floor:.5f}", "yellow")
+            return False
+
+        ratio = rms / self.noise_floor
+        speech = ratio >= self.speech_ratio or (
+            ratio >= self.tonal_ratio and flatness <= self.tonal_flatness and zcr < self.noisy_zcr
+        )
+        self._update_noise_floor(rms, speech)
+        return speech
+
+
+class Endpointer:
+    """
+    Finds where one utterance starts and ends in a stream of frames.
+
+    Frames before speech go through a ring buffer so `pre_roll` seconds of audio
+    before the detected start are kept. After speech the utterance is written
+    into a pre-allocated buffer of `max_duration` seconds. The hangover (silence
+    needed to end the utterance) grows with the length of the speech so far:
+    short commands end quickly, longer sentences may pause between words.
+    """
+
+    def __init__(
+        self,
+        vad: VoiceActivityDetector,
+        pre_roll: float = 0.3,
+        min_hangover: float = 0.35,
+        max_hangover: float = 0.9,
+        hangover_growth: float = 0.15,
+        start_frames: int = 2,
+        no_speech_timeout: float = 6.0,
+        max_duration: float = 30.0
+    ):
+        self.vad = vad
+        self.min_hangover = min_hangover
+        self.max_hangover = max_hangover
+        self.hangover_growth = hangover_growth
+        self.start_frames = start_frames
+        self.no_speech_timeout = no_speech_timeout
+        self.pre_roll = RingBuffer(int(pre_roll * vad.rate) + vad.frame_size * start_frames)
+        self.buffer = np.zeros(int(max_duration * vad.rate), dtype=np.float32)
+        self.reset()
+
+    def reset(self) -> None:
+        self.pre_roll.clear()
+        self.length = 0
+        self.started = False
+        self.speech_frames = 0  # Consecutive speech frames before the start, speech frames after it
+        self.silent_frames = 0
+        self.frames_seen = 0
+        self.start_frame: Optional[int] = None
+        self.end_frame: Optional[int] = None
+
+    def hangover(self) -> float:
+        """Seconds of silence that end the utterance, given the speech heard so far."""
+        speech_seconds = self.speech_frames * self.vad.frame_duration
+        return min(self.min_hangover + self.hangover_growth * speech_seconds, self.max_hangover)
+
+    def _append(self, samples: np.ndarray) -> bool:
+        end = self.length + samples.size
+        if end > self.buffer.size:
+            samples = samples[:self.buffer.size - self.length]
+            end = self.buffer.size
+        self.buffer[self.length:end] = samples
+        self.length = end
+        return end < self.buffer.size
+
+    def process(self, frame: np.ndarray) -> Optional[str]:
+        """Feed one frame; returns SPEECH_START, SPEECH_END, NO_SPEECH, MAX_DURATION or None."""
+        self.frames_seen += 1
+        speech = self.vad.is_speech(frame)
+
+        if not self.started:
+            self.pre_roll.write(frame)
+            self.speech_frames = self.speech_frames + 1 if speech else 0
+            if self.speech_frames >= self.start_frames:
+                self.started = True
+                self.start_frame = self.frames_seen - self.start_frames
+                self._append(self.pre_roll.read())
+                return SPEECH_START
+            if self.frames_seen * self.vad.frame_duration >= self.no_speech_timeout:
+                return NO_SPEECH
+            return None
+
+        if not self._append(frame):
+            self.end_frame = self.frames_seen
+            return MAX_DURATION
+
+        if speech:
+            self.speech_frames += 1
+            self.silent_frames = 0
+            return None
+
+        self.silent_frames += 1
+        if self.silent_frames * self.vad.frame_duration >= self.hangover():
+            self.end_frame = self.frames_seen - self.silent_frames
+            return SPEECH_END
+        return None
+
+    def audio(self) -> np.ndarray:
+        """The utterance so far, without most of the silence that ended it (a view into the buffer)."""
+        end = self.length
+        if self.end_frame is not None:
+            # Keep a couple of frames so trailing consonants aren't clipped
+            end = max(self.length - max(self.silent_frames - 2, 0) * self.vad.frame_size, 0)
+        return self.buffer[:end]
+
+
+def evaluate_wav(path: str, frame_ms: float = 32.0, **endpointer_options) -> Dict[str, Any]:
+    """
+    Run the endpointer over a WAV fixture as if it were the microphone.
+
+    Labels are read from a JSON file next to it (`name.json`) holding
+    `{"speech": [[start, end], ...]}` in seconds. With labels the result includes
+    the frame accuracy of the detector and the endpoint latency: how long after
+    the labelled end of speech the recording would have stopped.
+    """
+    audio, rate = read_wav(path)
+    frame_size = int(rate * frame_ms / 1000)
+    vad = VoiceActivityDetector(rate, frame_size)
+    endpointer = Endpointer(vad, **endpointer_options)
+
+    frames = audio[:audio.size - audio.size % frame_size].reshape(-1, frame_size)
+    event, decided_at = None, None
+    for index, frame in enumerate(frames):
+        result = endpointer.process(frame)
+        if result in (SPEECH_END, NO_SPEECH, MAX_DURATION):
+            event, decided_at = result, (index + 1) * vad.frame_duration
+            break
+
+    report: Dict[str, Any] = {
+        "file": path,
+        "event": event or "end_of_file",
+        "speech_start": endpointer.start_frame * vad.frame_duration if endpointer.start_frame is not None else None,
+        "speech_end": endpointer.end_frame * vad.frame_duration if endpointer.end_frame is not None else None,
+        "decided_at": decided_at
+    }
+
+    labels_path = Path(path).with_suffix(".json")
+    if labels_path.exists():
+        segments = json.loads(labels_path.read_text(encoding="utf-8"))["speech"]
+        times = (np.arange(len(frames)) + 0.5) * vad.frame_duration
+        truth = np.zeros(len(frames), dtype=bool)
+        for start, end in segments:
+            truth |= (times >= start) & (times < end)
+        # Only the frames the recorder would have listened to count
+        listened = int(round(decided_at / vad.frame_duration)) if decided_at else len(frames)
+        detected = np.zeros(len(frames), dtype=bool)
+        if endpointer.start_frame is not None:
+            detected[endpointer.start_frame:endpointer.end_frame or listened] = True
+        report["frame_accuracy"] = float(np.mean(detected[:listened] == truth[:listened]))
+        if segments and decided_at is not None:
+            report["endpoint_latency"] = decided_at - segments[-1][1]
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m audio_processing.vad fixture.wav [...]")
+        sys.exit(1)
+    latencies = []
+    for fixture in sys.argv[1:]:
+        result = evaluate_wav(fixture)
+        print(json.dumps(result))
+        if "endpoint_latency" in result:
+            latencies.append(result["endpoint_latency"])
+    if latencies:
+        print(f"Endpoint latency over {len(latencies)} fixtures: mean {np.mean(latencies):.3f}s, max {np.max(latencies):.3f}s")
@@ -1,74 +1,73 @@
-import pyaudio
-import struct
-import pvporcupine
-import time
+from typing import Optional
 from utils.log import print_log
 from utils.colors import colors
 from config import Config
+from .capture import AudioCaptureService
+from .keyword_detector import KeywordDetector
+
+# Said by the orchestrator on each wake phrase. The text never changes, so the TTS
+# worker plays them from its phrase cache
+ACKNOWLEDGEMENTS = {
+    "start_listening": f"Yes {Config.USER_NAME}",
+    "stop_speaking": f"Okay {Config.USER_NAME}",
+    "new_conversation": f"Starting a new conversation {Config.USER_NAME}"
+}
 
 
 class WakeWordDetector:
-    def __init__(self, access_key, keyword_paths, tts_worker):
+    def __init__(self, detector: KeywordDetector, capture: AudioCaptureService):
         """
         Initialize the WakeWordDetector.
 
         Args:
-            access_key (str): Picovoice access key.
-            keyword_paths (list): Paths to wake word model files.
-            tts_worker (TTSWorker): Instance of TTSWorker for text-to-speech functionality.
+            detector (KeywordDetector): Wake word engine, see keyword_detector.create_detector.
+            capture (AudioCaptureService): Shared microphone capture to read frames from.
         """
-        self.porcupine = pvporcupine.create(
-            access_key=access_key, keyword_paths=keyword_paths)
-        self.tts_worker = tts_worker
+        self.detector = detector
+        self.capture = capture
+        if capture.rate != self.detector.sample_rate:
+            raise ValueError(f"Wake word detection needs {self.detector.sample_rate} Hz audio, capture runs at {capture.rate} Hz")
+        # Capture position right after the last detected wake phrase
+        self.detected_at: Optional[int] = None
 
     def listen_for_wake_phrase(self):
         """
-        Listen for the wake phrase and trigger TTS when detected.
+        Listen for the wake phrase. Acknowledging it is up to the caller, which
+        first has to silence and cancel the reply that may still be playing.
 
         Returns:
             bool: True if the wake phrase is detected, False if interrupted.
         """
-        pa = pyaudio.PyAudio()
-        audio_stream = pa.open(
-            rate=self.porcupine.sample_rate,
-            channels=1,
-            format=pyaudio.paInt16,
-            input=True,
-            frames_per_buffer=self.porcupine.frame_length
-        )
+        subscription = self.capture.subscribe(self.detector.frame_length)
 
         print_log(
             f"Listening for wake phrase 'Hey {Config.AI_NAME}'...", "yellow")
 
         try:
             while True:
-                pcm = audio_stream.read(self.porcupine.frame_length)
-                pcm = struct.unpack_from(
-                    "h" * self.porcupine.frame_length, pcm)
+                pcm = subscription.read(timeout=1.0)
+                if pcm is None:
+                    if self.capture.finished:
+                        print_log("Audio input ended, stopping wake phrase listener", "yellow")
+                        return False
+                    continue
 
-                keyword_index = self.porcupine.process(pcm)
+                keyword_index = self.detector.process(pcm)
+                if keyword_index >= 0:
+                    self.detected_at = subscription.position
 
                 if Config.DEBUG:
                     print_log(f"Heard:{colors['reset']} {keyword_index}", "blue")
 
                 if keyword_index == 0:
                     print_log(f"'Hey Camille' Wake phrase detected!", "cyan")
-                    # Add the TTS request to the queue
-                    self.tts_worker.speak(f"Yes {Config.USER_NAME}")
                     return "start_listening"
                 elif keyword_index == 1:
                     print_log(f"'Camille Stop' Wake phrase detected!", "cyan")
-                    # Add the TTS request to the queue
-                    self.tts_worker.silence()
-                    self.tts_worker.speak(f"Okay {Config.USER_NAME}")
                     return "stop_speaking"
                 elif keyword_index == 2:
                     print_log(f"'New Conversation' Wake phrase detected!", "cyan")
-                    self.tts_worker.speak(f"Starting a new conversation {Config.USER_NAME}")
                     return "new_conversation"
         except KeyboardInterrupt:
             print("\nExiting wake phrase listener...")
             return False
-        finally:
-            audio_stream.close()
-            pa.terminate()
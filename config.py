@@ -1,5 +1,5 @@
 import os
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,10 +10,55 @@ class Config:
     AI_NAME: str = "Camille"
     USER_NAME: str = "Carlos"
     PICOVOICE_ACCESS_KEY: str = os.getenv("PICOVOICE_ACCESS_KEY", "")
+    WAKE_WORD_ENGINE: str = os.getenv("WAKE_WORD_ENGINE", "porcupine")  # "porcupine" or "stub" (no access key needed)
+    WAKE_WORD_PATHS: List[str] = ["wake_words/hey-camille.ppn", "wake_words/camille-stop.ppn", "wake_words/new-conversation.ppn"]
     OPENAI_API_BASE: str = "http://localhost:1234/v1"
     OPENAI_KEY: str = "not-needed"
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_READ_TIMEOUT: float = 30.0
+    STREAM_RESPONSES: bool = True  # Speak each sentence as soon as the LLM has streamed it
+    TITLE_GENERATION: str = "llm"  # "llm" or "heuristic" (local title, no extra LLM request)
     
+    AUDIO_SAMPLE_RATE: int = 16000  # Single capture rate shared by wake word detection and recording
+    AUDIO_CAPTURE_CHUNK: int = 512  # Samples read from the device at a time
+    AUDIO_BUFFER_SECONDS: float = 20.0  # Captured audio kept for consumers that start reading late
+    AUDIO_INPUT_FILE: str = os.getenv("AUDIO_INPUT_FILE", "")  # Play this WAV file instead of using the microphone
+    TRANSCRIPTION_BACKEND: str = os.getenv("TRANSCRIPTION_BACKEND", "whisper")  # "whisper", "faster-whisper" (int8 CPU) or "remote"
+    WHISPER_MODEL: str = "tiny"
+    WHISPER_PROFILE: str = "fast"  # "fast" (greedy, no temperature fallback) or "accurate" (whisper defaults)
+    TRANSCRIPTION_THREADS: int = 0  # CPU threads for local backends, 0 lets the library decide
+    TRANSCRIPTION_API_BASE: str = os.getenv("TRANSCRIPTION_API_BASE", "http://localhost:8765/v1")  # For the remote backend
+    TRANSCRIPTION_API_KEY: str = os.getenv("TRANSCRIPTION_API_KEY", "not-needed")
+    TRANSCRIPTION_MODEL: str = "whisper-1"
+    TTS_ENGINE: str = os.getenv("TTS_ENGINE", "pyttsx4")  # "pyttsx4" or "tone" (placeholder beeps, for testing)
+    TTS_AUDIO_SINK: str = os.getenv("TTS_AUDIO_SINK", "pyaudio")  # "pyaudio", "null" (discard audio) or "file", for testing
+    TTS_AUDIO_FILE: str = os.getenv("TTS_AUDIO_FILE", "tts_output.wav")  # WAV file written by the "file" sink
+    TTS_LOOKAHEAD: int = 2  # Sentences synthesized ahead of the one playing, 0 to render one at a time
+    TTS_CACHE_DIR: str = "db/tts_cache"  # Rendered audio of fixed phrases, per voice
+    TTS_STARTUP_TIMEOUT: float = 20.0  # Longest wait for the speech engine to load before going on without it
+    SPEECH_TIMEOUT: float = 30.0  # Longest wait for a prompt to be spoken before listening for the answer
+    SPEECH_ECHO_TAIL: float = 0.15  # Audio captured this long after speech ended is still skipped as its echo
+    STREAMING_TRANSCRIPTION: bool = True  # Transcribe while the user speaks, only the tail is decoded at the end
+    AUDIO_DEBUG_DUMP: str = os.getenv("AUDIO_DEBUG_DUMP", "")  # WAV file to save each recorded utterance to, for debugging
+    
+    RESUME_CONVERSATION: str = os.getenv("RESUME_CONVERSATION", "")  # "last", a conversation id, or empty for a new one
+    RESUME_MESSAGE_LIMIT: int = 40  # Newest messages loaded when resuming
+    WARM_UP_PROMPT_CACHE: bool = True  # Send the system prompt once at startup so the backend caches it
+    CONTEXT_TOKEN_BUDGET: int = 3000  # Approximate prompt tokens sent per request
+    CONTEXT_SUMMARY_TOKENS: int = 300  # Part of the budget reserved for the summary of older turns
+    MEMORY_INDEX_PATH: str = "db/memory_index"  # Embedding index of user memories, next to chat.db
+    MEMORY_TOP_K: int = 5  # Relevant conversation memories added to each request
+    DB_FLUSH_INTERVAL: float = 0.5  # Seconds writes may wait before they are committed together
+
     # Tools configuration
+    TOOL_TIMEOUT: float = 20.0  # Default seconds before a tool call is abandoned
+    LAZY_TOOL_DISCOVERY: bool = True  # Import tool modules on first use instead of at startup
+    TOOL_MANIFEST_FILE: str = ".tool_manifest.json"  # Cached tool signatures, stored in tools/
+    TOOL_CACHE_MAX_ENTRIES: int = 256
+    TOOL_CACHE_MAX_BYTES: int = 2 * 1024 * 1024
+    BROWSER_POOL_SIZE: int = 2  # Headless browsers kept alive for visit_url
+    BROWSER_MAX_PAGES: int = 50  # Pages a browser loads before it is replaced
+    BROWSER_POOL_PREWARM: bool = False  # Start a browser in the background at start-up (costs a Chrome even if no page is visited)
     OPENWEATHERMAP_API_KEY: Optional[str] = os.getenv("OPENWEATHERMAP_API_KEY")
     OPENWEATHERMAP_DEFAULT_CITY: Optional[str] = os.getenv("OPENWEATHERMAP_DEFAULT_CITY")
     BRAVE_SEARCH_API_TOKEN: Optional[str] = os.getenv("BRAVE_SEARCH_API_TOKEN")
@@ -22,7 +67,7 @@ class Config:
     def validate(cls) -> None:
         if not cls.MODEL_NAME:
             raise ValueError("MODEL_NAME env var is required")
-        if not cls.PICOVOICE_ACCESS_KEY:
+        if cls.WAKE_WORD_ENGINE == "porcupine" and not cls.PICOVOICE_ACCESS_KEY:
             raise ValueError("PICOVOICE_ACCESS_KEY env var is required")
 
 # Validate on import
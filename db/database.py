@@ -1,16 +1,171 @@
+import re
+import atexit
+import queue
 import sqlite3
+import threading
+import time
 import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Any, Tuple, Callable
 from utils.log import print_log
 
+_STOP = object()
+
 class Database:
-    def __init__(self, db_path: str = "db/chat.db"):
+    """
+    SQLite storage with write-behind persistence.
+
+    A single writer thread owns the connection (in WAL mode). Writes are queued and
+    return immediately; the writer groups everything queued within `flush_interval`
+    seconds into one transaction, so every write is durable at most `flush_interval`
+    seconds after it was made. Reads are executed by the same thread after the
+    writes queued before them, so they always see those writes. `flush()` blocks
+    until everything queued so far is committed.
+
+    Reads wait at most `call_timeout` seconds for the writer thread. Reads and
+    writes fail straight away once the database is closed or the writer thread is
+    gone; writes still queued when the writer stops are logged as lost.
+    """
+
+    def __init__(self, db_path: str = "db/chat.db", flush_interval: float = 0.5, call_timeout: float = 30.0):
         Path(db_path).parent.mkdir(exist_ok=True)
-        self.conn = sqlite3.connect(db_path)
-        self.create_tables()
-    
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.call_timeout = call_timeout
+        self.queue: "queue.Queue[Any]" = queue.Queue()
+        self.closed = False
+        self.fts_enabled = False
+        # Message ids are allocated here rather than by SQLite, so callers know the
+        # id of a message before its queued write lands
+        self.id_lock = threading.Lock()
+        self.last_message_id = 0
+        self.started: Future = Future()
+        self.writer = threading.Thread(target=self._writer_loop, name="DatabaseWriter", daemon=True)
+        self.writer.start()
+        # Raises here if the writer thread couldn't open the database
+        self._wait(self.started)
+        self._call(self.create_tables)
+        atexit.register(self.close)
+
+    def _writer_loop(self) -> None:
+        try:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        except Exception as e:
+            self.started.set_exception(e)
+            return
+        self.started.set_result(None)
+
+        try:
+            self._process_jobs()
+        except Exception as e:
+            print_log(f"Database writer stopped: {e}", "red")
+        finally:
+            self._fail_pending()
+
+    def _process_jobs(self) -> None:
+        deadline: Optional[float] = None
+
+        while True:
+            try:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                job = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                job = None
+
+            if job is _STOP:
+                self._commit()
+                self.conn.close()
+                break
+
+            if job is not None:
+                kind, payload, future = job
+                if kind == "write":
+                    sql, params = payload
+                    try:
+                        self.conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        print_log(f"Database write failed: {e}", "red")
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                elif kind == "call":
+                    try:
+                        future.set_result(payload())
+                    except Exception as e:
+                        future.set_exception(e)
+                elif kind == "flush":
+                    self._commit()
+                    deadline = None
+                    future.set_result(None)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                self._commit()
+                deadline = None
+
+    def _fail_pending(self) -> None:
+        """
+        Fail the jobs still queued once the writer thread stops, so nobody waits on
+        them, and report the writes that are lost.
+        """
+        dropped = 0
+        while True:
+            try:
+                job = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                continue
+            kind, payload, future = job
+            if kind == "write":
+                dropped += 1
+                print_log(f"Database write dropped: {' '.join(payload[0].split())[:80]}", "red")
+            elif future is not None:
+                future.set_exception(sqlite3.ProgrammingError("Database writer is not running"))
+        if dropped:
+            print_log(f"Database writer stopped with {dropped} queued write(s) not saved", "red")
+
+    def _commit(self) -> None:
+        try:
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print_log(f"Database commit failed: {e}", "red")
+
+    def _write(self, sql: str, params: Tuple = ()) -> None:
+        """Queue a write; it is committed within `flush_interval` seconds."""
+        self._check_running()
+        self.queue.put(("write", (sql, params), None))
+
+    def _wait(self, future: Future) -> Any:
+        """Wait for a job of the writer thread, at most `call_timeout` seconds."""
+        try:
+            return future.result(timeout=self.call_timeout)
+        except FutureTimeoutError:
+            if not self.writer.is_alive():
+                raise sqlite3.ProgrammingError("Database writer is not running") from None
+            raise sqlite3.OperationalError(f"Database did not answer within {self.call_timeout}s") from None
+
+    def _check_running(self) -> None:
+        if self.closed:
+            raise sqlite3.ProgrammingError("Database is closed")
+        if not self.writer.is_alive():
+            raise sqlite3.ProgrammingError("Database writer is not running")
+
+    def _submit(self, kind: str, payload: Any) -> Future:
+        self._check_running()
+        future: Future = Future()
+        self.queue.put((kind, payload, future))
+        return future
+
+    def _call(self, func: Callable[[], Any]) -> Any:
+        """Run `func` on the writer thread (after every queued write) and wait for its result."""
+        return self._wait(self._submit("call", func))
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return self._call(lambda: self.conn.execute(sql, params).fetchall())
+
     def create_tables(self):
         self.conn.executescript("""
             CREATE TABLE IF NOT EXISTS conversations (
@@ -18,7 +173,7 @@ class Database:
                 title TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            
+
             CREATE TABLE IF NOT EXISTS messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 conversation_id TEXT,
@@ -27,7 +182,22 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (conversation_id) REFERENCES conversations(id)
             );
-            
+
+            CREATE INDEX IF NOT EXISTS idx_messages_conversation
+                ON messages (conversation_id, id);
+
+            CREATE TABLE IF NOT EXISTS conversation_summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                last_message_id INTEGER NOT NULL,  -- Newest message covered by the summary
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_conversation_summaries_conversation
+                ON conversation_summaries (conversation_id, id);
+
             CREATE TABLE IF NOT EXISTS user_memories (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 memory TEXT NOT NULL,
@@ -36,52 +206,285 @@ class Database:
             );
         """)
         self.conn.commit()
-    
+        # Also past the ids of deleted messages, AUTOINCREMENT never reuses those either
+        self.last_message_id = self.conn.execute("""
+            SELECT MAX(
+                COALESCE((SELECT MAX(id) FROM messages), 0),
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'messages'), 0)
+            )
+        """).fetchone()[0]
+        self.create_search_tables()
+
+    def create_search_tables(self):
+        """
+        Full-text indexes over user/assistant messages and conversation titles,
+        kept in sync by triggers and back-filled from existing rows the first time
+        they are created. Messages are indexed as an external-content table keyed
+        by their INTEGER PRIMARY KEY. Conversations have a TEXT key, and their
+        implicit rowid may be renumbered by VACUUM, so titles are stored in the
+        index itself along with the conversation id.
+        """
+        existing = {
+            name: sql for name, sql in self.conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE name IN ('messages_fts', 'conversations_fts')"
+            )
+        }
+        try:
+            if "content=" in (existing.get("conversations_fts") or ""):
+                # Rebuild the rowid-keyed title index of older databases
+                self.conn.executescript("""
+                    DROP TRIGGER IF EXISTS conversations_fts_insert;
+                    DROP TRIGGER IF EXISTS conversations_fts_update;
+                    DROP TRIGGER IF EXISTS conversations_fts_delete;
+                    DROP TABLE conversations_fts;
+                """)
+                del existing["conversations_fts"]
+
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content, content='messages', content_rowid='id'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages
+                WHEN new.role IN ('user', 'assistant') BEGIN
+                    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages
+                WHEN old.role IN ('user', 'assistant') BEGIN
+                    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages
+                WHEN old.role IN ('user', 'assistant') BEGIN
+                    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+                END;
+
+                CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                    conversation_id UNINDEXED, title
+                );
+
+                CREATE TRIGGER IF NOT EXISTS conversations_fts_insert AFTER INSERT ON conversations
+                WHEN new.title IS NOT NULL BEGIN
+                    INSERT INTO conversations_fts (conversation_id, title) VALUES (new.id, new.title);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS conversations_fts_update AFTER UPDATE OF title ON conversations BEGIN
+                    DELETE FROM conversations_fts WHERE conversation_id = old.id;
+                    INSERT INTO conversations_fts (conversation_id, title)
+                        SELECT new.id, new.title WHERE new.title IS NOT NULL;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS conversations_fts_delete AFTER DELETE ON conversations BEGIN
+                    DELETE FROM conversations_fts WHERE conversation_id = old.id;
+                END;
+            """)
+            if "messages_fts" not in existing:
+                print_log("Indexing existing messages for search", "green")
+                self.conn.execute("""
+                    INSERT INTO messages_fts (rowid, content)
+                    SELECT id, content FROM messages WHERE role IN ('user', 'assistant') AND content IS NOT NULL
+                """)
+            if "conversations_fts" not in existing:
+                self.conn.execute("""
+                    INSERT INTO conversations_fts (conversation_id, title)
+                    SELECT id, title FROM conversations WHERE title IS NOT NULL
+                """)
+            self.conn.commit()
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            # SQLite builds without FTS5 fall back to LIKE scans in search_conversations
+            print_log(f"Full-text search unavailable: {e}", "red")
+
     def create_conversation(self) -> str:
         conversation_id = str(uuid.uuid4())
         print_log(f"INSERTING new conversation#{conversation_id} into DB", "green")
-        self.conn.execute("INSERT INTO conversations (id) VALUES (?)", (conversation_id,))
-        self.conn.commit()
+        self._write("INSERT INTO conversations (id) VALUES (?)", (conversation_id,))
         return conversation_id
-    
+
     def update_conversation_title(self, conversation_id: str, title: str):
         print_log(f"UPDATING title for conversation#{conversation_id}: {title}", "green")
-        self.conn.execute(
+        self._write(
             "UPDATE conversations SET title = ? WHERE id = ?",
             (title, conversation_id)
         )
-        self.conn.commit()
-    
-    def add_message(self, conversation_id: str, role: str, content: str):
+
+    def add_message(self, conversation_id: str, role: str, content: str) -> int:
+        """Queue a message and return its id."""
         print_log(f"INSERTING new message into conversation#{conversation_id}", "green")
-        self.conn.execute(
-            "INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)",
-            (conversation_id, role, content)
+        with self.id_lock:
+            self.last_message_id += 1
+            message_id = self.last_message_id
+        self._write(
+            "INSERT INTO messages (id, conversation_id, role, content) VALUES (?, ?, ?, ?)",
+            (message_id, conversation_id, role, content)
         )
-        self.conn.commit()
-    
+        return message_id
+
     def get_conversation_messages(self, conversation_id: str) -> List[Dict[str, str]]:
         print_log(f"FETCHING messages for conversation#{conversation_id}", "green")
-        cursor = self.conn.execute(
-            "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY created_at",
+        rows = self._query(
+            "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY id",
+            (conversation_id,)
+        )
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def get_latest_system_prompt(self, conversation_id: str) -> Optional[str]:
+        """The content of the conversation's most recently stored system message."""
+        rows = self._query(
+            "SELECT content FROM messages WHERE conversation_id = ? AND role = 'system' ORDER BY id DESC LIMIT 1",
             (conversation_id,)
         )
-        return [{"role": role, "content": content} for role, content in cursor.fetchall()]
-    
+        return rows[0][0] if rows else None
+
+    def get_latest_conversation_id(self) -> Optional[str]:
+        """The conversation that received the most recent message."""
+        rows = self._query("SELECT conversation_id FROM messages ORDER BY id DESC LIMIT 1")
+        return rows[0][0] if rows else None
+
+    def conversation_exists(self, conversation_id: str) -> bool:
+        return bool(self._query("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)))
+
+    def get_messages_page(
+        self,
+        conversation_id: str,
+        limit: int = 50,
+        before_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Page through a conversation from newest to oldest with a keyset cursor.
+        Returns up to `limit` messages older than `before_id` (the newest ones when
+        None), in chronological order and with their ids, so the smallest id is the
+        cursor for the next page.
+        """
+        print_log(f"FETCHING {limit} messages for conversation#{conversation_id} before id {before_id}", "green")
+        if before_id is None:
+            rows = self._query(
+                "SELECT id, role, content FROM messages WHERE conversation_id = ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, limit)
+            )
+        else:
+            rows = self._query(
+                "SELECT id, role, content FROM messages WHERE conversation_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, before_id, limit)
+            )
+        return [{"id": id, "role": role, "content": content} for id, role, content in reversed(rows)]
+
+    def add_conversation_summary(self, conversation_id: str, summary: str, last_message_id: int):
+        """Store a summary of the conversation up to and including message `last_message_id`."""
+        print_log(f"INSERTING summary up to message#{last_message_id} for conversation#{conversation_id}", "green")
+        self._write(
+            "INSERT INTO conversation_summaries (conversation_id, summary, last_message_id) VALUES (?, ?, ?)",
+            (conversation_id, summary, last_message_id)
+        )
+
+    def get_latest_conversation_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT summary, last_message_id FROM conversation_summaries WHERE conversation_id = ? ORDER BY id DESC LIMIT 1",
+            (conversation_id,)
+        )
+        if not rows:
+            return None
+        return {"summary": rows[0][0], "last_message_id": rows[0][1]}
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Turn free text into an FTS5 query matching every word, ignoring FTS syntax characters."""
+        return " ".join(f'"{word}"' for word in re.findall(r"\w+", text))
+
+    def search_conversations(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Find past conversations whose messages or title contain every word of `query`.
+        Returns one row per conversation, best match first, with the best matching snippet.
+        """
+        print_log(f"SEARCHING conversations for: {query}", "green")
+        fts_query = self._fts_query(query)
+        if not fts_query:
+            return []
+
+        if self.fts_enabled:
+            rows = self._query("""
+                WITH hits AS (
+                    SELECT m.conversation_id AS conversation_id,
+                           bm25(messages_fts) AS score,
+                           snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet
+                    FROM messages_fts
+                    JOIN messages m ON m.id = messages_fts.rowid
+                    WHERE messages_fts MATCH ?
+                    UNION ALL
+                    SELECT c.id, bm25(conversations_fts) * 2.0, c.title
+                    FROM conversations_fts
+                    JOIN conversations c ON c.id = conversations_fts.conversation_id
+                    WHERE conversations_fts MATCH ?
+                )
+                SELECT h.conversation_id, c.title, c.created_at, MIN(h.score) AS score, h.snippet
+                FROM hits h
+                JOIN conversations c ON c.id = h.conversation_id
+                GROUP BY h.conversation_id
+                ORDER BY score
+                LIMIT ? OFFSET ?
+            """, (fts_query, fts_query, limit, offset))
+        else:
+            pattern = f"%{query.strip()}%"
+            rows = self._query("""
+                SELECT c.id, c.title, c.created_at, 0, MIN(m.content)
+                FROM conversations c
+                LEFT JOIN messages m ON m.conversation_id = c.id AND m.content LIKE ?
+                WHERE c.title LIKE ? OR m.id IS NOT NULL
+                GROUP BY c.id
+                ORDER BY c.created_at DESC
+                LIMIT ? OFFSET ?
+            """, (pattern, pattern, limit, offset))
+
+        return [
+            {
+                "conversation_id": conversation_id,
+                "title": title,
+                "created_at": created_at,
+                "score": score,
+                "snippet": snippet
+            }
+            for conversation_id, title, created_at, score, snippet in rows
+        ]
+
     def get_user_memories(self, source: str = 'setup') -> List[str]:
         print_log(f"FETCHING user memories with source={source}", "green")
-        cursor = self.conn.execute(
+        rows = self._query(
             "SELECT memory FROM user_memories WHERE source = ?", (source,)
         )
-        return [row[0] for row in cursor.fetchall()]
-    
+        return [row[0] for row in rows]
+
+    def get_all_user_memories(self) -> List[Tuple[str, str]]:
+        """Every user memory as (memory, source), oldest first."""
+        print_log(f"FETCHING all user memories", "green")
+        return self._query("SELECT memory, source FROM user_memories ORDER BY id")
+
+    def count_user_memories(self, source: Optional[str] = 'setup') -> int:
+        """Number of user memories with the given source, or of all of them when source is None."""
+        if source is None:
+            rows = self._query("SELECT COUNT(*) FROM user_memories")
+        else:
+            rows = self._query("SELECT COUNT(*) FROM user_memories WHERE source = ?", (source,))
+        return rows[0][0]
+
     def add_user_memory(self, memory: str, source: str = 'setup'):
         print_log(f"INSERTING new user memory into DB with source={source}", "green")
-        self.conn.execute(
+        self._write(
             "INSERT INTO user_memories (memory, source) VALUES (?, ?)",
             (memory, source)
         )
-        self.conn.commit()
-    
+
+    def flush(self) -> None:
+        """Block until every write queued so far is committed."""
+        if self.closed:
+            return
+        self._wait(self._submit("flush", None))
+
     def close(self):
-        self.conn.close()
+        """Commit pending writes and stop the writer thread."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.writer.join(timeout=10)
@@ -3,9 +3,11 @@ import threading
 import logging
 from config import Config
 from audio_processing.recorder import AudioRecorder
-from audio_processing.wake_word import WakeWordDetector
+from audio_processing.capture import AudioCaptureService, create_input_device
+from audio_processing.wake_word import ACKNOWLEDGEMENTS, WakeWordDetector
+from audio_processing.keyword_detector import create_detector
 from audio_processing.tts import TTSWorker
-from nlp.whisper_transcriber import WhisperTranscriber
+from nlp.transcription import create_transcriber
 from nlp.llm_processor import LLMProcessor
 from utils.colors import colors
 from utils.log import print_log
@@ -13,6 +15,7 @@ from animation.opengl_animation import OpenGLAnimation
 from nlp.user_memory_manager import UserMemoryManager
 from nlp.api_client import OpenAIClient
 from nlp.memory import Memory
+from orchestrator import NO_SPEECH_REPLY, TurnOrchestrator
 
 # Configure logging
 logging.basicConfig(
@@ -28,91 +31,57 @@ logger = logging.getLogger(__name__)
 
 def voice_chat_loop(opengl_animation):
     logger.info("Starting voice chat loop")
-    
-    def record_and_transcribe():
-        opengl_animation.set_state("listening", True)
-        audio_file = recorder.record_audio()
-        transcribed_text = whisper_transcriber.transcribe(audio_file)
-        opengl_animation.set_state("listening", False)
-
-        if not transcribed_text or len(transcribed_text.strip()) < 3:
-            logger.warning("No or too short transcription detected")
-            tts_worker.speak("I didn't hear anything.")
-            return False
-
-        opengl_animation.set_state("thinking", True)
-        logger.info(f"Transcribed text: {transcribed_text}")
-        return transcribed_text
 
+    # Cleaned up below, whichever of them got created
+    capture = memory = tts_worker = None
     try:
         # Initialize components inside the thread
-        recorder = AudioRecorder()
-        tts_worker = TTSWorker("HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Speech\\Voices\\Tokens\\TTS_MS_EN-US_ZIRA_11.0")
-        wake_word_detector = WakeWordDetector(Config.PICOVOICE_ACCESS_KEY, ["wake_words/hey-camille.ppn", "wake_words/camille-stop.ppn", "wake_words/new-conversation.ppn"], tts_worker)
-        whisper_transcriber = WhisperTranscriber()
+        capture = AudioCaptureService(
+            create_input_device(Config.AUDIO_SAMPLE_RATE, Config.AUDIO_CAPTURE_CHUNK),
+            rate=Config.AUDIO_SAMPLE_RATE,
+            buffer_seconds=Config.AUDIO_BUFFER_SECONDS
+        )
+        capture.start()
+        recorder = AudioRecorder(capture)
+        tts_worker = TTSWorker(
+            "HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Speech\\Voices\\Tokens\\TTS_MS_EN-US_ZIRA_11.0",
+            prerender=[*ACKNOWLEDGEMENTS.values(), NO_SPEECH_REPLY]
+        )
+        wake_word_detector = WakeWordDetector(create_detector(Config.WAKE_WORD_PATHS), capture)
+        transcriber = create_transcriber()
         api_client = OpenAIClient(
             model=Config.MODEL_NAME,
             api_base=Config.OPENAI_API_BASE,
-            api_key=Config.OPENAI_KEY
+            api_key=Config.OPENAI_KEY,
+            connect_timeout=Config.OPENAI_CONNECT_TIMEOUT,
+            read_timeout=Config.OPENAI_READ_TIMEOUT
         )
         memory = Memory(api_client)
         memory_manager = UserMemoryManager(memory.db)
         llm_processor = LLMProcessor(Config.AI_NAME, Config.USER_NAME, api_client, memory, memory_manager)
-        tts_worker.start()
-        time.sleep(3) # Await TTS Worker startup
+        if Config.WARM_UP_PROMPT_CACHE:
+            threading.Thread(target=llm_processor.warm_up, name="PromptWarmUp", daemon=True).start()
+        if Config.BROWSER_POOL_PREWARM:
+            from utils.browser_pool import get_browser_pool
+            # In the background, independent of when the (lazily imported) browsing tool loads
+            get_browser_pool().warm_up()
+        orchestrator = TurnOrchestrator(
+            wake_word_detector, recorder, transcriber, llm_processor, tts_worker, memory_manager, opengl_animation
+        )
+        orchestrator.start()
         logger.info("All voice chat components initialized")
-        opengl_animation.set_state("waiting", True)
-
-        while opengl_animation.running:
-            if memory_manager.needs_setup():
-                print_log("Running user memory setup", "cyan")
-                tts_worker.speak("Hey! I wil ask you a few questions to get to know you better.")
-                time.sleep(5) # sleeping to await tts to finish asking question
-                for question in memory_manager.get_setup_questions():
-                    print_log(f"Asking: {question.question}", "cyan")
-                    tts_worker.speak(f"Answer the following: {question.question}")
-                    time.sleep(2) # sleeping to await tts to finish asking question
-                    setup_answer = record_and_transcribe()
-                    if setup_answer:
-                        print_log(f"User answered: {setup_answer}", "cyan")
-                        memory_manager.save_setup_question(question, setup_answer)
-                
-                # Update system prompt with new user memories
-                llm_processor._initialize_system_prompt()
-                print_log("User memory setup complete", "cyan")
-            
-            wake_word_result = wake_word_detector.listen_for_wake_phrase()
-            if wake_word_result == "start_listening":
-                logger.info("Wake word detected")
-                transcribed_text = record_and_transcribe()
-                
-                if not transcribed_text:
-                    continue # Skip processing if no transcription
-                
-                response = llm_processor.process_input(transcribed_text)
-                opengl_animation.set_state("thinking", False)
-                logger.info(f"LLM response: {response}")
-                tts_worker.speak(response)
-            elif wake_word_result == "stop_speaking":
-                continue
-            elif wake_word_result == "new_conversation":
-                llm_processor.clear_memory()
-                continue
-            
-            # Check for state changes from TTS worker
-            if tts_worker.state_event.is_set():
-                logger.info(f"TTSWorker sent a State Event change: {tts_worker.state_dict}")
-                opengl_animation.set_state("speaking", tts_worker.state_dict["speaking"])
-                tts_worker.state_event.clear()
-
-            time.sleep(0.1)
+        orchestrator.run(lambda: opengl_animation.running)
 
     except Exception as e:
         logger.error(f"Error in voice chat loop: {str(e)}", exc_info=True)
     finally:
-        if recorder:
-             recorder.audio.terminate()
-        tts_worker.stop()
+        if capture:
+            capture.stop()
+        if memory:
+            memory.title_worker.stop()
+            memory.db.close()
+        if tts_worker:
+            tts_worker.stop()
         logger.info("Voice chat thread stopped")
 
 def main():
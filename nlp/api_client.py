@@ -1,48 +1,295 @@
+import json
 import logging
-from typing import List, Dict, Optional, Any
+import time
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any, Iterator
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from utils.log import print_log
 from nlp.types import Tool
+from nlp.streaming import SentenceAssembler, StreamAccumulator, SentenceCallback
 
 logger = logging.getLogger(__name__)
 
 class OpenAIClient:
-    def __init__(self, model: str, api_base: str, api_key: str):
+    def __init__(
+        self,
+        model: str,
+        api_base: str,
+        api_key: str,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        pool_size: int = 4
+    ):
         self.model = model
         self.api_base = api_base
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
+        self.timeout = (connect_timeout, read_timeout)
 
-    def get_completion(
-        self, 
-        messages: List[Dict[str, str]], 
-        tools: Optional[List[Tool]] = None,
-        temperature: float = 0.7
+        # A single session keeps connections to the backend alive between requests
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.active_requests = 0
+        self.idle = threading.Condition()  # Notified when the last request in flight ends
+        self.last_metrics: Dict[str, Any] = {}
+
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Tool]],
+        temperature: float,
+        stream: bool = False,
+        max_tokens: Optional[int] = None
     ) -> Dict[str, Any]:
-        try:
-            print_log(f"Sending completion request to OpenAI API: {messages}", "magenta")
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature
+        }
+
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+
+        if tools:
+            payload["tools"] = tools
+            payload["tool_choice"] = "auto"
+
+        if stream:
+            payload["stream"] = True
+
+        return payload
+
+    @staticmethod
+    def _response_metrics(data: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+        """
+        Prefill figures reported by the backend: OpenAI-style cached prompt tokens
+        and llama.cpp-style `timings`, when present.
+        """
+        usage = data.get("usage") or {}
+        timings = data.get("timings") or {}
+        return {
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", timings.get("cache_n")),
+            "prompt_ms": timings.get("prompt_ms")
+        }
+
+    @staticmethod
+    def _encode_payload(payload: Dict[str, Any]) -> bytes:
+        """
+        Serialize the request body. Tool schema lists that carry their own
+        serialization (see `SerializedSchemas`) are spliced in as-is.
+        """
+        tools = payload.get("tools")
+        serialized_tools = getattr(tools, "serialized", None)
+        if serialized_tools is None:
+            return json.dumps(payload).encode("utf-8")
+        body = json.dumps({key: value for key, value in payload.items() if key != "tools"})
+        return f'{body[:-1]}, "tools": {serialized_tools}}}'.encode("utf-8")
+
+    @staticmethod
+    def _parse_sse_line(line: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Parse one server-sent event line into the choices it carries. Returns an
+        empty list for lines without data and None for the `[DONE]` terminator.
+        """
+        if not line or not line.startswith("data:"):
+            return []
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        chunk = json.loads(data)
+        return [
+            {
+                "delta": choice.get("delta") or {},
+                "finish_reason": choice.get("finish_reason")
             }
-            
-            if tools:
-                payload["tools"] = tools
-                payload["tool_choice"] = "auto"
-            
-            response = requests.post(
+            for choice in chunk.get("choices", [])
+        ]
+
+    @contextmanager
+    def _track_request(self):
+        with self.idle:
+            self.active_requests += 1
+        try:
+            yield
+        finally:
+            with self.idle:
+                self.active_requests -= 1
+                if not self.active_requests:
+                    self.idle.notify_all()
+
+    def is_busy(self) -> bool:
+        """Whether a completion request is currently in flight."""
+        return self.active_requests > 0
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no completion request is in flight; False on timeout."""
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.active_requests, timeout)
+
+    def _post(self, payload: Dict[str, Any], cancelled: Optional[threading.Event] = None) -> Optional[requests.Response]:
+        """
+        Send a completion request and return the response once its headers
+        arrive; the body is left unread.
+
+        With `cancelled` the request is sent from a helper thread so waiting for
+        the first byte can be abandoned: None is returned as soon as `cancelled`
+        is set, and the response is closed whenever it arrives.
+        """
+        def send() -> requests.Response:
+            return self.session.post(
                 f"{self.api_base}/chat/completions",
-                headers=self.headers,
-                json=payload,
-                timeout=30
+                data=self._encode_payload(payload),
+                timeout=self.timeout,
+                stream=True
             )
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]
-            
+
+        if cancelled is None:
+            return send()
+
+        lock = threading.Lock()
+        done = threading.Event()
+        outcome: Dict[str, Any] = {}
+
+        def run() -> None:
+            try:
+                response = send()
+            except Exception as e:
+                outcome["error"] = e
+            else:
+                with lock:
+                    if outcome.get("abandoned"):
+                        response.close()
+                    else:
+                        outcome["response"] = response
+            finally:
+                done.set()
+
+        threading.Thread(target=run, name="CompletionRequest", daemon=True).start()
+        while not done.wait(0.05):
+            if cancelled.is_set():
+                with lock:
+                    outcome["abandoned"] = True
+                    response = outcome.pop("response", None)
+                if response is not None:
+                    response.close()
+                return None
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["response"]
+
+    def get_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Tool]] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Request a completion and return the assistant message. If `cancelled` is
+        set before the response arrives, the request is dropped and an empty
+        message is returned.
+        """
+        try:
+            print_log(f"Sending completion request to OpenAI API ({len(messages)} messages): {messages[-1] if messages else ''}", "magenta")
+            payload = self._build_payload(messages, tools, temperature, max_tokens=max_tokens)
+
+            with self._track_request():
+                started = time.perf_counter()
+                response = self._post(payload, cancelled)
+                if response is None:
+                    print_log("Completion request cancelled", "orange")
+                    return {"role": "assistant", "content": ""}
+                with response:
+                    response.raise_for_status()
+                    data = response.json()
+                self.last_metrics = self._response_metrics(data, time.perf_counter() - started)
+                return data["choices"][0]["message"]
+
         except RequestException as e:
             logger.error(f"API request failed: {e}")
             raise
+
+    def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Tool]] = None,
+        temperature: float = 0.7,
+        cancelled: Optional[threading.Event] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Request a completion with `stream: true` and yield each choice of the
+        server-sent `chat.completion.chunk` events as it arrives.
+
+        Every yielded item has a `delta` dict and an optional `finish_reason`.
+        Once `cancelled` is set the stream ends at the next event, or right away
+        while still waiting for the first byte, and the connection is closed, so
+        the backend stops generating.
+        """
+        try:
+            print_log(f"Sending streaming completion request to OpenAI API ({len(messages)} messages): {messages[-1] if messages else ''}", "magenta")
+            payload = self._build_payload(messages, tools, temperature, stream=True)
+
+            started = time.perf_counter()
+            first_token_at = None
+            with self._track_request():
+                response = self._post(payload, cancelled)
+                if response is None:
+                    print_log("Streaming completion cancelled before the first byte", "orange")
+                    return
+                with response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        if cancelled is not None and cancelled.is_set():
+                            print_log("Streaming completion cancelled", "orange")
+                            break
+                        choices = self._parse_sse_line(line)
+                        if choices is None:
+                            break
+                        if choices and first_token_at is None:
+                            # Time to first token is dominated by prompt prefill
+                            first_token_at = time.perf_counter()
+                        yield from choices
+
+            self.last_metrics = {
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                "first_token_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None
+            }
+
+        except RequestException as e:
+            logger.error(f"API streaming request failed: {e}")
+            raise
+
+    def get_streamed_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Tool]] = None,
+        temperature: float = 0.7,
+        on_sentence: Optional[SentenceCallback] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Stream a completion, passing each complete sentence to `on_sentence` as
+        soon as it is available, and return the assembled message in the same
+        shape as `get_completion`. If `cancelled` is set meanwhile, the message
+        holds what was received until then.
+        """
+        accumulator = StreamAccumulator(SentenceAssembler(on_sentence) if on_sentence else None)
+        for choice in self.stream_completion(messages, tools=tools, temperature=temperature, cancelled=cancelled):
+            accumulator.add(choice["delta"], choice["finish_reason"])
+        return accumulator.message()
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
@@ -0,0 +1,191 @@
+import threading
+from typing import List, Optional, Tuple
+from .types import Message
+from utils.log import print_log
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below between the user and the assistant in at most {words} words. "
+    "Keep names, facts, preferences, decisions and open questions, drop small talk. "
+    "If a previous summary is given, merge it into the new one. Respond with only the summary."
+)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Cheap token estimate (~4 characters per token) plus per-message overhead."""
+    return len(text or "") // 4 + 4
+
+
+class ContextWindow:
+    """
+    Keeps the prompt sent to the LLM within a token budget.
+
+    The prompt is made of the system prompt, a rolling summary of older turns and
+    the recent turns from `window_start` on. When the unsummarized turns grow past
+    `summarize_at` of their share of the budget, the oldest of them are summarized
+    on a background thread once the LLM is idle, and the summary is stored in the
+    database. Until then, turns that don't fit are left out, so the prompt size
+    stays flat however long the conversation runs.
+
+    The window start only moves when the budget is exceeded, and then jumps far
+    enough to leave half the budget free. Between jumps every request starts with
+    the same messages, so the backend can reuse its KV cache for that prefix.
+    """
+
+    def __init__(self, memory, budget: int = 3000, summary_tokens: int = 300, summarize_at: float = 0.75):
+        self.memory = memory
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.summarize_at = summarize_at
+        self.summary: Optional[str] = None
+        self.summarized_until = 0  # Index in memory.messages of the first unsummarized message
+        self.window_start = 0  # Index in memory.messages of the first message sent
+        self.summarizing = False
+        self.lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.summary = None
+            self.summarized_until = 0
+            self.window_start = 0
+
+    def restore(self, summary: Optional[str], summarized_until: int) -> None:
+        with self.lock:
+            self.summary = summary
+            self.summarized_until = summarized_until
+            self.window_start = summarized_until
+
+    def shift(self, count: int) -> None:
+        """Account for `count` older messages inserted at the start of the history."""
+        with self.lock:
+            self.summarized_until += count
+            self.window_start += count
+
+    def _recent_budget(self, reserved_tokens: int) -> int:
+        return max(self.budget - reserved_tokens - self.summary_tokens, 0)
+
+    @staticmethod
+    def _align_to_turn(messages: List[Message], start: int, end: int) -> int:
+        """Move `start` forward to the next user message so tool calls aren't split from their results."""
+        while start < end and messages[start].role != "user":
+            start += 1
+        return start
+
+    def _cut(self, messages: List[Message], first: int, budget: float) -> int:
+        """Earliest index from which the messages up to the end fit in `budget`, aligned to a turn."""
+        start = len(messages)
+        used = 0
+        while start > first:
+            tokens = messages[start - 1].tokens
+            if used + tokens > budget and start < len(messages):
+                break
+            used += tokens
+            start -= 1
+
+        if start > first:
+            aligned = self._align_to_turn(messages, start, len(messages))
+            if aligned < len(messages):
+                return aligned
+            # The cut falls inside the current turn, keep that whole turn
+            while start > first and messages[start].role != "user":
+                start -= 1
+        return start
+
+    def select(self, messages: List[Message], reserved_tokens: int = 0) -> Tuple[Optional[str], int]:
+        """
+        Return (summary, start) so that `messages[start:]` plus the summary and
+        `reserved_tokens` (the system prompt) fit in the budget.
+        """
+        with self.lock:
+            summary = self.summary
+            start = min(max(self.window_start, self.summarized_until), len(messages))
+
+        budget = self._recent_budget(reserved_tokens)
+        if sum(message.tokens for message in messages[start:]) > budget:
+            start = self._cut(messages, start, budget / 2)
+            with self.lock:
+                self.window_start = start
+        return summary, start
+
+    def maybe_summarize(self, messages: List[Message], reserved_tokens: int = 0) -> None:
+        """Start summarizing older turns in the background if the recent turns outgrew their share."""
+        with self.lock:
+            if self.summarizing:
+                return
+            first = self.summarized_until
+
+        budget = self._recent_budget(reserved_tokens)
+        if sum(message.tokens for message in messages[first:]) <= budget * self.summarize_at:
+            return
+
+        # Summarize up to where the window will jump next, keeping the newest half of the budget
+        split = self._cut(messages, first, budget / 2)
+        if split <= first or split >= len(messages):
+            # Never summarize away the latest turn
+            return
+
+        with self.lock:
+            self.summarizing = True
+        thread = threading.Thread(
+            target=self._summarize,
+            args=(self.memory.current_conversation_id, list(messages[first:split]), split),
+            name="ContextSummarizer",
+            daemon=True
+        )
+        thread.start()
+
+    def _wait_for_idle_llm(self, max_wait: float = 30.0) -> bool:
+        wait_until_idle = getattr(self.memory.api_client, "wait_until_idle", None)
+        return wait_until_idle(max_wait) if wait_until_idle else True
+
+    @staticmethod
+    def _transcript(messages: List[Message]) -> str:
+        lines = []
+        for message in messages:
+            if message.role == "assistant" and message.function_call:
+                lines.append(f"Assistant called {message.function_call['name']}({message.function_call['arguments']})")
+            elif message.role == "tool":
+                name = message.function_call["name"] if message.function_call else "tool"
+                lines.append(f"Tool {name} returned: {(message.content or '')[:500]}")
+            else:
+                lines.append(f"{message.role.capitalize()}: {message.content}")
+        return "\n".join(lines)
+
+    def _summarize(self, conversation_id: str, span: List[Message], split: int) -> None:
+        try:
+            if not self._wait_for_idle_llm():
+                print_log("LLM busy, postponing conversation summary", "orange")
+                return
+
+            with self.lock:
+                previous = self.summary
+            transcript = self._transcript(span)
+            if previous:
+                transcript = f"Previous summary: {previous}\n\n{transcript}"
+
+            print_log(f"Summarizing {len(span)} older messages", "magenta")
+            response = self.memory.api_client.get_completion(
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT.format(words=int(self.summary_tokens * 0.7))},
+                    {"role": "user", "content": transcript}
+                ],
+                temperature=0.3
+            )
+            summary = (response.get("content") or "").strip()
+            if not summary:
+                return
+
+            # The conversation may have been cleared meanwhile
+            if conversation_id != self.memory.current_conversation_id:
+                return
+            with self.lock:
+                self.summary = summary
+                self.summarized_until = split
+                self.window_start = max(self.window_start, split)
+            # The index is only valid in memory, the stored summary refers to the message id
+            self.memory.db.add_conversation_summary(conversation_id, summary, span[-1].id)
+            print_log(f"Conversation summary updated: {summary}", "magenta")
+        except Exception as e:
+            print_log(f"Error summarizing conversation: {e}", "red")
+        finally:
+            with self.lock:
+                self.summarizing = False
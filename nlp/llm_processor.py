@@ -1,12 +1,15 @@
 import json
 import logging
+import threading
 from typing import Dict, Optional, List, Any
 from .memory import Memory
-from .tool import Tool
-from .types import ToolFunc
+from .tool import Tool, ToolRegistry, ToolArgumentError
+from .tool_executor import ToolExecutor, ToolInvocation
+from .types import ToolFunc, ToolError
 from .prompts import get_system_prompt
 from .api_client import OpenAIClient
-from tools import get_all_tools
+from .streaming import SentenceCallback
+from tools import get_all_tools, get_tool_options
 from config import Config
 from utils.colors import colors
 from utils.log import print_log
@@ -15,13 +18,22 @@ from nlp.user_memory_manager import UserMemoryManager
 logger = logging.getLogger(__name__)
 
 class LLMProcessor:
-    def __init__(self, ai_name: str, user_name: str, api_client: OpenAIClient, memory: Memory, memory_manager: UserMemoryManager):
+    def __init__(
+        self,
+        ai_name: str,
+        user_name: str,
+        api_client: OpenAIClient,
+        memory: Memory,
+        memory_manager: UserMemoryManager
+    ):
         self.ai_name = ai_name
         self.user_name = user_name
-        self.tools: Dict[str, Tool] = {}
+        self.tools = ToolRegistry()
         self.api_client = api_client
+        self.tool_executor = ToolExecutor(default_timeout=Config.TOOL_TIMEOUT)
         self.memory = memory
         self.memory_manager = memory_manager
+        self.relevant_memories: List[str] = []  # Retrieved for the current turn only
         
         self._register_tools()
         self._initialize_system_prompt()
@@ -32,88 +44,219 @@ class LLMProcessor:
         user_memories = "\n".join(memories) if memories else ""
         
         self.system_prompt = get_system_prompt(self.ai_name, f"Use this information to refer to the user:\n{user_memories}")
-        self.memory.add_message("system", self.system_prompt)
+        # Replaces the previous system prompt instead of adding a second one
+        self.memory.set_system_prompt(self.system_prompt)
 
-    def register_tool(self, func: ToolFunc, name: Optional[str] = None, description: Optional[str] = None):
+    def _retrieve_memories(self, input_text: str) -> None:
+        """Look up the memories relevant to this turn; setup memories are already in the system prompt."""
+        self.relevant_memories = self.memory_manager.get_relevant_memories(
+            input_text,
+            k=Config.MEMORY_TOP_K,
+            sources=["conversation"]
+        )
+        if self.relevant_memories:
+            print_log(f"Relevant user memories: {self.relevant_memories}", "cyan")
+
+    def _turn_messages(self) -> List[Dict[str, str]]:
+        """
+        Messages for the current request. The retrieved memories go in a transient
+        system message right before the latest user message, so the cached prefix
+        (system prompt and earlier turns) is not disturbed.
+        """
+        messages = self.memory.get_messages()
+        if not self.relevant_memories:
+            return messages
+        last_user = next((index for index in range(len(messages) - 1, -1, -1) if messages[index]["role"] == "user"), len(messages))
+        note = {
+            "role": "system",
+            "content": "Things the user told you before that may be relevant:\n" + "\n".join(self.relevant_memories)
+        }
+        return messages[:last_user] + [note] + messages[last_user:]
+
+    def register_tool(self, func: ToolFunc, name: Optional[str] = None, description: Optional[str] = None, timeout: Optional[float] = None):
         tool_name = name or func.__name__
         tool_description = description or func.__doc__ or "No description available"
-        self.tools[tool_name] = Tool(func, tool_name, tool_description)
+        self.tools.register(Tool(func, tool_name, tool_description, timeout=timeout))
         return func
     
     def _register_tools(self):
         try:
             print(f"{colors['yellow']}Registering tools: {get_all_tools().items()}{colors['reset']}")
             for name, func in get_all_tools().items():
-                self.register_tool(func, name=name)
+                self.register_tool(func, name=name, timeout=get_tool_options(name).get("timeout"))
         except Exception as e:
             logger.error(f"Failed to register tools: {e}")
             raise
 
     def _get_openai_tools(self) -> List[Dict[str, Any]]:
-        return [tool.to_openai_schema() for tool in self.tools.values()]
+        return self.tools.schemas()
 
-    def _handle_tool_call(self, response: Dict[str, Any]) -> str:
-        try:
-            # If no tool calls, return the content directly
-            if "tool_calls" not in response:
-                return response.get("content", "I apologize, but I couldn't process that request.")
+    @staticmethod
+    def _is_cancelled(cancelled: Optional[threading.Event]) -> bool:
+        return cancelled is not None and cancelled.is_set()
 
-            # Handle tool calls
-            tool_calls = response.get("tool_calls", [])
-            if not tool_calls:
-                return response.get("content", "I apologize, but I couldn't process that request.")
+    def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        on_sentence: Optional[SentenceCallback] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """Request a completion, streaming sentences to `on_sentence` when one is given."""
+        if on_sentence:
+            return self.api_client.get_streamed_completion(
+                messages,
+                tools=self._get_openai_tools(),
+                on_sentence=on_sentence,
+                cancelled=cancelled
+            )
+        return self.api_client.get_completion(
+            messages,
+            tools=self._get_openai_tools(),
+            cancelled=cancelled
+        )
 
-            # Process each tool call
-            for tool_call in tool_calls:
-                if tool_call["type"] != "function":
-                    continue
+    def _run_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Run the requested tools concurrently and add their results to memory in
+        the original call order.
+        Returns a reply for the user if a tool can't be called, otherwise None.
+        """
+        calls = []
+        results: List[Optional[str]] = []
+        for tool_call in tool_calls:
+            if tool_call["type"] != "function":
+                continue
 
-                function_call = tool_call["function"]
-                tool_name = function_call["name"]
-                tool_args = json.loads(function_call["arguments"])
+            function_call = tool_call["function"]
+            tool_name = function_call["name"]
 
-                if tool_name not in self.tools:
-                    return f"I apologize, but I don't have access to the {tool_name} tool."
+            if tool_name not in self.tools:
+                return f"I apologize, but I don't have access to the {tool_name} tool."
 
-                print_log(f"Calling tool {tool_name} with args {tool_args}", "yellow")
-                tool_result = self.tools[tool_name](**tool_args)
+            # Reject bad arguments up front and let the model see why, instead of
+            # spending a slow tool call on them
+            tool = self.tools[tool_name]
+            # The arguments as sent: decoded if they are valid JSON, the raw string otherwise
+            raw_args: Any = function_call["arguments"] or "{}"
+            try:
+                raw_args = json.loads(raw_args)
+                tool_args = tool.validate_arguments(raw_args)
+            except (ValueError, ToolArgumentError) as e:
+                print_log(f"Invalid arguments for tool {tool_name}: {e}", "red")
+                # Stored with the error, so the model sees what it sent
+                calls.append((tool_call, ToolInvocation(tool, raw_args)))
+                results.append(ToolError(f"Invalid arguments for {tool_name}: {e}"))
+                continue
 
-                # Add tool result to memory
-                self.memory.add_message(
-                    "tool", 
-                    json.dumps({
-                        "tool_call_id": tool_call["id"],
-                        "name": tool_name,
-                        "result": tool_result,
-                        "arguments": tool_args
-                    })
-                )
+            print_log(f"Calling tool {tool_name} with args {tool_args}", "yellow")
+            calls.append((tool_call, ToolInvocation(tool, tool_args)))
+            results.append(None)
 
-            # Get new response from LLM with tool results
-            messages = self.memory.get_messages()
-            final_response = self.api_client.get_completion(
-                messages, 
-                tools=self._get_openai_tools()
+        pending = [index for index, result in enumerate(results) if result is None]
+        for index, result in zip(pending, self.tool_executor.run([calls[index][1] for index in pending])):
+            results[index] = result
+
+        for (tool_call, invocation), tool_result in zip(calls, results):
+            # Add tool result to memory
+            self.memory.add_message(
+                "tool", 
+                json.dumps({
+                    "tool_call_id": tool_call["id"],
+                    "name": invocation.tool.name,
+                    "result": tool_result,
+                    "arguments": invocation.arguments
+                })
             )
+        return None
+
+    def _handle_tool_call(
+        self,
+        response: Dict[str, Any],
+        on_sentence: Optional[SentenceCallback] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> str:
+        try:
+            # If no tool calls, return the content directly
+            tool_calls = response.get("tool_calls")
+            if not tool_calls:
+                return response.get("content", "I apologize, but I couldn't process that request.")
+
+            # The calls of a cancelled stream may be incomplete
+            if self._is_cancelled(cancelled):
+                return ""
+            tool_error = self._run_tool_calls(tool_calls)
+            if tool_error:
+                return tool_error
+
+            if self._is_cancelled(cancelled):
+                return ""
+            # Get new response from LLM with tool results
+            messages = self._turn_messages()
+            final_response = self._complete(messages, on_sentence, cancelled)
             return final_response.get("content", "I apologize, but I couldn't process the tool results.")
 
         except Exception as e:
             logger.error(f"Tool call failed: {e}")
             return f"I encountered an error while trying to help you: {str(e)}"
 
-    def process_input(self, input_text: str) -> str:
+    def process_input(
+        self,
+        input_text: str,
+        on_sentence: Optional[SentenceCallback] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> str:
+        """
+        Answer the user's input, running any requested tools.
+
+        When `on_sentence` is given the completions are streamed and every sentence
+        is handed to it as soon as it is complete; the full reply is still returned
+        and stored in memory once.
+
+        Setting `cancelled` stops the reply: the streamed request is dropped, no
+        further tools or sentences follow, and only what was already spoken is
+        returned and stored.
+        """
+        spoken: List[str] = []
+
+        def speak(sentence: str) -> None:
+            if self._is_cancelled(cancelled):
+                return
+            spoken.append(sentence)
+            on_sentence(sentence)
+
         self.memory.add_message("user", input_text)
-        messages = self.memory.get_messages()
+        self._retrieve_memories(input_text)
+        messages = self._turn_messages()
         
-        response = self.api_client.get_completion(
-            messages, 
-            tools=self._get_openai_tools()
-        )
-        final_response = self._handle_tool_call(response)
+        response = self._complete(messages, speak if on_sentence else None, cancelled)
+        final_response = self._handle_tool_call(response, speak if on_sentence else None, cancelled)
+
+        if self._is_cancelled(cancelled):
+            final_response = " ".join(spoken)
+            if not final_response:
+                return final_response
+        # Fallback and error replies are not streamed, make sure they are still heard
+        elif on_sentence and not spoken and final_response:
+            on_sentence(final_response)
         
         self.memory.add_message("assistant", final_response)
         return final_response
     
     def clear_memory(self):
         self.memory.clear()
-        self.memory.add_message("system", self.system_prompt)
+
+    def warm_up(self) -> None:
+        """
+        Send the system prompt and tool schemas once with a one-token completion,
+        so the backend already has them in its KV cache for the first real turn.
+        """
+        try:
+            print_log("Warming up the LLM prompt cache", "magenta")
+            self.api_client.get_completion(
+                self.memory.get_messages() + [{"role": "user", "content": "Hi"}],
+                tools=self._get_openai_tools(),
+                max_tokens=1
+            )
+            print_log(f"Prompt cache warm-up done: {self.api_client.last_metrics}", "magenta")
+        except Exception as e:
+            logger.error(f"Prompt cache warm-up failed: {e}")
@@ -1,46 +1,205 @@
 import json
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Any
 from .types import Message, FunctionCall
 from utils.log import print_log
 from db.database import Database
+from config import Config
+from .title_worker import TitleWorker
+from .context import ContextWindow, estimate_tokens
+
+TITLE_PROMPT = "Generate a brief, descriptive title (max 6 words) for a conversation that starts with this message, this title will be used to allow the user to find the conversation in the future and should be descriptive written from the perspective of the command that the user asked. Respond with only the title, no quotes or additional text."
 
 class Memory:
     def __init__(self, api_client):
-        self.db = Database()
+        self.db = Database(flush_interval=Config.DB_FLUSH_INTERVAL)
         self.api_client = api_client
-        self.current_conversation_id = self.db.create_conversation()
+        self.current_conversation_id: Optional[str] = None
         self.messages: List[Message] = []
+        # Request dicts for self.messages, built once per message and reused so every
+        # request shares a byte-identical prefix
+        self.serialized: List[Dict[str, str]] = []
+        self.system_message: Optional[Message] = None
+        self.system_serialized: Optional[Dict[str, str]] = None
+        self.summary_serialized: Optional[Dict[str, str]] = None
+        self.oldest_loaded_id: Optional[int] = None  # Keyset cursor for load_older_messages
         self.first_user_message = True
+        self.pending_title_message: Optional[str] = None
+        self.title_worker = TitleWorker(self, self.db, mode=Config.TITLE_GENERATION)
+        self.context = ContextWindow(
+            self,
+            budget=Config.CONTEXT_TOKEN_BUDGET,
+            summary_tokens=Config.CONTEXT_SUMMARY_TOKENS
+        )
+
+        resumed = False
+        if Config.RESUME_CONVERSATION:
+            conversation_id = None if Config.RESUME_CONVERSATION == "last" else Config.RESUME_CONVERSATION
+            resumed = self.resume(conversation_id)
+        if not resumed:
+            self.current_conversation_id = self.db.create_conversation()
     
     def start_new_conversation(self):
         print_log("Starting new conversation", "magenta")
         self.current_conversation_id = self.db.create_conversation()
         self.messages = []
+        self.serialized = []
+        self.oldest_loaded_id = None
         self.first_user_message = True
+        self.pending_title_message = None
+        self.context.reset()
+
+        # The system prompt carries over to the new conversation
+        if self.system_message:
+            self.db.add_message(self.current_conversation_id, "system", self.system_message.content)
+
+    def set_system_prompt(self, content: str) -> None:
+        """
+        Set the single system prompt sent first with every request. Setting the
+        same prompt again is a no-op, so the prompt prefix stays byte-identical.
+        It is only stored when it differs from the conversation's stored one, so
+        resuming a conversation doesn't add a system row on every start.
+        """
+        if self.system_message and self.system_message.content == content:
+            return
+        print_log(f"Setting system prompt: {content}", "magenta")
+        self.system_message = Message(role="system", content=content, tokens=estimate_tokens(content))
+        self.system_serialized = self._serialize(self.system_message)
+        if self.db.get_latest_system_prompt(self.current_conversation_id) != content:
+            self.db.add_message(self.current_conversation_id, "system", content)
     
+    def _messages_from_rows(self, rows: List[Dict[str, Any]]) -> List[Message]:
+        """Rebuild Message/FunctionCall objects from stored rows (see add_message for the format)."""
+        messages: List[Message] = []
+        for row in rows:
+            role, content = row["role"], row["content"]
+            if role == "system":
+                continue
+
+            if role == "assistant" and content and content.startswith('{"function_call"'):
+                try:
+                    call = json.loads(content)["function_call"]
+                    function_call = FunctionCall(id=call["id"], name=call["name"], arguments=call["arguments"])
+                    messages.append(Message(
+                        role="assistant",
+                        content=None,
+                        function_call=function_call,
+                        tokens=estimate_tokens(function_call["name"] + function_call["arguments"]),
+                        id=row["id"]
+                    ))
+                    continue
+                except (ValueError, KeyError):
+                    pass  # A plain reply that happens to look like JSON
+
+            if role == "tool":
+                # Stored tool rows only hold the result, the call is the preceding row
+                previous = messages[-1] if messages else None
+                if not previous or previous.role != "assistant" or not previous.function_call:
+                    continue
+                messages.append(Message(
+                    role="tool",
+                    content=content,
+                    function_call=FunctionCall(id=previous.function_call["id"], name=previous.function_call["name"], arguments=""),
+                    tokens=estimate_tokens(content),
+                    id=row["id"]
+                ))
+                continue
+
+            messages.append(Message(role=role, content=content, tokens=estimate_tokens(content), id=row["id"]))
+        return messages
+
+    def _load_page(self, limit: int, before_id: Optional[int]) -> Optional[List[Message]]:
+        """
+        Load one page of stored messages, starting at a user message so tool calls
+        aren't split from their results, and move the keyset cursor. Returns None
+        when there is nothing older left.
+        """
+        rows = self.db.get_messages_page(self.current_conversation_id, limit, before_id)
+        if not rows:
+            self.oldest_loaded_id = None
+            return None
+
+        first_turn = next((index for index, row in enumerate(rows) if row["role"] == "user"), 0)
+        if len(rows) < limit:
+            first_turn = 0  # Last page, nothing left to align with
+        rows = rows[first_turn:]
+        # Rows skipped for alignment are picked up again by the next page
+        self.oldest_loaded_id = rows[0]["id"]
+        return self._messages_from_rows(rows)
+
+    def resume(self, conversation_id: Optional[str] = None, limit: Optional[int] = None) -> bool:
+        """
+        Continue a stored conversation (the most recent one by default). Only the
+        newest `limit` messages are loaded, older ones can be paged in with
+        `load_older_messages`. Returns False if there is nothing to resume.
+        """
+        conversation_id = conversation_id or self.db.get_latest_conversation_id()
+        if not conversation_id or not self.db.conversation_exists(conversation_id):
+            print_log(f"No conversation to resume", "magenta")
+            return False
+
+        print_log(f"Resuming conversation#{conversation_id}", "magenta")
+        self.current_conversation_id = conversation_id
+        self.messages = []
+        self.serialized = []
+        for message in self._load_page(limit or Config.RESUME_MESSAGE_LIMIT, None) or []:
+            self._append(message)
+        self.first_user_message = not self.messages
+        self.pending_title_message = None
+
+        # Loaded messages the stored summary already covers stay out of the prompt
+        summary = self.db.get_latest_conversation_summary(conversation_id)
+        covered = 0
+        if summary:
+            covered = sum(1 for message in self.messages if message.id is not None and message.id <= summary["last_message_id"])
+        self.context.restore(summary["summary"] if summary else None, covered)
+        return True
+
+    def load_older_messages(self, limit: int = 50) -> List[Message]:
+        """Page in the messages before the oldest loaded one and prepend them to the history."""
+        if self.oldest_loaded_id is None:
+            return []
+        older = self._load_page(limit, self.oldest_loaded_id) or []
+        if older:
+            self.messages[:0] = older
+            self.serialized[:0] = [self._serialize(message) for message in older]
+            self.context.shift(len(older))
+        return older
+
+    def _title_messages(self, message: str) -> List[Dict[str, str]]:
+        return [{
+            "role": "system",
+            "content": TITLE_PROMPT
+        }, {
+            "role": "user",
+            "content": message
+        }]
+
     def generate_title(self, message: str) -> str:
         response = self.api_client.get_completion(
-            messages=[{
-                "role": "system",
-                "content": "Generate a brief, descriptive title (max 6 words) for a conversation that starts with this message, this title will be used to allow the user to find the conversation in the future and should be descriptive written from the perspective of the command that the user asked. Respond with only the title, no quotes or additional text."
-            }, {
-                "role": "user",
-                "content": message
-            }],
+            messages=self._title_messages(message),
             temperature=0.7
         )
         return response.get("content", "Untitled Conversation").strip()
     
+    def _append(self, message: Message) -> None:
+        self.messages.append(message)
+        self.serialized.append(self._serialize(message))
+
     def add_message(self, role: str, content: str):
+        if role == "system":
+            self.set_system_prompt(content)
+            return
+
         print_log(f"Adding message to memory: {role}: {content}", "magenta")
         
-        # Generate title on first user message
+        # The title is based on the first user message but only requested once the
+        # first answer is ready, so it never delays the reply
         if role == "user" and self.first_user_message:
-            print_log(f"Generating title for conversation", "magenta")
-            title = self.generate_title(content)
-            print_log(f"Title generated for conversation: {title}", "magenta")
-            self.db.update_conversation_title(self.current_conversation_id, title)
+            self.pending_title_message = content
             self.first_user_message = False
+        elif role == "assistant" and self.pending_title_message:
+            self.title_worker.request(self.current_conversation_id, self.pending_title_message)
+            self.pending_title_message = None
         
         if role == "tool":
             tool_data = json.loads(content)
@@ -51,9 +210,14 @@ class Memory:
                 name=tool_data["name"],
                 arguments=json.dumps(tool_data["arguments"])
             )
-            assistant_message = Message(role="assistant", content=None, function_call=function_call)
-            self.messages.append(assistant_message)
-            self.db.add_message(self.current_conversation_id, "assistant", json.dumps({
+            assistant_message = Message(
+                role="assistant",
+                content=None,
+                function_call=function_call,
+                tokens=estimate_tokens(function_call["name"] + function_call["arguments"])
+            )
+            self._append(assistant_message)
+            assistant_message.id = self.db.add_message(self.current_conversation_id, "assistant", json.dumps({
                 "function_call": {
                     "id": tool_data["tool_call_id"],
                     "name": tool_data["name"],
@@ -69,38 +233,60 @@ class Memory:
                     id=tool_data["tool_call_id"],
                     name=tool_data["name"],
                     arguments=""
-                )
+                ),
+                tokens=estimate_tokens(tool_data["result"])
             )
-            self.messages.append(function_message)
-            self.db.add_message(self.current_conversation_id, "tool", tool_data["result"])
+            self._append(function_message)
+            function_message.id = self.db.add_message(self.current_conversation_id, "tool", tool_data["result"])
         else:
-            message = Message(role=role, content=content)
-            self.messages.append(message)
-            self.db.add_message(self.current_conversation_id, role, content)
+            message = Message(role=role, content=content, tokens=estimate_tokens(content))
+            self._append(message)
+            message.id = self.db.add_message(self.current_conversation_id, role, content)
+
+        # A turn just ended, summarize older turns in the background if needed
+        if role == "assistant":
+            self.context.maybe_summarize(self.messages, self._system_tokens())
     
+    def _system_tokens(self) -> int:
+        return self.system_message.tokens if self.system_message else 0
+
+    @staticmethod
+    def _serialize(msg: Message) -> Dict[str, str]:
+        if msg.role == "assistant" and msg.function_call:
+            return {
+                "role": msg.role,
+                "content": "",
+                "function_call": {
+                    "name": msg.function_call["name"],
+                    "arguments": msg.function_call["arguments"]
+                }
+            }
+        elif msg.role == "tool":
+            return {
+                "role": msg.role,
+                "name": msg.function_call["name"] if msg.function_call else None,
+                "content": msg.content
+            }
+        return {
+            "role": msg.role,
+            "content": msg.content
+        }
+
     def get_messages(self) -> List[Dict[str, str]]:
+        """
+        Messages for the next request: the system prompt, the summary of older turns
+        and the recent turns that fit in the context window's token budget.
+        """
+        summary, start = self.context.select(self.messages, self._system_tokens())
         messages = []
-        for msg in self.messages:
-            if msg.role == "assistant" and msg.function_call:
-                messages.append({
-                    "role": msg.role,
-                    "content": "",
-                    "function_call": {
-                        "name": msg.function_call["name"],
-                        "arguments": msg.function_call["arguments"]
-                    }
-                })
-            elif msg.role == "tool":
-                messages.append({
-                    "role": msg.role,
-                    "name": msg.function_call["name"] if msg.function_call else None,
-                    "content": msg.content
-                })
-            else:
-                messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
+        if self.system_message:
+            messages.append(self.system_serialized)
+        if summary:
+            content = f"Summary of the earlier conversation: {summary}"
+            if not self.summary_serialized or self.summary_serialized["content"] != content:
+                self.summary_serialized = {"role": "system", "content": content}
+            messages.append(self.summary_serialized)
+        messages.extend(self.serialized[start:])
         return messages
     
     def clear(self):
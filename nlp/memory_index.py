@@ -0,0 +1,168 @@
+import re
+import json
+import time
+import zlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterable
+import numpy as np
+from utils.log import print_log
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+STOP_WORDS = {
+    "a", "an", "the", "i", "me", "my", "you", "your", "is", "am", "are", "was", "be", "do",
+    "does", "did", "what", "which", "who", "where", "when", "how", "in", "on", "at", "to",
+    "of", "for", "and", "or", "it", "that", "this", "with", "as", "about", "can", "please"
+}
+
+
+def hash_embed(text: str, dim: int = 256) -> np.ndarray:
+    """
+    Local embedding: a signed hashing vectorizer over word unigrams and bigrams,
+    L2-normalized. Deterministic across processes (crc32, not the salted hash()).
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    words = [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class MemoryIndex:
+    """
+    Offline similarity index over user memories.
+
+    Embeddings live in one contiguous float32 matrix (grown by doubling), with the
+    source of each row as an integer code in a parallel array, and are persisted next to the database as a raw row-major file plus a JSON-lines file
+    with the memory texts. Both are append-only, so adding a memory writes one row
+    instead of rewriting the index.
+    """
+
+    def __init__(self, path: str = "db/memory_index", dim: int = 256):
+        self.dim = dim
+        self.vectors_path = Path(f"{path}.f32")
+        self.texts_path = Path(f"{path}.jsonl")
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.count = 0
+        self.memories: List[str] = []
+        self.source_ids = np.zeros(0, dtype=np.int32)
+        self.source_codes: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> int:
+        """Load the persisted index. Returns the number of memories, or -1 if it is missing or damaged."""
+        if not self.vectors_path.exists() or not self.texts_path.exists():
+            return -1
+        try:
+            vectors = np.fromfile(self.vectors_path, dtype=np.float32)
+            entries = [json.loads(line) for line in self.texts_path.read_text(encoding="utf-8").splitlines() if line]
+            if vectors.size != len(entries) * self.dim:
+                return -1
+            with self.lock:
+                self.matrix = vectors.reshape(len(entries), self.dim).copy()
+                self.count = len(entries)
+                self.memories = [entry["memory"] for entry in entries]
+                self.source_codes = {}
+                self.source_ids = np.array([self._source_code(entry["source"]) for entry in entries], dtype=np.int32)
+            return self.count
+        except (OSError, ValueError, KeyError) as e:
+            print_log(f"Failed to load memory index: {e}", "red")
+            return -1
+
+    def rebuild(self, memories: Iterable[Tuple[str, str]]) -> None:
+        """Re-create the index (in memory and on disk) from (memory, source) pairs."""
+        with self.lock:
+            self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self.count = 0
+            self.memories = []
+            self.source_ids = np.zeros(0, dtype=np.int32)
+            self.source_codes = {}
+            self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+            self.vectors_path.write_bytes(b"")
+            self.texts_path.write_text("", encoding="utf-8")
+        for memory, source in memories:
+            self.add(memory, source)
+
+    def _source_code(self, source: str) -> int:
+        """Integer code of `source`, assigned on first use. Call with the lock held."""
+        return self.source_codes.setdefault(source, len(self.source_codes))
+
+    def add(self, memory: str, source: str = "setup") -> None:
+        vector = hash_embed(memory, self.dim)
+        with self.lock:
+            if self.count == self.matrix.shape[0]:
+                capacity = max(64, self.count * 2)
+                grown = np.zeros((capacity, self.dim), dtype=np.float32)
+                grown[:self.count] = self.matrix[:self.count]
+                self.matrix = grown
+                grown_ids = np.zeros(capacity, dtype=np.int32)
+                grown_ids[:self.count] = self.source_ids[:self.count]
+                self.source_ids = grown_ids
+            self.matrix[self.count] = vector
+            self.source_ids[self.count] = self._source_code(source)
+            self.count += 1
+            self.memories.append(memory)
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(vector.tobytes())
+            with open(self.texts_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"memory": memory, "source": source}) + "\n")
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        sources: Optional[List[str]] = None,
+        min_score: float = 0.1
+    ) -> List[Tuple[str, float]]:
+        """Return up to `k` (memory, cosine similarity) pairs most relevant to `query`."""
+        vector = hash_embed(query, self.dim)
+        with self.lock:
+            if self.count == 0:
+                return []
+            scores = self.matrix[:self.count] @ vector
+            if sources is not None:
+                codes = [self.source_codes[source] for source in sources if source in self.source_codes]
+                allowed = np.isin(self.source_ids[:self.count], codes)
+                scores = np.where(allowed, scores, -np.inf)
+            k = min(k, self.count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.memories[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+def benchmark(size: int = 100_000, queries: int = 200) -> None:
+    """
+    Report query latency over `size` synthetic memories (kept in memory, not
+    persisted), half of them from conversations, searched with the same source
+    filter LLMProcessor uses for each turn.
+    """
+    rng = np.random.default_rng(0)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    index = MemoryIndex(path="/dev/null/unused")
+    index.matrix = np.zeros((size, index.dim), dtype=np.float32)
+    index.source_ids = np.zeros(size, dtype=np.int32)
+    for i in range(size):
+        text = " ".join(rng.choice(vocabulary, 8))
+        index.matrix[i] = hash_embed(text, index.dim)
+        index.source_ids[i] = index._source_code("conversation" if i % 2 else "setup")
+        index.memories.append(text)
+    index.count = size
+
+    timings = []
+    for _ in range(queries):
+        query = " ".join(rng.choice(vocabulary, 6))
+        started = time.perf_counter()
+        index.search(query, k=5, sources=["conversation"])
+        timings.append((time.perf_counter() - started) * 1000)
+    timings = np.array(timings)
+    print(f"{size} memories: median {np.median(timings):.2f} ms, p95 {np.percentile(timings, 95):.2f} ms per query")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,120 @@
+import re
+from typing import Dict, List, Any, Optional, Callable
+
+# A sentence ends at terminal punctuation (optionally followed by closing quotes
+# or brackets) that is followed by whitespace.
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+SentenceCallback = Callable[[str], None]
+
+
+class SentenceAssembler:
+    """Collects streamed text deltas and emits complete sentences as they form."""
+
+    def __init__(self, on_sentence: Optional[SentenceCallback] = None, min_length: int = 12):
+        """
+        Args:
+            on_sentence: Called with every complete sentence.
+            min_length: Boundaries found before this many characters are skipped,
+                        which keeps things like "Hi." or "Dr." attached to what follows.
+        """
+        self.on_sentence = on_sentence
+        self.min_length = min_length
+        self.buffer = ""
+        self.sentences: List[str] = []
+
+    def feed(self, text: str) -> List[str]:
+        """Add a text delta and return the sentences it completed."""
+        self.buffer += text
+        completed = []
+        search_from = 0
+        while True:
+            match = SENTENCE_BOUNDARY.search(self.buffer, search_from)
+            if not match:
+                break
+            if match.start() < self.min_length:
+                search_from = match.end()
+                continue
+            sentence = self.buffer[:match.start()].strip()
+            self.buffer = self.buffer[match.end():]
+            search_from = 0
+            if sentence:
+                completed.append(self._emit(sentence))
+        return completed
+
+    def flush(self) -> Optional[str]:
+        """Emit whatever is left in the buffer as the final sentence."""
+        sentence = self.buffer.strip()
+        self.buffer = ""
+        if not sentence:
+            return None
+        return self._emit(sentence)
+
+    def _emit(self, sentence: str) -> str:
+        self.sentences.append(sentence)
+        if self.on_sentence:
+            self.on_sentence(sentence)
+        return sentence
+
+
+def split_sentences(text: str, min_length: int = 12) -> List[str]:
+    """Split a complete text into sentences, the same way streamed replies are split."""
+    assembler = SentenceAssembler(min_length=min_length)
+    sentences = assembler.feed(text)
+    last = assembler.flush()
+    return sentences + [last] if last else sentences
+
+
+class StreamAccumulator:
+    """
+    Rebuilds a complete assistant message from streamed `chat.completion.chunk`
+    deltas, so the result has the same shape as a non-streamed response message.
+    """
+
+    def __init__(self, assembler: Optional[SentenceAssembler] = None):
+        self.assembler = assembler
+        self.content_parts: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.finish_reason: Optional[str] = None
+
+    def add(self, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> None:
+        content = delta.get("content")
+        if content:
+            self.content_parts.append(content)
+            if self.assembler:
+                self.assembler.feed(content)
+
+        # Tool calls arrive in fragments keyed by index: the first fragment carries
+        # the id and name, later ones append to the JSON arguments string.
+        for fragment in delta.get("tool_calls") or []:
+            index = fragment.get("index", len(self.tool_calls))
+            tool_call = self.tool_calls.setdefault(index, {
+                "id": "",
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if fragment.get("id"):
+                tool_call["id"] = fragment["id"]
+            if fragment.get("type"):
+                tool_call["type"] = fragment["type"]
+            function = fragment.get("function") or {}
+            if function.get("name"):
+                tool_call["function"]["name"] += function["name"]
+            if function.get("arguments"):
+                tool_call["function"]["arguments"] += function["arguments"]
+
+        if finish_reason:
+            self.finish_reason = finish_reason
+
+    def message(self) -> Dict[str, Any]:
+        """Return the assembled message, flushing any trailing partial sentence."""
+        if self.assembler:
+            self.assembler.flush()
+
+        message: Dict[str, Any] = {
+            "role": "assistant",
+            "content": "".join(self.content_parts)
+        }
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+        return message
@@ -0,0 +1,203 @@
+import re
+import sys
+import json
+import time
+import threading
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from utils.log import print_log
+from audio_processing.audio_utils import read_wav, resample
+from audio_processing.vad import VoiceActivityDetector, Endpointer, SPEECH_START
+from .types import TimedWord
+
+SAMPLE_RATE = 16000
+NORMALIZE_PATTERN = re.compile(r"[^a-z0-9']+")
+
+# Called with (committed text, tentative text) whenever the hypothesis changes
+PartialCallback = Callable[[str, str], None]
+
+
+def _normalize(word: str) -> str:
+    return NORMALIZE_PATTERN.sub("", word.lower())
+
+
+class StreamingTranscriber:
+    """
+    Transcribes an utterance while it is being spoken.
+
+    Every `step` seconds of new audio, a background thread decodes the audio
+    after the last committed word (with the committed text as prompt). Words that
+    two consecutive decodes agree on are committed and the audio before them is
+    dropped from the window, so each decode stays short. When the recording ends,
+    `finish` only has to decode the unfinished tail.
+
+    Works with any TranscriptionBackend, through `transcribe_words`.
+    """
+
+    def __init__(
+        self,
+        transcriber,
+        on_partial: Optional[PartialCallback] = None,
+        step: float = 1.0,
+        max_window: float = 15.0,
+        max_duration: float = 60.0
+    ):
+        self.transcriber = transcriber
+        self.on_partial = on_partial
+        self.step_samples = int(step * SAMPLE_RATE)
+        self.max_window_samples = int(max_window * SAMPLE_RATE)
+        self.buffer = np.zeros(int(max_duration * SAMPLE_RATE), dtype=np.float32)
+        self.length = 0  # Samples fed so far
+        self.offset = 0  # Start of the audio after the last committed word
+        self.decoded_until = 0  # self.length at the last decode
+        self.committed: List[TimedWord] = []
+        self.tentative: List[TimedWord] = []  # Words of the last decode that aren't committed yet
+        self.finishing = False
+        self.condition = threading.Condition()
+        self.decode_lock = threading.Lock()  # The model is used from one thread at a time
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._run, name="StreamingTranscriber", daemon=True)
+        self.thread.start()
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Add 16 kHz float32 audio of the utterance (called from the recording loop)."""
+        with self.condition:
+            end = min(self.length + samples.size, self.buffer.size)
+            self.buffer[self.length:end] = samples[:end - self.length]
+            self.length = end
+            self.condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.finishing or self.length - self.decoded_until >= self.step_samples
+                )
+                if self.finishing:
+                    return
+            try:
+                self._decode_step()
+            except Exception as e:
+                print_log(f"Streaming transcription step failed: {e}", "red")
+                return
+
+    def _window(self) -> Tuple[np.ndarray, float, str]:
+        with self.condition:
+            audio = self.buffer[self.offset:self.length].copy()
+            self.decoded_until = self.length
+            return audio, self.offset / SAMPLE_RATE, self.text(self.committed)
+
+    def _decode(self) -> List[TimedWord]:
+        """Decode the audio after the last commit, with times relative to the utterance start."""
+        audio, start, prompt = self._window()
+        with self.decode_lock:
+            words = self.transcriber.transcribe_words(audio, prompt)
+        last_end = self.committed[-1][2] if self.committed else 0.0
+        # Words the window cut in half at its start were committed already
+        return [(word, start + begin, start + end) for word, begin, end in words if start + end > last_end + 0.05]
+
+    def _decode_step(self) -> None:
+        words = self._decode()
+
+        agreed = 0
+        while (
+            agreed < min(len(words), len(self.tentative))
+            and _normalize(words[agreed][0]) == _normalize(self.tentative[agreed][0])
+        ):
+            agreed += 1
+
+        # A window that keeps growing without agreement is committed anyway, but
+        # the last words stay open since they may still change
+        if not agreed and self.length - self.offset > self.max_window_samples:
+            agreed = max(len(words) - 2, 0)
+
+        if agreed:
+            self.committed.extend(words[:agreed])
+            with self.condition:
+                self.offset = max(self.offset, int(words[agreed - 1][2] * SAMPLE_RATE))
+        self.tentative = words[agreed:]
+
+        if self.on_partial:
+            self.on_partial(self.text(self.committed), self.text(self.tentative))
+
+    @staticmethod
+    def text(words: List[TimedWord]) -> str:
+        return " ".join(word for word, _, _ in words)
+
+    def finish(self) -> str:
+        """Stop the background decoding, decode the unfinished tail and return the full text."""
+        with self.condition:
+            self.finishing = True
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+
+        if self.length > self.offset:
+            self.committed.extend(self._decode())
+        self.tentative = []
+        text = self.text(self.committed)
+        if self.on_partial:
+            self.on_partial(text, "")
+        return text
+
+
+def replay(transcriber, path: str, chunk: float = 0.032) -> dict:
+    """
+    Feed a WAV file to a StreamingTranscriber in real-time-sized chunks, at real
+    time speed, with the same endpointing as the recorder. Reports the latency
+    from the detected end of speech to the final text, next to the time a
+    single decode of the whole utterance takes.
+    """
+    audio, rate = read_wav(path)
+    audio = resample(audio, rate, SAMPLE_RATE)
+    frame_size = int(chunk * SAMPLE_RATE)
+    endpointer = Endpointer(VoiceActivityDetector(SAMPLE_RATE, frame_size))
+    partials = []
+    streamer = StreamingTranscriber(transcriber, on_partial=lambda committed, tentative: partials.append(time.perf_counter()))
+    streamer.start()
+
+    fed = 0
+    next_frame_at = time.perf_counter()
+    for start in range(0, audio.size - frame_size + 1, frame_size):
+        delay = next_frame_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        next_frame_at += chunk
+
+        event = endpointer.process(audio[start:start + frame_size])
+        if endpointer.started:
+            streamer.feed(endpointer.buffer[fed:endpointer.length])
+            fed = endpointer.length
+        if event not in (None, SPEECH_START):
+            break
+
+    speech_end = time.perf_counter()
+    text = streamer.finish()
+    latency = time.perf_counter() - speech_end
+
+    utterance = endpointer.audio().copy()
+    batch_started = time.perf_counter()
+    transcriber.transcribe_words(utterance)
+    batch_latency = time.perf_counter() - batch_started
+
+    return {
+        "file": path,
+        "text": text,
+        "utterance_seconds": utterance.size / SAMPLE_RATE,
+        "partial_updates": len(partials),
+        "final_latency": latency,
+        "batch_latency": batch_latency
+    }
+
+
+if __name__ == "__main__":
+    from .transcription import create_transcriber
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m nlp.streaming_transcriber utterance.wav [...]")
+        sys.exit(1)
+    transcriber = create_transcriber()
+    for fixture in sys.argv[1:]:
+        print(json.dumps(replay(transcriber, fixture)))
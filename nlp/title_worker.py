@@ -0,0 +1,85 @@
+import re
+import queue
+import threading
+from typing import Optional, Tuple
+from utils.log import print_log
+
+FILLER_WORDS = {
+    "hey", "hi", "hello", "please", "can", "could", "would", "you", "tell", "me",
+    "i", "want", "to", "know", "a", "an", "the", "um", "uh", "so", "just", "camille"
+}
+
+
+def heuristic_title(message: str, max_words: int = 6) -> str:
+    """Build a title locally from the first words of the message, without calling the LLM."""
+    words = re.findall(r"[\w'-]+", message)
+    keywords = [word for word in words if word.lower() not in FILLER_WORDS]
+    title_words = (keywords or words)[:max_words]
+    if not title_words:
+        return "Untitled Conversation"
+    return " ".join(word.capitalize() for word in title_words)
+
+
+class TitleWorker:
+    """
+    Generates conversation titles on a background thread so the voice thread never
+    waits for the title request.
+
+    With mode "llm" the title is requested from the LLM, falling back to the local
+    heuristic when the LLM is still busy answering after `busy_wait` seconds or the
+    request fails. With mode "heuristic" the LLM is never used.
+    """
+
+    def __init__(self, memory, db, mode: str = "llm", busy_wait: float = 2.0):
+        self.memory = memory
+        self.db = db
+        self.mode = mode
+        self.busy_wait = busy_wait
+        self.queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._run, name="TitleWorker", daemon=True)
+        self.thread.start()
+
+    def request(self, conversation_id: str, message: str) -> None:
+        """Queue a title for the conversation, based on its first user message."""
+        self.start()
+        self.queue.put((conversation_id, message))
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish queued titles and stop the worker thread."""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout=timeout)
+
+    def _llm_available(self) -> bool:
+        wait_until_idle = getattr(self.memory.api_client, "wait_until_idle", None)
+        if wait_until_idle is None:
+            return True
+        # Let the answer finish first, the backend processes one request at a time
+        return wait_until_idle(self.busy_wait)
+
+    def _generate(self, message: str) -> str:
+        if self.mode == "llm" and self._llm_available():
+            try:
+                return self.memory.generate_title(message)
+            except Exception as e:
+                print_log(f"Title generation failed, using heuristic title: {e}", "red")
+        return heuristic_title(message)
+
+    def _run(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            conversation_id, message = job
+            try:
+                print_log(f"Generating title for conversation", "magenta")
+                title = self._generate(message)
+                print_log(f"Title generated for conversation: {title}", "magenta")
+                self.db.update_conversation_title(conversation_id, title)
+            except Exception as e:
+                print_log(f"Error generating conversation title: {e}", "red")
@@ -1,47 +1,198 @@
 import json
-from typing import Optional, get_type_hints, Dict, Any
-from inspect import signature
+from typing import Optional, Union, Literal, get_type_hints, get_origin, get_args, Dict, Any, List, Tuple
+from inspect import signature, unwrap, Parameter
 from .types import ToolFunc, Tool as ToolType, ToolFunction
 
+JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    dict: "object",
+    list: "array"
+}
+
+
+class ToolArgumentError(ValueError):
+    """Raised when the arguments the LLM produced for a tool don't match its signature."""
+
+
+class SerializedSchemas(list):
+    """A list of tool schemas that also carries its JSON serialization."""
+
+    def __init__(self, schemas: List[ToolType]):
+        super().__init__(schemas)
+        self.serialized = json.dumps(schemas)
+
+
+def _unwrap_optional(param_type: Any) -> Tuple[Any, bool]:
+    """Return (inner type, is optional) for Optional[X] / Union[X, None]."""
+    if get_origin(param_type) is Union:
+        args = [arg for arg in get_args(param_type) if arg is not type(None)]
+        if len(args) < len(get_args(param_type)):
+            return (args[0] if len(args) == 1 else Union[tuple(args)]), True
+    return param_type, False
+
+
+def type_to_schema(param_type: Any) -> Dict[str, Any]:
+    """Map a Python type hint to a JSON Schema fragment."""
+    param_type, _ = _unwrap_optional(param_type)
+    origin = get_origin(param_type)
+
+    if origin is Literal:
+        values = list(get_args(param_type))
+        schema: Dict[str, Any] = {"enum": values}
+        value_types = {JSON_TYPES.get(type(value)) for value in values}
+        if len(value_types) == 1 and None not in value_types:
+            schema["type"] = value_types.pop()
+        return schema
+    if origin in (list, List):
+        item_args = get_args(param_type)
+        schema = {"type": "array"}
+        if item_args:
+            schema["items"] = type_to_schema(item_args[0])
+        return schema
+    if origin in (dict, Dict):
+        return {"type": "object"}
+    if param_type in JSON_TYPES:
+        return {"type": JSON_TYPES[param_type]}
+    return {"type": "string"}  # Default to string
+
+
+def _coerce(value: Any, param_type: Any, name: str) -> Any:
+    """Check `value` against `param_type`, converting the usual LLM slips (numbers as strings etc.)."""
+    param_type, optional = _unwrap_optional(param_type)
+    if value is None:
+        if optional or param_type is Any:
+            return None
+        raise ToolArgumentError(f"'{name}' must not be null")
+
+    origin = get_origin(param_type)
+    if origin is Literal:
+        allowed = get_args(param_type)
+        if value in allowed:
+            return value
+        for option in allowed:
+            if isinstance(option, str) and isinstance(value, str) and option.lower() == value.strip().lower():
+                return option
+        raise ToolArgumentError(f"'{name}' must be one of {list(allowed)}, got {value!r}")
+
+    if origin in (list, List) or param_type is list:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = [value]
+        if not isinstance(value, list):
+            value = [value]
+        item_args = get_args(param_type)
+        if item_args:
+            return [_coerce(item, item_args[0], f"{name}[{index}]") for index, item in enumerate(value)]
+        return value
+
+    if origin in (dict, Dict) or param_type is dict:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if not isinstance(value, dict):
+            raise ToolArgumentError(f"'{name}' must be an object")
+        return value
+
+    if param_type is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in ("true", "yes", "1"):
+            return True
+        if isinstance(value, str) and value.strip().lower() in ("false", "no", "0"):
+            return False
+        if isinstance(value, (int, float)) and value in (0, 1):
+            return bool(value)
+        raise ToolArgumentError(f"'{name}' must be a boolean, got {value!r}")
+
+    if param_type in (int, float):
+        if isinstance(value, bool):
+            raise ToolArgumentError(f"'{name}' must be a number, got {value!r}")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ToolArgumentError(f"'{name}' must be a number, got {value!r}")
+        if param_type is int:
+            if not number.is_integer():
+                raise ToolArgumentError(f"'{name}' must be an integer, got {value!r}")
+            return int(number)
+        return number
+
+    if param_type is str:
+        if isinstance(value, (dict, list)):
+            raise ToolArgumentError(f"'{name}' must be a string")
+        return str(value)
+
+    return value
+
+
 class Tool:
-    def __init__(self, func: ToolFunc, name: str, description: str):
+    def __init__(self, func: ToolFunc, name: str, description: str, timeout: Optional[float] = None):
         self.func = func
         self.name = name
         self.description = description
-        self.signature = signature(func)
-        self.type_hints = get_type_hints(func)
+        self.timeout = timeout
+        self._fingerprint = None
+        self._schema: Optional[ToolType] = None
+        self._compile()
 
     def __call__(self, *args, **kwargs) -> str:
         return self.func(*args, **kwargs)
 
+    def _get_fingerprint(self) -> Tuple:
+        func = unwrap(self.func)
+        return (
+            getattr(func, "__code__", None),
+            getattr(func, "__defaults__", None),
+            getattr(func, "__kwdefaults__", None),
+            tuple(getattr(func, "__annotations__", {}).items())
+        )
+
+    def _compile(self) -> None:
+        self.signature = signature(self.func)
+        self.type_hints = get_type_hints(self.func)
+        self._fingerprint = self._get_fingerprint()
+        self._schema = None
+
+    def _ensure_compiled(self) -> bool:
+        """Recompile when the function's signature changed. Returns True if it did."""
+        if self._get_fingerprint() != self._fingerprint:
+            self._compile()
+            return True
+        return False
+
     def to_openai_schema(self) -> ToolType:
-        """Convert tool to OpenAI's function calling format."""
+        """Convert tool to OpenAI's function calling format. Built once and cached."""
+        self._ensure_compiled()
+        if self._schema is not None:
+            return self._schema
+
         parameters: Dict[str, Any] = {
             "type": "object",
             "properties": {},
             "required": []
         }
-        
+
         for param_name, param in self.signature.parameters.items():
+            if param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                continue
             param_type = self.type_hints.get(param_name, Any)
-            param_schema = {"type": "string"}  # Default to string
-            
-            # Map Python types to JSON Schema types
-            if param_type in (int, float):
-                param_schema["type"] = "number"
-            elif param_type == bool:
-                param_schema["type"] = "boolean"
-            elif param_type == dict:
-                param_schema["type"] = "object"
-            elif param_type == list:
-                param_schema["type"] = "array"
-            
-            parameters["properties"][param_name] = param_schema
-            
+            param_schema = type_to_schema(param_type)
+
             if param.default is param.empty:
                 parameters["required"].append(param_name)
-        
-        return {
+            elif param.default is not None:
+                param_schema["default"] = param.default
+
+            parameters["properties"][param_name] = param_schema
+
+        self._schema = {
             "type": "function",
             "function": {
                 "name": self.name,
@@ -49,3 +200,64 @@ class Tool:
                 "parameters": parameters
             }
         }
+        return self._schema
+
+    def validate_arguments(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate and coerce the decoded arguments of a tool call against the
+        signature. Raises ToolArgumentError before the (possibly slow) tool runs.
+        """
+        self._ensure_compiled()
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError("arguments must be a JSON object")
+
+        accepts_kwargs = any(p.kind == Parameter.VAR_KEYWORD for p in self.signature.parameters.values())
+        unknown = [key for key in arguments if key not in self.signature.parameters]
+        if unknown and not accepts_kwargs:
+            raise ToolArgumentError(f"unknown argument(s): {', '.join(unknown)}")
+
+        validated: Dict[str, Any] = {}
+        for param_name, param in self.signature.parameters.items():
+            if param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                continue
+            if param_name not in arguments:
+                if param.default is param.empty:
+                    raise ToolArgumentError(f"missing required argument '{param_name}'")
+                continue
+            param_type = self.type_hints.get(param_name, Any)
+            validated[param_name] = _coerce(arguments[param_name], param_type, param_name)
+
+        for key in unknown:
+            validated[key] = arguments[key]
+        return validated
+
+
+class ToolRegistry:
+    """Holds the registered tools and caches their combined schema list."""
+
+    def __init__(self):
+        self.tools: Dict[str, Tool] = {}
+        self._schemas: Optional[SerializedSchemas] = None
+
+    def register(self, tool: Tool) -> None:
+        self.tools[tool.name] = tool
+        self._schemas = None
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self.tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def __getitem__(self, name: str) -> Tool:
+        return self.tools[name]
+
+    def values(self):
+        return self.tools.values()
+
+    def schemas(self) -> SerializedSchemas:
+        """Schemas of every tool, rebuilt only when a tool was added or changed."""
+        changed = any(tool._ensure_compiled() for tool in self.tools.values())
+        if self._schemas is None or changed:
+            self._schemas = SerializedSchemas([tool.to_openai_schema() for tool in self.tools.values()])
+        return self._schemas
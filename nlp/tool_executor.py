@@ -0,0 +1,75 @@
+import time
+import threading
+from concurrent.futures import Future, wait
+from dataclasses import dataclass
+from typing import List, Any
+from utils.log import print_log
+from .tool import Tool
+
+
+@dataclass
+class ToolInvocation:
+    tool: Tool
+    # Validated arguments; for a rejected call, what the model sent (decoded or raw JSON)
+    arguments: Any
+
+
+class ToolExecutor:
+    """
+    Runs the tool calls of one turn concurrently and returns their results in the
+    original call order.
+
+    Every call runs on its own daemon thread and is bounded by the timeout of its
+    tool. Python threads can't be killed, so a call that misses its deadline is
+    abandoned: its result is replaced by a timeout message and whatever it returns
+    later is dropped. Being a daemon thread it never blocks shutdown.
+    """
+
+    def __init__(self, default_timeout: float = 20.0):
+        self.default_timeout = default_timeout
+
+    def _start(self, invocation: ToolInvocation) -> Future:
+        future: Future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(invocation.tool(**invocation.arguments))
+            except Exception as e:
+                future.set_exception(e)
+
+        thread = threading.Thread(target=run, name=f"Tool-{invocation.tool.name}", daemon=True)
+        thread.start()
+        return future
+
+    def run(self, invocations: List[ToolInvocation]) -> List[str]:
+        started = time.monotonic()
+        futures = [self._start(invocation) for invocation in invocations]
+        deadlines = [
+            started + (invocation.tool.timeout or self.default_timeout)
+            for invocation in invocations
+        ]
+
+        # Calls run concurrently, so waiting on each one up to its own deadline in
+        # turn never waits longer than the slowest call or the latest deadline
+        results = []
+        for invocation, future, deadline in zip(invocations, futures, deadlines):
+            name = invocation.tool.name
+            remaining = deadline - time.monotonic()
+            if not future.done() and remaining > 0:
+                wait([future], timeout=remaining)
+
+            if not future.done():
+                future.cancel()
+                timeout = invocation.tool.timeout or self.default_timeout
+                print_log(f"Tool {name} timed out after {timeout}s, abandoning it", "red")
+                results.append(f"The {name} tool did not respond within {timeout:g} seconds.")
+            elif future.exception():
+                print_log(f"Tool {name} failed: {future.exception()}", "red")
+                results.append(f"The {name} tool failed: {future.exception()}")
+            else:
+                results.append(future.result())
+
+        print_log(f"Ran {len(invocations)} tool call(s) in {time.monotonic() - started:.2f}s", "yellow")
+        return results
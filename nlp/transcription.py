@@ -0,0 +1,255 @@
+import re
+import json
+import time
+import argparse
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+from config import Config
+from utils.log import print_log
+from audio_processing.audio_utils import WHISPER_SAMPLE_RATE, read_wav, resample, wav_bytes
+from .types import TimedWord
+
+BACKENDS = ("whisper", "faster-whisper", "remote")
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+class TranscriptionBackend(ABC):
+    """
+    Speech-to-text engine. Audio is a mono float32 buffer at 16 kHz. Backends
+    implement `transcribe_words`; `transcribe` joins its words unless the
+    backend has a cheaper way to get plain text.
+    """
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return " ".join(word for word, _, _ in self.transcribe_words(audio))
+
+    @abstractmethod
+    def transcribe_words(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> List[TimedWord]:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class FasterWhisperTranscriber(TranscriptionBackend):
+    """Whisper on CTranslate2 with int8 weights (the optional faster-whisper package), CPU friendly."""
+
+    def __init__(self, model_name: str = "tiny", compute_type: str = "int8", threads: int = 0):
+        # Optional dependency, only needed when this backend is selected
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=threads)
+        print_log(f"Loaded faster-whisper {model_name} ({compute_type})", "yellow")
+
+    def _segments(self, audio: np.ndarray, initial_prompt: Optional[str], word_timestamps: bool):
+        segments, _ = self.model.transcribe(
+            np.ascontiguousarray(audio, dtype=np.float32),
+            language="en",
+            beam_size=1,
+            temperature=0.0,
+            condition_on_previous_text=False,
+            initial_prompt=initial_prompt or None,
+            word_timestamps=word_timestamps
+        )
+        return segments
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        if audio.size == 0:
+            return ""
+        return "".join(segment.text for segment in self._segments(audio, None, False)).strip()
+
+    def transcribe_words(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> List[TimedWord]:
+        if audio.size == 0:
+            return []
+        return [
+            (word.word.strip(), float(word.start), float(word.end))
+            for segment in self._segments(audio, initial_prompt, True)
+            for word in segment.words or []
+            if word.word.strip()
+        ]
+
+
+class RemoteTranscriber(TranscriptionBackend):
+    """
+    Offloads transcription to an OpenAI-compatible `/audio/transcriptions`
+    endpoint (a whisper server on another machine, or the local stub below).
+    """
+
+    def __init__(
+        self,
+        api_base: str,
+        api_key: str = "not-needed",
+        model: str = "whisper-1",
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0
+    ):
+        self.url = f"{api_base.rstrip('/')}/audio/transcriptions"
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _request(self, audio: np.ndarray, initial_prompt: Optional[str]) -> Dict[str, Any]:
+        data = {
+            "model": self.model,
+            "language": "en",
+            "temperature": "0",
+            "response_format": "verbose_json",
+            "timestamp_granularities[]": "word"
+        }
+        if initial_prompt:
+            data["prompt"] = initial_prompt
+        response = self.session.post(
+            self.url,
+            data=data,
+            files={"file": ("audio.wav", wav_bytes(audio, WHISPER_SAMPLE_RATE), "audio/wav")},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        if audio.size == 0:
+            return ""
+        return self._request(audio, None).get("text", "").strip()
+
+    def transcribe_words(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> List[TimedWord]:
+        if audio.size == 0:
+            return []
+        result = self._request(audio, initial_prompt)
+        words = result.get("words")
+        if words:
+            return [(word["word"].strip(), float(word["start"]), float(word["end"])) for word in words if word["word"].strip()]
+
+        # Servers without word timestamps: spread the words evenly over the audio
+        text_words = result.get("text", "").split()
+        duration = audio.size / WHISPER_SAMPLE_RATE
+        step = duration / max(len(text_words), 1)
+        return [(word, index * step, (index + 1) * step) for index, word in enumerate(text_words)]
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def create_transcriber(backend: Optional[str] = None) -> TranscriptionBackend:
+    """The transcription backend selected by Config.TRANSCRIPTION_BACKEND (or `backend`)."""
+    backend = backend or Config.TRANSCRIPTION_BACKEND
+    if backend == "whisper":
+        from .whisper_transcriber import WhisperTranscriber
+        return WhisperTranscriber(Config.WHISPER_MODEL, Config.WHISPER_PROFILE, Config.TRANSCRIPTION_THREADS)
+    if backend == "faster-whisper":
+        return FasterWhisperTranscriber(Config.WHISPER_MODEL, threads=Config.TRANSCRIPTION_THREADS)
+    if backend == "remote":
+        return RemoteTranscriber(
+            Config.TRANSCRIPTION_API_BASE,
+            api_key=Config.TRANSCRIPTION_API_KEY,
+            model=Config.TRANSCRIPTION_MODEL,
+            connect_timeout=Config.OPENAI_CONNECT_TIMEOUT,
+            read_timeout=Config.OPENAI_READ_TIMEOUT
+        )
+    raise ValueError(f"Unknown transcription backend {backend!r}, expected one of {BACKENDS}")
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance divided by the reference length (case and punctuation ignored)."""
+    ref = WORD_PATTERN.findall(reference.lower())
+    hyp = WORD_PATTERN.findall(hypothesis.lower())
+    if not ref:
+        return float(bool(hyp))
+    # One row of the edit-distance table at a time
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def benchmark(backend: TranscriptionBackend, files: List[str]) -> Dict[str, Any]:
+    """
+    Transcribe every file and report the real-time factor (decode time / audio
+    duration) and, for files with a reference transcript next to them
+    (`name.txt`), the word error rate over all of them.
+
+    The whisper "fast" profile trades accuracy for speed: a poor greedy decode
+    is kept instead of being retried at higher temperatures, so on noisy or
+    mumbled audio its WER is expected to be higher than "accurate"'s. Compare
+    both profiles on the same files before switching.
+    """
+    decode_time = audio_time = 0.0
+    errors = reference_words = 0.0
+    for file in files:
+        audio, rate = read_wav(file)
+        audio = resample(audio, rate, WHISPER_SAMPLE_RATE)
+        started = time.perf_counter()
+        text = backend.transcribe(audio)
+        decode_time += time.perf_counter() - started
+        audio_time += audio.size / WHISPER_SAMPLE_RATE
+
+        reference_path = Path(file).with_suffix(".txt")
+        if reference_path.exists():
+            reference = reference_path.read_text(encoding="utf-8")
+            words = len(WORD_PATTERN.findall(reference.lower()))
+            errors += word_error_rate(reference, text) * words
+            reference_words += words
+        print_log(f"{file}: {text}", "blue")
+
+    return {
+        "files": len(files),
+        "audio_seconds": audio_time,
+        "rtf": decode_time / audio_time if audio_time else None,
+        "wer": errors / reference_words if reference_words else None
+    }
+
+
+def serve_stub(port: int = 8765, text: str = "this is a stub transcription") -> None:
+    """
+    Minimal `/audio/transcriptions` server answering every request with `text`,
+    for exercising the remote backend without a real server.
+    """
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            words = text.split()
+            body = json.dumps({
+                "text": text,
+                "words": [{"word": word, "start": index * 0.3, "end": (index + 1) * 0.3} for index, word in enumerate(words)]
+            }).encode("utf-8")
+            self.send_response(200 if self.path.endswith("/audio/transcriptions") else 404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    print_log(f"Stub transcription server on http://127.0.0.1:{port}/v1", "yellow")
+    ThreadingHTTPServer(("127.0.0.1", port), StubHandler).serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare transcription backends")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    bench = subcommands.add_parser("bench", help="Real-time factor and WER of each backend over WAV files")
+    bench.add_argument("files", nargs="+")
+    bench.add_argument("--backends", nargs="+", choices=BACKENDS, default=[Config.TRANSCRIPTION_BACKEND])
+    stub = subcommands.add_parser("stub-server", help="Serve a fixed transcript on /v1/audio/transcriptions")
+    stub.add_argument("--port", type=int, default=8765)
+    stub.add_argument("--text", default="this is a stub transcription")
+    args = parser.parse_args()
+
+    if args.command == "stub-server":
+        serve_stub(args.port, args.text)
+    else:
+        for name in args.backends:
+            transcriber = create_transcriber(name)
+            try:
+                print(json.dumps({"backend": name, **benchmark(transcriber, args.files)}))
+            finally:
+                transcriber.close()
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Callable, Literal, TypedDict, NotRequired
+from typing import List, Dict, Any, Optional, Callable, Literal, TypedDict, NotRequired, Tuple
 
 
 class FunctionCall(TypedDict):
@@ -12,6 +12,8 @@ class Message:
     role: str
     content: str
     function_call: Optional[FunctionCall] = None
+    tokens: int = 0  # Approximate prompt tokens, see nlp.context.estimate_tokens
+    id: Optional[int] = None  # Row id in the messages table
 
 class ToolFunction(TypedDict):
     name: str
@@ -23,3 +25,12 @@ class Tool(TypedDict):
     function: ToolFunction
 
 ToolFunc = Callable[..., str]
+
+class ToolError(str):
+    """
+    A tool result describing a failure. It is still a plain string for the LLM,
+    but it is never stored in the tool result cache.
+    """
+
+# A transcribed word as (word, start, end), times in seconds from the start of the audio
+TimedWord = Tuple[str, float, float]
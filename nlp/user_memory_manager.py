@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import List, Optional
 from utils.log import print_log
 from config import Config
+from .memory_index import MemoryIndex
 
 @dataclass
 class SetupQuestion:
@@ -12,6 +13,8 @@ class SetupQuestion:
 class UserMemoryManager:
     def __init__(self, db):
         self.db = db
+        self.index = MemoryIndex(Config.MEMORY_INDEX_PATH)
+        self._load_index()
         self.user_memories = self.get_user_memories()
         self.has_been_setup = len(self.user_memories) > 0
         self.setup_questions = [
@@ -20,18 +23,28 @@ class UserMemoryManager:
             SetupQuestion("occupation", "What do you do for a living?", "I work as {value}")
         ]
 
+    def _load_index(self) -> None:
+        # Rebuild from the database when the index is missing or out of sync with it
+        if self.index.load() != self.db.count_user_memories(None):
+            print_log("Rebuilding user memory index", "cyan")
+            self.index.rebuild(self.db.get_all_user_memories())
+
     def get_user_memories(self, source: str = 'setup') -> List[str]:
         return self.db.get_user_memories(source)
 
+    def get_relevant_memories(self, text: str, k: int = 5, sources: Optional[List[str]] = None) -> List[str]:
+        """The top-k memories most similar to `text`, using the local index."""
+        return [memory for memory, _ in self.index.search(text, k=k, sources=sources)]
+
     def save_user_memory(self, memory: str, source: str = 'setup') -> None:
         self.db.add_user_memory(memory, source)
+        self.index.add(memory, source)
         
     def needs_setup(self) -> bool:
         if self.has_been_setup:
             return False
         
-        cursor = self.db.conn.execute("SELECT COUNT(*) FROM user_memories WHERE source = 'setup'")
-        self.has_been_setup = cursor.fetchone()[0] >= 1
+        self.has_been_setup = self.db.count_user_memories('setup') >= 1
         return not self.has_been_setup
 
     def get_setup_questions(self):
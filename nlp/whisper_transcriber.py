@@ -1,12 +1,82 @@
 import whisper
 import functools
+import numpy as np
+from typing import Any, Dict, List, Optional, Union
+from utils.log import print_log
+from .transcription import TranscriptionBackend
+from .types import TimedWord
 
+# Decoding options per profile. "fast" decodes once, greedily: no temperature
+# fallback re-runs on noisy input and no beam search. "accurate" is whisper's default.
+# logprob_threshold stays at whisper's -1.0: without fallback it only takes part in
+# the no-speech check, where a segment is dropped when no_speech_prob is above 0.6
+# *and* its average log probability is below the threshold. Unset, no_speech_prob
+# alone would drop quiet but confidently decoded speech.
+# The accuracy cost of "fast" (no retry of a poor first decode) shows up in the
+# WER of `python -m nlp.transcription bench`, run with each WHISPER_PROFILE.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {
+        "temperature": 0.0,
+        "beam_size": None,
+        "best_of": None,
+        "compression_ratio_threshold": None,
+        "logprob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+        "condition_on_previous_text": False
+    },
+    "accurate": {}
+}
 
-class WhisperTranscriber:
-    def __init__(self, model_name="tiny"):
+
+class WhisperTranscriber(TranscriptionBackend):
+    """openai-whisper running in-process on torch."""
+
+    def __init__(self, model_name: str = "tiny", profile: str = "fast", threads: int = 0):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown whisper profile {profile!r}, expected one of {list(PROFILES)}")
+        if threads:
+            # Explicit thread counts; torch's default can oversubscribe the CPU
+            whisper.torch.set_num_threads(threads)
+            whisper.torch.set_num_interop_threads(1)
         whisper.torch.load = functools.partial(whisper.torch.load, weights_only=True)
         self.model = whisper.load_model(model_name)
+        self.options = {
+            **PROFILES[profile],
+            "language": "en",
+            "fp16": self.model.device.type == "cuda"
+        }
+        print_log(f"Loaded whisper {model_name} ({profile} profile) on {self.model.device}", "yellow")
 
-    def transcribe(self, audio_file):
-        result = self.model.transcribe(audio_file, language="en")
+    def transcribe(self, audio: Union[np.ndarray, str]) -> str:
+        """
+        Transcribe a mono float32 buffer sampled at 16 kHz (as returned by
+        AudioRecorder.record_audio). A file path is still accepted, in which case
+        whisper decodes it with ffmpeg.
+        """
+        if isinstance(audio, np.ndarray):
+            if audio.size == 0:
+                return ""
+            audio = np.ascontiguousarray(audio, dtype=np.float32)
+        result = self.model.transcribe(audio, **self.options)
         return result["text"].strip()
+
+    def transcribe_words(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> List[TimedWord]:
+        if audio.size == 0:
+            return []
+        result = self.model.transcribe(
+            np.ascontiguousarray(audio, dtype=np.float32),
+            **{
+                **self.options,
+                # Repeated decodes of overlapping audio must agree, so always greedy
+                "temperature": 0.0,
+                "condition_on_previous_text": False,
+                "word_timestamps": True,
+                "initial_prompt": initial_prompt or None
+            }
+        )
+        return [
+            (word["word"].strip(), float(word["start"]), float(word["end"]))
+            for segment in result["segments"]
+            for word in segment.get("words", [])
+            if word["word"].strip()
+        ]
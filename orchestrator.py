@@ -0,0 +1,271 @@
+import time
+import threading
+from typing import Callable, List, Optional, Tuple
+from config import Config
+from utils.log import print_log
+from audio_processing.tts_events import FINISHED, STARTED
+from audio_processing.wake_word import ACKNOWLEDGEMENTS
+from nlp.streaming_transcriber import StreamingTranscriber
+
+# States of a conversation turn
+IDLE = "idle"  # Waiting for the wake phrase
+LISTENING = "listening"  # Recording until the endpointer says the user finished
+TRANSCRIBING = "transcribing"  # Decoding what has not been transcribed while recording
+THINKING = "thinking"  # Waiting for the LLM
+SPEAKING = "speaking"  # The TTS worker is speaking, whatever else is going on
+
+# Animation layer shown in each state; "speaking" follows the TTS events directly
+ANIMATIONS = {LISTENING: "listening", TRANSCRIBING: "listening", THINKING: "thinking"}
+
+NO_SPEECH_REPLY = "I didn't hear anything."
+SETUP_INTRO = "Hey! I wil ask you a few questions to get to know you better."
+
+
+class TurnOrchestrator:
+    """
+    Drives the voice chat: startup, the user memory setup and one turn per wake
+    phrase, moving through the states above. Every wait ends on the component
+    finishing (the TTS worker's ready and finished events, the recorder returning
+    at the endpoint, the final transcription, the LLM reply) and is bounded by a
+    deadline rather than padded with a sleep.
+
+    The reply is generated on its own thread, so the wake word detector keeps
+    listening while it streams and "stop" can cancel it.
+
+    All components are passed in, so fakes can stand in for any of them (see
+    orchestrator_benchmark).
+    """
+
+    def __init__(
+        self,
+        wake_word,
+        recorder,
+        transcriber,
+        llm,
+        tts,
+        memory_manager,
+        animation=None,
+        streaming: Optional[bool] = None,
+        stream_responses: Optional[bool] = None,
+        startup_timeout: Optional[float] = None,
+        speech_timeout: Optional[float] = None
+    ):
+        self.wake_word = wake_word
+        self.recorder = recorder
+        self.transcriber = transcriber
+        self.llm = llm
+        self.tts = tts
+        self.memory_manager = memory_manager
+        self.animation = animation
+        self.streaming = Config.STREAMING_TRANSCRIPTION if streaming is None else streaming
+        self.stream_responses = Config.STREAM_RESPONSES if stream_responses is None else stream_responses
+        self.startup_timeout = Config.TTS_STARTUP_TIMEOUT if startup_timeout is None else startup_timeout
+        self.speech_timeout = Config.SPEECH_TIMEOUT if speech_timeout is None else speech_timeout
+        self.state = IDLE
+        self.lock = threading.Lock()
+        self.transitions: List[Tuple[float, str]] = [(time.monotonic(), IDLE)]
+        self.generating = False  # The LLM is still producing the reply
+        self.reply_thread: Optional[threading.Thread] = None
+        self.reply_cancelled: Optional[threading.Event] = None
+        # Held while a reply sentence is queued, so none is queued after cancel_reply returns
+        self.speak_lock = threading.Lock()
+        self.startup_seconds = 0.0
+        self.speech_wait_seconds = 0.0  # Time spent waiting for prompts to be spoken
+        self.tts.events.subscribe(self._on_tts_event)
+
+    def _enter(self, state: str) -> None:
+        """Called with the lock held."""
+        previous = self.state
+        if state == previous:
+            return
+        self.state = state
+        self.transitions.append((time.monotonic(), state))
+        if Config.DEBUG:
+            print_log(f"Turn state: {previous} -> {state}", "blue")
+        if self.animation and ANIMATIONS.get(previous) != ANIMATIONS.get(state):
+            if previous in ANIMATIONS:
+                self.animation.set_state(ANIMATIONS[previous], False)
+            if state in ANIMATIONS:
+                self.animation.set_state(ANIMATIONS[state], True)
+
+    def _set_state(self, state: str) -> None:
+        with self.lock:
+            self._enter(state)
+
+    def _on_tts_event(self, event) -> None:
+        if event.kind not in (STARTED, FINISHED):
+            return
+        if self.animation:
+            self.animation.set_state("speaking", event.kind == STARTED)
+        with self.lock:
+            if event.kind == STARTED and self.state in (IDLE, THINKING):
+                self._enter(SPEAKING)
+            elif event.kind == FINISHED and self.state == SPEAKING:
+                self._enter(THINKING if self.generating else IDLE)
+
+    def start(self) -> bool:
+        """Start the TTS worker and wait until it can speak, at most startup_timeout."""
+        started = time.monotonic()
+        self.tts.start()
+        ready = self.tts.wait_until_ready(self.startup_timeout)
+        self.startup_seconds = time.monotonic() - started
+        if ready:
+            print_log(f"TTS worker ready after {self.startup_seconds:.2f}s")
+        else:
+            print_log(f"TTS worker not ready after {self.startup_seconds:.1f}s, continuing without waiting", "red")
+        if self.animation:
+            self.animation.set_state("waiting", True)
+        return ready
+
+    def say_and_wait(self, phrase: str, cache: bool = False) -> bool:
+        """Speak `phrase` and block until it was spoken (or speech_timeout passed), before listening."""
+        self._set_state(IDLE)
+        started = time.monotonic()
+        self.tts.speak(phrase, cache=cache)
+        done = self.tts.wait_until_done(self.speech_timeout)
+        self.speech_wait_seconds += time.monotonic() - started
+        if not done:
+            print_log(f"Still speaking after {self.speech_timeout:.0f}s, listening anyway", "red")
+        return done
+
+    def _playing(self, at: float) -> bool:
+        return self.tts.events.speaking_at(at, Config.SPEECH_ECHO_TAIL)
+
+    def listen(self, start: Optional[int] = None) -> Optional[str]:
+        """
+        Record one utterance from capture position `start` (or now) and transcribe
+        it; None (after saying so) if nothing usable was heard. Audio captured
+        while the TTS worker was speaking is left out of the recording.
+        """
+        self._set_state(LISTENING)
+        if self.streaming:
+            streamer = StreamingTranscriber(
+                self.transcriber,
+                on_partial=lambda committed, tentative: print_log(f"Heard so far: {committed} [{tentative}]", "blue")
+            )
+            streamer.start()
+            self.recorder.record_audio(start, on_audio=streamer.feed, playing=self._playing)
+            self._set_state(TRANSCRIBING)
+            text = streamer.finish()
+        else:
+            audio = self.recorder.record_audio(start, playing=self._playing)
+            self._set_state(TRANSCRIBING)
+            text = self.transcriber.transcribe(audio)
+
+        if not text or len(text.strip()) < 3:
+            print_log("No or too short transcription detected", "orange")
+            self._set_state(IDLE)
+            self.tts.speak(NO_SPEECH_REPLY, cache=True)
+            return None
+        print_log(f"Transcribed text: {text}")
+        return text
+
+    def run_setup(self) -> None:
+        """Ask the setup questions, each answer recorded once the question has been spoken."""
+        print_log("Running user memory setup", "cyan")
+        self.say_and_wait(SETUP_INTRO)
+        for question in self.memory_manager.get_setup_questions():
+            print_log(f"Asking: {question.question}", "cyan")
+            self.say_and_wait(f"Answer the following: {question.question}")
+            answer = self.listen()
+            if answer:
+                print_log(f"User answered: {answer}", "cyan")
+                self.memory_manager.save_setup_question(question, answer)
+        self._set_state(IDLE)
+        # Update system prompt with new user memories
+        self.llm._initialize_system_prompt()
+        print_log("User memory setup complete", "cyan")
+
+    def run_turn(self, start: Optional[int] = None) -> Optional[str]:
+        """Listen from `start` and start the reply on its own thread; returns the transcription without waiting for it."""
+        text = self.listen(start)
+        if not text:
+            return None
+
+        cancelled = threading.Event()
+        with self.lock:
+            self.generating = True
+            self._enter(THINKING)
+        self.reply_cancelled = cancelled
+        self.reply_thread = threading.Thread(target=self._reply, args=(text, cancelled), name="TurnReply", daemon=True)
+        self.reply_thread.start()
+        return text
+
+    def _speak_reply(self, sentence: str, cancelled: threading.Event) -> None:
+        with self.speak_lock:
+            if not cancelled.is_set():
+                self.tts.speak(sentence)
+
+    def _reply(self, text: str, cancelled: threading.Event) -> None:
+        """Ask the LLM and queue the reply to TTS, until it is complete or cancelled."""
+        response = None
+        try:
+            speak = lambda sentence: self._speak_reply(sentence, cancelled)
+            if self.stream_responses:
+                # Sentences are queued to TTS while the rest of the answer is generated
+                response = self.llm.process_input(text, on_sentence=speak, cancelled=cancelled)
+            else:
+                response = self.llm.process_input(text, cancelled=cancelled)
+                speak(response)
+        except Exception as e:
+            print_log(f"Error generating the reply: {e}", "red")
+        finally:
+            with self.lock:
+                self.generating = False
+                self._enter(SPEAKING if self.tts.speaking else IDLE)
+        if cancelled.is_set():
+            print_log(f"LLM response cancelled after: {response}", "orange")
+        else:
+            print_log(f"LLM response: {response}")
+
+    def cancel_reply(self) -> None:
+        """Stop the reply being generated; no more of it is queued to TTS once this returns."""
+        with self.speak_lock:
+            if self.reply_cancelled:
+                self.reply_cancelled.set()
+
+    def wait_for_reply(self, timeout: Optional[float] = None) -> bool:
+        """Block until the reply thread is done, i.e. the reply is queued or cancelled; False on timeout."""
+        thread = self.reply_thread
+        if thread:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def interrupt(self, acknowledgement: str) -> None:
+        """
+        Cut the reply short, whether it is still generated or only playing, and
+        say `acknowledgement` instead. The reply is cancelled first, so none of
+        its sentences can be queued after the silence.
+        """
+        self.cancel_reply()
+        self.tts.silence()
+        self.tts.speak(acknowledgement, cache=True)
+
+    def handle(self, wake_word_result) -> bool:
+        """Act on what the wake word detector heard; False when it stopped listening."""
+        if wake_word_result not in ACKNOWLEDGEMENTS:
+            return False
+        # Every wake phrase talks over the reply. The acknowledgement plays as soon as
+        # it is queued, the memory-bound work waits for the reply thread to stop
+        self.interrupt(ACKNOWLEDGEMENTS[wake_word_result])
+        if wake_word_result == "start_listening":
+            # Replies share the conversation memory, so only one runs at a time
+            self.wait_for_reply()
+            # Record from the wake phrase on, so nothing said right after it is lost;
+            # the acknowledgement playing meanwhile is skipped by listen()
+            self.run_turn(self.wake_word.detected_at)
+        elif wake_word_result == "new_conversation":
+            self.wait_for_reply()
+            self.llm.clear_memory()
+        return True
+
+    def run(self, running: Callable[[], bool]) -> None:
+        """The voice chat loop, until `running` returns False or the audio input ends."""
+        while running():
+            if self.memory_manager.needs_setup():
+                self.run_setup()
+            # Blocks until the wake phrase; the reply is generated and played meanwhile so it can be stopped
+            if not self.handle(self.wake_word.listen_for_wake_phrase()):
+                print_log("Wake phrase listener stopped, ending the voice chat loop", "yellow")
+                return
@@ -0,0 +1,196 @@
+import json
+import time
+import argparse
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+from audio_processing.audio_utils import WHISPER_SAMPLE_RATE
+from orchestrator import TurnOrchestrator
+
+
+@dataclass
+class FakeQuestion:
+    question: str
+
+
+class FakeWakeWord:
+    """Returns `results` in order, each after `delay` seconds, then False."""
+
+    def __init__(self, results: List[str], delay: float = 0.0):
+        self.results = list(results)
+        self.delay = delay
+        self.detected_at = None
+
+    def listen_for_wake_phrase(self):
+        time.sleep(self.delay)
+        return self.results.pop(0) if self.results else False
+
+
+class FakeRecorder:
+    """An utterance of `seconds` of silence, taking as long to record."""
+
+    def __init__(self, seconds: float = 1.0):
+        self.seconds = seconds
+
+    def record_audio(self, start=None, on_audio=None, playing=None) -> np.ndarray:
+        time.sleep(self.seconds)
+        audio = np.zeros(int(self.seconds * WHISPER_SAMPLE_RATE), dtype=np.float32)
+        if on_audio:
+            on_audio(audio)
+        return audio
+
+
+class FakeTranscriber:
+    def __init__(self, text: str = "what time is it", seconds: float = 0.2):
+        self.text = text
+        self.seconds = seconds
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        time.sleep(self.seconds)
+        return self.text
+
+
+class FakeLLM:
+    """Streams `sentences` copies of `reply`, one every `seconds`, until cancelled."""
+
+    def __init__(self, reply: str = "It is noon.", seconds: float = 0.5, sentences: int = 1):
+        self.reply = reply
+        self.seconds = seconds
+        self.sentences = sentences
+
+    def process_input(self, text: str, on_sentence=None, cancelled=None) -> str:
+        spoken = []
+        for _ in range(self.sentences):
+            if cancelled is None:
+                time.sleep(self.seconds)
+            elif cancelled.wait(self.seconds):
+                break
+            spoken.append(self.reply)
+            if on_sentence:
+                on_sentence(self.reply)
+        return " ".join(spoken)
+
+    def clear_memory(self) -> None:
+        pass
+
+    def _initialize_system_prompt(self) -> None:
+        pass
+
+
+class FakeMemoryManager:
+    def __init__(self, questions: List[str]):
+        self.questions = [FakeQuestion(question) for question in questions]
+        self.answers: List[str] = []
+        self.setup_done = not questions
+
+    def needs_setup(self) -> bool:
+        return not self.setup_done
+
+    def get_setup_questions(self):
+        return self.questions
+
+    def save_setup_question(self, question: FakeQuestion, value: str) -> None:
+        self.answers.append(value)
+        self.setup_done = True
+
+
+def _tts_worker():
+    # Imported here, the orchestrator itself only needs the TTS worker's interface
+    from audio_processing.tts import TTSWorker
+    return TTSWorker("simulation", engine="tone", sink="null")
+
+
+def simulate(turns: int = 3) -> Dict[str, float]:
+    """
+    Startup, the setup questions and `turns` turns against the real TTS worker
+    (tone engine, null sink) and fakes for everything else. Compared with the
+    fixed sleeps the voice chat loop used instead: 3 s at startup, 5 s after the
+    setup intro, 2 s after each question and 0.1 s per loop.
+    """
+    from audio_processing.speech_synthesis import ToneSynthesizer
+
+    questions = ["What is your name?", "Which city do you live in?", "What do you do for a living?"]
+    orchestrator = TurnOrchestrator(
+        # The next wake phrase comes once the reply was generated, or it would cut the reply short
+        FakeWakeWord(["start_listening"] * turns, delay=1.0),
+        FakeRecorder(),
+        FakeTranscriber(),
+        FakeLLM(seconds=0.5),
+        _tts_worker(),
+        FakeMemoryManager(questions),
+        streaming=False
+    )
+    try:
+        orchestrator.start()
+        started = time.monotonic()
+        orchestrator.run(lambda: True)
+        orchestrator.wait_for_reply()
+        run_seconds = time.monotonic() - started
+        orchestrator.tts.wait_until_done(orchestrator.speech_timeout)
+    finally:
+        orchestrator.tts.stop()
+
+    # How long the prompts take to say, the legacy 2 s wait started listening before most ended
+    seconds_per_char = ToneSynthesizer().seconds_per_char
+    prompt_seconds = [len(f"Answer the following: {question}") * seconds_per_char for question in questions]
+    legacy_setup_wait = 5.0 + 2.0 * len(questions)
+    return {
+        "startup_seconds": orchestrator.startup_seconds,
+        "legacy_startup_seconds": 3.0,
+        "setup_wait_seconds": orchestrator.speech_wait_seconds,
+        "legacy_setup_wait_seconds": legacy_setup_wait,
+        "legacy_questions_listened_over": sum(seconds > 2.0 for seconds in prompt_seconds),
+        "run_seconds": run_seconds,
+        "legacy_poll_seconds": 0.1 * (turns + 1),
+        "transitions": len(orchestrator.transitions)
+    }
+
+
+def simulate_stop(sentences: int = 10, stop_after: float = 1.5) -> Dict[str, float]:
+    """
+    One turn whose reply streams `sentences` sentences, 0.3 s apart, with
+    "stop" heard `stop_after` seconds after the turn is handed to the LLM.
+    Reports how quickly the reply was cancelled and what was still queued
+    after the stop.
+    """
+    tts = _tts_worker()
+    llm = FakeLLM(reply="This sentence is part of a long answer.", seconds=0.3, sentences=sentences)
+    orchestrator = TurnOrchestrator(
+        FakeWakeWord(["start_listening"]),
+        FakeRecorder(0.2),
+        FakeTranscriber(seconds=0.0),
+        llm,
+        tts,
+        FakeMemoryManager([]),
+        streaming=False,
+        stream_responses=True
+    )
+    queued: List[float] = []
+    speak = tts.speak
+    tts.speak = lambda phrase, cache=False: (queued.append(time.monotonic()), speak(phrase, cache=cache))
+    try:
+        orchestrator.start()
+        orchestrator.run(lambda: True)
+        time.sleep(stop_after)
+        stopped = time.monotonic()
+        orchestrator.handle("stop_speaking")
+        orchestrator.wait_for_reply()
+        cancelled_after = time.monotonic() - stopped
+        tts.wait_until_done(orchestrator.speech_timeout)
+    finally:
+        tts.stop()
+
+    return {
+        "reply_cancelled_ms": round(cancelled_after * 1000, 1),
+        "sentences_queued": sum(at < stopped for at in queued),
+        "phrases_queued_after_stop": sum(at >= stopped for at in queued),  # Only the stop acknowledgement
+        "sentences_total": sentences
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the turn orchestrator against fake components")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--stop", action="store_true", help="Measure stopping a streamed reply instead")
+    args = parser.parse_args()
+    print(json.dumps(simulate_stop() if args.stop else simulate(args.turns), indent=2))
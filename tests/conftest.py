@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# Config is validated on import; the tests need neither an LLM nor a Picovoice key
+os.environ.setdefault("MODEL_NAME", "test-model")
+os.environ.setdefault("WAKE_WORD_ENGINE", "stub")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
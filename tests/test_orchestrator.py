@@ -0,0 +1,102 @@
+import time
+import pytest
+from audio_processing.tts_events import INTERRUPTED
+from audio_processing.wake_word import ACKNOWLEDGEMENTS
+from orchestrator import TurnOrchestrator
+from orchestrator_benchmark import (
+    FakeLLM, FakeMemoryManager, FakeRecorder, FakeTranscriber, FakeWakeWord, _tts_worker
+)
+
+
+class StartRecorder(FakeRecorder):
+    """Remembers where each recording was asked to start."""
+
+    def __init__(self, seconds: float = 0.1):
+        super().__init__(seconds)
+        self.starts = []
+
+    def record_audio(self, start=None, on_audio=None, playing=None):
+        self.starts.append(start)
+        return super().record_audio(start, on_audio, playing)
+
+
+@pytest.fixture
+def tts(tmp_path, monkeypatch):
+    # The phrase cache is written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    worker = _tts_worker()
+    yield worker
+    worker.stop()
+
+
+def make_orchestrator(tts, llm=None, recorder=None, wake_word=None) -> TurnOrchestrator:
+    orchestrator = TurnOrchestrator(
+        wake_word or FakeWakeWord([]),
+        recorder or StartRecorder(),
+        FakeTranscriber(seconds=0.0),
+        llm or FakeLLM(seconds=0.05),
+        tts,
+        FakeMemoryManager([]),
+        streaming=False,
+        stream_responses=True,
+        speech_timeout=10.0
+    )
+    assert orchestrator.start()
+    return orchestrator
+
+
+def test_wake_phrase_records_from_where_it_was_detected(tts):
+    wake_word = FakeWakeWord(["start_listening"])
+    wake_word.detected_at = 4242
+    recorder = StartRecorder()
+    orchestrator = make_orchestrator(tts, recorder=recorder, wake_word=wake_word)
+
+    assert orchestrator.handle(wake_word.listen_for_wake_phrase())
+    assert orchestrator.wait_for_reply(timeout=5)
+
+    assert recorder.starts == [4242]
+
+
+def record_phrases(tts, monkeypatch):
+    """(time, phrase) of everything queued to the TTS worker from now on."""
+    queued = []
+    speak = tts.speak
+    monkeypatch.setattr(tts, "speak", lambda phrase, cache=False: (queued.append((time.monotonic(), phrase)), speak(phrase, cache=cache)))
+    return queued
+
+
+def test_stop_cancels_the_reply_being_generated(tts, monkeypatch):
+    llm = FakeLLM(reply="This sentence is part of a long answer.", seconds=0.3, sentences=10)
+    orchestrator = make_orchestrator(tts, llm=llm)
+    queued = record_phrases(tts, monkeypatch)
+
+    orchestrator.handle("start_listening")
+    time.sleep(1.0)
+    assert orchestrator.generating
+
+    stopped = time.monotonic()
+    orchestrator.handle("stop_speaking")
+    assert orchestrator.wait_for_reply(timeout=1.0)
+    assert time.monotonic() - stopped < 0.5
+
+    assert not orchestrator.generating
+    replies = [phrase for at, phrase in queued if at < stopped and phrase == llm.reply]
+    assert 0 < len(replies) < 10
+    # Nothing of the reply is queued after the stop, only its acknowledgement
+    assert [phrase for at, phrase in queued if at >= stopped] == [ACKNOWLEDGEMENTS["stop_speaking"]]
+
+
+def test_wake_phrase_silences_the_reply_still_playing(tts):
+    # Generated at once, but about 12 s long with the tone engine
+    orchestrator = make_orchestrator(tts, llm=FakeLLM(reply="A very long answer. " * 10, seconds=0.0))
+    orchestrator.handle("start_listening")
+    assert orchestrator.wait_for_reply(timeout=5)
+    assert tts.events.wait_until_speaking(timeout=5)
+
+    interrupted_after = time.monotonic()
+    orchestrator.handle("start_listening")
+
+    deadline = time.monotonic() + 2.0
+    while not any(event.kind == INTERRUPTED and event.time >= interrupted_after for event in tts.events.history):
+        assert time.monotonic() < deadline, "the playing reply was not interrupted"
+        time.sleep(0.02)
@@ -0,0 +1,51 @@
+from typing import List, Optional
+import numpy as np
+from wav_fixtures import RATE, noise, voiced, write_fixture
+from nlp.streaming_transcriber import replay
+from nlp.transcription import TranscriptionBackend
+from nlp.types import TimedWord
+
+# Each "word" of the fixture is a tone burst at its own pitch
+WORDS = {200: "turn", 300: "on", 400: "the", 500: "kitchen", 600: "lights"}
+BLOCK = RATE // 100  # 10 ms
+
+
+class PitchTranscriber(TranscriptionBackend):
+    """Hears a word in every complete tone burst of the window, named after its pitch."""
+
+    def __init__(self):
+        self.windows: List[float] = []
+
+    def transcribe_words(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> List[TimedWord]:
+        self.windows.append(audio.size / RATE)
+        blocks = audio[:audio.size - audio.size % BLOCK].reshape(-1, BLOCK)
+        loud = np.sqrt(np.mean(blocks ** 2, axis=1)) > 0.05
+        words = []
+        start = None
+        for index, is_loud in enumerate(loud):
+            if is_loud and start is None:
+                start = index
+            elif not is_loud and start is not None:
+                burst = audio[start * BLOCK:index * BLOCK]
+                pitch = np.fft.rfftfreq(burst.size, 1 / RATE)[np.argmax(np.abs(np.fft.rfft(burst)))]
+                words.append((WORDS[int(round(pitch / 100.0)) * 100], start / 100.0, index / 100.0))
+                start = None
+        # A burst still going at the end of the window is an unfinished word
+        return words
+
+
+def test_replay_streams_the_utterance(tmp_path):
+    parts = [noise(0.5)]
+    for pitch in WORDS:
+        parts += [voiced(0.35, pitch=pitch), noise(0.1)]
+    path = write_fixture(tmp_path / "command.wav", parts + [noise(1.2)])
+    transcriber = PitchTranscriber()
+
+    report = replay(transcriber, path)
+
+    assert report["text"] == "turn on the kitchen lights"
+    # Partial hypotheses while speaking, then the final text
+    assert report["partial_updates"] >= 2
+    # Committed words were dropped from the window, so the final decode (the one
+    # before the batch comparison) only covered the unfinished tail
+    assert transcriber.windows[-2] < report["utterance_seconds"] - 0.5
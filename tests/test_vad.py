@@ -0,0 +1,36 @@
+import json
+from wav_fixtures import noise, voiced, write_fixture
+from audio_processing.vad import evaluate_wav, SPEECH_END, NO_SPEECH
+
+
+def test_endpoint_after_speech(tmp_path):
+    path = write_fixture(tmp_path / "utterance.wav", [noise(0.6), voiced(1.2), noise(1.5)])
+    (tmp_path / "utterance.json").write_text(json.dumps({"speech": [[0.6, 1.8]]}))
+
+    report = evaluate_wav(path, min_hangover=0.35, max_hangover=0.9)
+
+    assert report["event"] == SPEECH_END
+    assert abs(report["speech_start"] - 0.6) < 0.1
+    assert abs(report["speech_end"] - 1.8) < 0.1
+    # Stopped once the hangover for 1.2 s of speech had passed, not at the end of the file
+    assert 0.35 <= report["endpoint_latency"] <= 0.9 + 0.1
+    assert report["frame_accuracy"] > 0.9
+
+
+def test_short_command_ends_sooner_than_long_sentence(tmp_path):
+    short = evaluate_wav(write_fixture(tmp_path / "short.wav", [noise(0.6), voiced(0.3), noise(1.5)]))
+    long = evaluate_wav(write_fixture(tmp_path / "long.wav", [noise(0.6), voiced(3.0), noise(1.5)]))
+
+    short_wait = short["decided_at"] - short["speech_end"]
+    long_wait = long["decided_at"] - long["speech_end"]
+    assert short_wait < long_wait
+
+
+def test_no_speech_times_out(tmp_path):
+    path = write_fixture(tmp_path / "silence.wav", [noise(3.0)])
+
+    report = evaluate_wav(path, no_speech_timeout=1.0)
+
+    assert report["event"] == NO_SPEECH
+    assert report["speech_start"] is None
+    assert abs(report["decided_at"] - 1.0) < 0.05
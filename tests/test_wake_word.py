@@ -0,0 +1,85 @@
+import json
+import numpy as np
+from wav_fixtures import RATE, noise, voiced, write_fixture
+from audio_processing.capture import AudioCaptureService, FileInput
+from audio_processing.keyword_detector import StubDetector, replay
+from audio_processing.recorder import AudioRecorder
+from audio_processing.wake_word import WakeWordDetector
+
+FRAME = 512
+
+
+def click() -> np.ndarray:
+    """One detector frame loud enough for the stub detector to take it for the wake phrase."""
+    return np.random.default_rng(2).uniform(-0.5, 0.5, FRAME).astype(np.float32)
+
+
+def frames(count: int) -> float:
+    return count * FRAME / RATE
+
+
+def start_capture(path: str) -> AudioCaptureService:
+    capture = AudioCaptureService(FileInput(path, RATE, FRAME), rate=RATE)
+    capture.start()
+    return capture
+
+
+def test_replay_reports_wake_phrase_hits(tmp_path):
+    path = write_fixture(tmp_path / "wake.wav", [noise(frames(16)), click(), noise(frames(40)), click(), noise(frames(16))])
+    (tmp_path / "wake.json").write_text(json.dumps({"keywords": [{"index": 0, "end": frames(17)}]}))
+
+    # The second click falls inside the refractory period, so it is not a second detection
+    report = replay(StubDetector(refractory=2.0), path)
+
+    assert report["hits"] == 1
+    assert report["misses"] == 0
+    assert report["false_accepts"] == 0
+    assert abs(report["mean_delay"]) < frames(1) + 1e-6
+
+
+def test_recording_starts_where_the_wake_phrase_ended(tmp_path):
+    # The user goes on speaking right after the wake phrase
+    path = write_fixture(tmp_path / "command.wav", [noise(frames(8)), click(), noise(0.4), voiced(1.0), noise(1.0)])
+    capture = start_capture(path)
+    try:
+        detector = WakeWordDetector(StubDetector(), capture)
+        assert detector.listen_for_wake_phrase() == "start_listening"
+        assert detector.detected_at == 9 * FRAME
+
+        # However late the recorder gets going, it reads from the wake phrase on
+        capture.thread.join(timeout=10)
+        audio = AudioRecorder(capture).record_audio(start=detector.detected_at)
+    finally:
+        capture.stop()
+
+    # The utterance (plus pre-roll), not the silence after the end of the input
+    assert 1.0 <= audio.size / RATE <= 1.0 + 0.3 + 0.15
+
+
+def dominant_pitch(audio: np.ndarray) -> float:
+    spectrum = np.abs(np.fft.rfft(audio))
+    return float(np.fft.rfftfreq(audio.size, 1 / RATE)[np.argmax(spectrum)])
+
+
+def test_audio_captured_while_speaking_is_skipped(tmp_path):
+    echo_start = 9 * FRAME + int(0.3 * RATE)
+    echo_end = echo_start + int(0.6 * RATE)
+    path = write_fixture(
+        tmp_path / "echo.wav",
+        [noise(frames(8)), click(), noise(0.3), voiced(0.6, pitch=220.0), noise(0.6), voiced(1.0, pitch=140.0), noise(1.0)]
+    )
+    capture = start_capture(path)
+    try:
+        detector = WakeWordDetector(StubDetector(), capture)
+        assert detector.listen_for_wake_phrase() == "start_listening"
+        capture.thread.join(timeout=10)
+
+        # The acknowledgement (at 220 Hz) was playing while these samples were captured
+        playing = lambda at: capture.time_at(echo_start) <= at < capture.time_at(echo_end)
+        audio = AudioRecorder(capture).record_audio(start=detector.detected_at, playing=playing)
+    finally:
+        capture.stop()
+
+    # The user's utterance, not the echo of the acknowledgement
+    assert abs(dominant_pitch(audio) - 140.0) < 5.0
+    assert 1.0 <= audio.size / RATE <= 1.0 + 0.3 + 0.15
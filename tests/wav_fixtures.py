@@ -0,0 +1,27 @@
+"""Synthetic WAV fixtures for the replay harnesses, written to a test's tmp_path."""
+from pathlib import Path
+from typing import List
+import numpy as np
+from audio_processing.audio_utils import dump_wav
+
+RATE = 16000
+
+
+def noise(seconds: float, level: float = 0.003, seed: int = 0) -> np.ndarray:
+    """Quiet background hiss."""
+    return np.random.default_rng(seed).normal(0.0, level, int(round(seconds * RATE))).astype(np.float32)
+
+
+def voiced(seconds: float, pitch: float = 140.0, level: float = 0.2) -> np.ndarray:
+    """A stand-in for voiced speech: a harmonic tone, which the VAD takes for speech."""
+    t = np.arange(int(round(seconds * RATE))) / RATE
+    tone = sum(np.sin(2 * np.pi * pitch * harmonic * t) / harmonic for harmonic in range(1, 6))
+    return (level * tone / np.max(np.abs(tone))).astype(np.float32)
+
+
+def write_fixture(path: Path, parts: List[np.ndarray]) -> str:
+    """Write the parts back to back, over background hiss, as a 16 kHz WAV file."""
+    audio = np.concatenate(parts)
+    audio = audio + noise(audio.size / RATE, seed=1)
+    dump_wav(str(path), audio, RATE)
+    return str(path)
@@ -1,19 +1,57 @@
 from importlib import import_module
 from pathlib import Path
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Optional, Sequence
 from utils.log import print_log
 from config import *  # Import all config here
-from nlp.types import ToolFunc
+from nlp.types import ToolFunc, ToolError
+from utils.cache import TTLCache, cached
+from utils.tool_manifest import load_manifest, make_lazy_tool
 
 _tools: Dict[str, ToolFunc] = {}
+_tool_options: Dict[str, Dict[str, Any]] = {}
+_tool_cache = TTLCache(
+    max_entries=Config.TOOL_CACHE_MAX_ENTRIES,
+    max_bytes=Config.TOOL_CACHE_MAX_BYTES
+)
 
-def register_tool(func: ToolFunc) -> ToolFunc:
+def register_tool(
+    func: Optional[ToolFunc] = None,
+    *,
+    timeout: Optional[float] = None,
+    ttl: Optional[float] = None,
+    normalize: Sequence[str] = ()
+):
     """
     Register a tool function.
     The function must return a string and can take any parameters.
+
+    Can be used bare (`@register_tool`) or with options:
+        timeout: Seconds the tool may run before its call is abandoned
+                 (defaults to Config.TOOL_TIMEOUT).
+        ttl: Cache results for this many seconds. Identical calls are served from
+             the cache and concurrent ones share a single request, waited on at
+             most `timeout` seconds. Results returned as `ToolError` are not cached.
+        normalize: Names of the string arguments whose case and extra whitespace
+                   don't matter to the tool, so calls differing only in those
+                   share a cache entry (e.g. a city name).
     """
-    _tools[func.__name__] = func
-    return func
+    def decorator(func: ToolFunc) -> ToolFunc:
+        tool_func = func
+        if ttl:
+            tool_func = cached(
+                _tool_cache,
+                ttl,
+                lambda result: not isinstance(result, ToolError),
+                normalize=normalize,
+                wait_timeout=timeout or Config.TOOL_TIMEOUT
+            )(func)
+        _tools[func.__name__] = tool_func
+        _tool_options[func.__name__] = {"timeout": timeout, "ttl": ttl, "normalize": tuple(normalize)}
+        return func
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 def get_all_tools() -> Dict[str, ToolFunc]:
     """
@@ -23,6 +61,14 @@ def get_all_tools() -> Dict[str, ToolFunc]:
     """
     return _tools.copy()
 
+def get_tool_options(name: str) -> Dict[str, Any]:
+    """Get the options a tool was registered with."""
+    return _tool_options.get(name, {}).copy()
+
+def get_tool_cache_stats() -> Dict[str, int]:
+    """Get the hit/miss counters and size of the tool result cache."""
+    return _tool_cache.stats()
+
 def auto_discover_tools() -> None:
     """Automatically discover and import all tools in the tools directory."""
     tools_dir = Path(__file__).parent
@@ -35,5 +81,41 @@ def auto_discover_tools() -> None:
             except ImportError as e:
                 print_log(f"Failed to import tool module {module_name}: {e}", "red")
 
+def _load_tool(name: str, module_name: str) -> ToolFunc:
+    """Import the module of a lazily discovered tool and return the real function."""
+    func = _tools.get(name)
+    if func is None or getattr(func, "__lazy_tool__", False):
+        print_log(f"Importing tool module on first use: {module_name}", "yellow")
+        import_module(module_name)
+        func = _tools[name]
+    return func
+
+def lazy_discover_tools() -> None:
+    """
+    Register every tool in the tools directory from a cached manifest, without
+    importing the modules. The manifest is rebuilt by static inspection of a
+    module whenever its mtime changes, and a module is only imported the first
+    time one of its tools is called.
+    """
+    tools_dir = Path(__file__).parent
+    manifest = load_manifest(tools_dir, tools_dir / Config.TOOL_MANIFEST_FILE)
+    for stem, module in manifest.items():
+        module_name = f"tools.{stem}"
+        for entry in module["tools"]:
+            try:
+                _tools[entry["name"]] = make_lazy_tool(module_name, entry, _load_tool)
+                _tool_options[entry["name"]] = {"timeout": None, "ttl": None, "normalize": (), **entry["options"]}
+            except Exception as e:
+                # Signatures the manifest can't describe (e.g. non-literal defaults) are imported right away
+                print_log(f"Can't load {entry['name']} lazily ({e}), importing {module_name}", "red")
+                try:
+                    import_module(module_name)
+                except ImportError as e:
+                    print_log(f"Failed to import tool module {module_name}: {e}", "red")
+        print_log(f"Discovered tool module from manifest: {module_name}", "yellow")
+
 # Automatically discover tools when the package is imported
-auto_discover_tools()
+if Config.LAZY_TOOL_DISCOVERY:
+    lazy_discover_tools()
+else:
+    auto_discover_tools()
@@ -1,6 +1,7 @@
 from tools import register_tool
 import requests
 from config import Config
+from nlp.types import ToolError
 
 SETUP_INSTRUCTIONS = """
 1. Visit https://brave.com/search/api/
@@ -10,7 +11,7 @@ SETUP_INSTRUCTIONS = """
 """
 
 def _get_setup_message(reason: str) -> str:
-    return (
+    return ToolError(
         "IMPORTANT: Do not provide information from your knowledge base. "
         f"I cannot search the web because {reason}. "
         "You must respond to the user with this message:\n\n"
@@ -21,7 +22,7 @@ def _get_setup_message(reason: str) -> str:
         "Once you've completed these steps, I'll be able to search the web and provide you with accurate, up-to-date information."
     )
 
-@register_tool
+@register_tool(timeout=15, ttl=1800)
 def brave_search(query: str) -> str:
     """
     Search the web using Brave Search API and return relevant results with URLs.
@@ -75,4 +76,4 @@ def brave_search(query: str) -> str:
     except requests.exceptions.RequestException as e:
         if "401" in str(e):
             return _get_setup_message("the Brave Search API token is invalid")
-        return f"Error performing search: {str(e)}"
+        return ToolError(f"Error performing search: {str(e)}")
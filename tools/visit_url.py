@@ -1,14 +1,8 @@
 from tools import register_tool
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-import os
-from config import Config
+from utils.browser_pool import get_browser_pool
 
-@register_tool
+@register_tool(timeout=45)
 def visit_url(url: str, wait_for_js: bool = True) -> str:
     """
     Visit a URL using a headless Chrome browser and return the page content.
@@ -22,26 +16,14 @@ def visit_url(url: str, wait_for_js: bool = True) -> str:
         Page content as text, or error message
     """
     try:
-        # Set up Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Run in headless mode
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        
-        # Initialize the browser
-        driver = webdriver.Chrome(options=chrome_options)
-        
-        try:
-            # Set page load timeout
-            driver.set_page_load_timeout(30)
-            
+        # Browsers are kept warm between calls instead of being started for every visit
+        with get_browser_pool().session() as session:
+            driver = session.driver
+
             # Load the page
-            driver.get(url)
+            session.visit(url)
             
             if wait_for_js:
-                # Wait for JavaScript to execute
-                time.sleep(2)  # Basic wait for JS
                 # Wait for document ready state
                 WebDriverWait(driver, 10).until(
                     lambda d: d.execute_script("return document.readyState") == "complete"
@@ -57,8 +39,5 @@ def visit_url(url: str, wait_for_js: bool = True) -> str:
             
             return f"Successfully visited {url}. Content preview:\n\n{content}"
             
-        finally:
-            driver.quit()
-            
     except Exception as e:
         return f"Error visiting URL: {str(e)}"
@@ -3,10 +3,11 @@ from typing import Optional
 import requests
 from . import register_tool
 from config import Config
+from nlp.types import ToolError
 
 logger = logging.getLogger(__name__)
 
-@register_tool
+@register_tool(timeout=15, ttl=600, normalize=("city",))
 def get_weather(city: Optional[str] = None) -> str:
     """
     Get the current weather for a specific city using OpenWeatherMap API.
@@ -23,13 +24,13 @@ def get_weather(city: Optional[str] = None) -> str:
         Weather information or error message
     """
     if not Config.OPENWEATHERMAP_API_KEY:
-        return "Weather API is not configured"
+        return ToolError("Weather API is not configured")
 
     target_city = (city if city and city.lower() not in ["current", "current city", "my city"]
                   else Config.OPENWEATHERMAP_DEFAULT_CITY)
     
     if not target_city:
-        return "No city specified and no default city configured"
+        return ToolError("No city specified and no default city configured")
 
     try:
         response = requests.get(
@@ -53,4 +54,4 @@ def get_weather(city: Optional[str] = None) -> str:
 
     except requests.RequestException as e:
         logger.error(f"Weather API request failed: {e}")
-        return f"Error getting weather: {str(e)}"
+        return ToolError(f"Error getting weather: {str(e)}")
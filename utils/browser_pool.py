@@ -0,0 +1,260 @@
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Iterator, Set
+from urllib.parse import urlsplit
+import psutil
+from config import Config
+from utils.log import print_log
+
+
+def _origin(url: str) -> Optional[str]:
+    """scheme://host[:port] of a web URL, None for about:blank, data: and the like."""
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _frame_origins(frame_tree: Dict[str, Any]) -> Iterable[str]:
+    """Security origins of a CDP Page.getFrameTree result, child frames included."""
+    yield frame_tree["frame"].get("securityOrigin", "")
+    for child in frame_tree.get("childFrames", []):
+        yield from _frame_origins(child)
+
+
+class BrowserSession:
+    """A long-lived headless Chrome driver plus the bookkeeping used to recycle it."""
+
+    def __init__(self, driver: Any):  # selenium.webdriver.Chrome
+        self.driver = driver
+        self.pages_loaded = 0
+        self.baseline_memory: Optional[int] = None
+        self.origins: Set[str] = set()  # Origins that may have stored data since the last reset
+
+    def memory_usage(self) -> Optional[int]:
+        """
+        Resident memory of chromedriver and every Chrome process under it, in bytes.
+        (performance.memory would only cover the current page, about:blank after a reset.)
+        """
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except (AttributeError, psutil.Error):
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass  # Exited in the meantime
+        return total
+
+    def is_healthy(self) -> bool:
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def visit(self, url: str) -> None:
+        """Load `url`, remembering the origins it touched for reset()."""
+        self._remember(url)
+        try:
+            self.driver.get(url)
+        finally:
+            self._remember(self.driver.current_url)  # Where redirects ended up
+
+    def _remember(self, *urls: str) -> None:
+        for url in urls:
+            origin = _origin(url)
+            if origin:
+                self.origins.add(origin)
+
+    def reset(self) -> None:
+        """Drop cookies and storage left by the last page so pages can't see each other's state."""
+        # Third-party frames store data under their own origin, collect them before leaving the page
+        self._remember(*_frame_origins(self.driver.execute_cdp_cmd("Page.getFrameTree", {})["frameTree"]))
+        self.driver.get("about:blank")
+        # Through CDP: delete_all_cookies() and localStorage only reach the current
+        # document's origin. Storage can only be cleared one origin at a time
+        self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in sorted(self.origins):
+            self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        self.origins.clear()
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print_log(f"Error closing browser session: {e}", "red")
+
+
+class BrowserPool:
+    """
+    Bounded pool of warm headless Chrome sessions shared by every `visit_url` call.
+
+    Sessions are created on demand up to `max_size`, health-checked before being
+    handed out, cleaned between pages and replaced after `max_pages` page loads or
+    once the browser's processes have grown by more than `max_memory_growth` bytes.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2,
+        max_pages: int = 50,
+        max_memory_growth: int = 300 * 1024 * 1024,
+        page_load_timeout: int = 30
+    ):
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.max_memory_growth = max_memory_growth
+        self.page_load_timeout = page_load_timeout
+        self.idle: List[BrowserSession] = []
+        self.size = 0
+        self.warming = 0  # Sessions being started by warm_up(), about to be idle
+        self.closed = False
+        self.condition = threading.Condition()
+        atexit.register(self.close)
+
+    def _create_session(self) -> BrowserSession:
+        # Imported here so loading the pool (and the app) doesn't load Selenium
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")  # Run in headless mode
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+
+        print_log("Starting headless browser session", "yellow")
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        session = BrowserSession(driver)
+        session.baseline_memory = session.memory_usage()
+        return session
+
+    def warm_up(self, count: int = 1) -> threading.Thread:
+        """Start `count` sessions on a background thread so the first call doesn't wait for Chrome."""
+        def run():
+            for _ in range(count):
+                with self.condition:
+                    if self.closed or self.size >= self.max_size:
+                        break
+                    self.size += 1
+                    self.warming += 1
+                try:
+                    session = self._create_session()
+                except Exception as e:
+                    print_log(f"Browser warm-up failed: {e}", "red")
+                    with self.condition:
+                        self.size -= 1
+                        self.warming -= 1
+                        self.condition.notify_all()
+                    continue
+                with self.condition:
+                    self.warming -= 1
+                self._release(session, recycle=False)
+
+        thread = threading.Thread(target=run, name="BrowserPoolWarmUp", daemon=True)
+        thread.start()
+        return thread
+
+    def _acquire(self, timeout: Optional[float]) -> BrowserSession:
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self.idle:
+                    session = self.idle.pop()
+                    break
+                # A browser being warmed up is ready sooner than a new one would be
+                if self.size < self.max_size and not self.warming:
+                    self.size += 1
+                    session = None
+                    break
+                if not self.condition.wait(timeout):
+                    raise TimeoutError("No browser session became available")
+
+        if session is None:
+            try:
+                return self._create_session()
+            except Exception:
+                with self.condition:
+                    self.size -= 1
+                    self.condition.notify()
+                raise
+
+        if not session.is_healthy():
+            print_log("Browser session failed its health check, replacing it", "orange")
+            session.quit()
+            try:
+                return self._create_session()
+            except Exception:
+                with self.condition:
+                    self.size -= 1
+                    self.condition.notify()
+                raise
+        return session
+
+    def _needs_recycling(self, session: BrowserSession) -> bool:
+        if session.pages_loaded >= self.max_pages:
+            return True
+        memory = session.memory_usage()
+        if memory is not None and session.baseline_memory is not None:
+            return memory - session.baseline_memory > self.max_memory_growth
+        return False
+
+    def _release(self, session: BrowserSession, recycle: bool = True) -> None:
+        discard = self.closed
+        if not discard and recycle:
+            try:
+                session.reset()
+                discard = self._needs_recycling(session)
+            except Exception as e:
+                print_log(f"Browser session cleanup failed: {e}", "red")
+                discard = True
+
+        if discard:
+            print_log(f"Recycling browser session after {session.pages_loaded} pages", "yellow")
+            session.quit()
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            return
+
+        with self.condition:
+            self.idle.append(session)
+            self.condition.notify_all()
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = 60) -> Iterator[BrowserSession]:
+        """Borrow a session for one page visit."""
+        session = self._acquire(timeout)
+        try:
+            yield session
+        finally:
+            session.pages_loaded += 1
+            self._release(session)
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            sessions, self.idle = self.idle, []
+            self.size -= len(sessions)
+            self.condition.notify_all()
+        for session in sessions:
+            session.quit()
+
+
+_shared_pool: Optional[BrowserPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """The pool shared by the browsing tools, created on first use."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = BrowserPool(max_size=Config.BROWSER_POOL_SIZE, max_pages=Config.BROWSER_MAX_PAGES)
+        return _shared_pool
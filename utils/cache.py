@@ -0,0 +1,187 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from inspect import signature
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    size: int
+
+
+class _InFlight:
+    """A call currently being computed, which identical callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+    Thread-safe result cache with per-entry TTL and LRU eviction bounded by both
+    entry count and total size in bytes.
+
+    `get_or_compute` de-duplicates concurrent calls with the same key, so only one
+    computation is in flight per key and the other callers share its result. They
+    wait for it at most `wait_timeout` seconds, then raise TimeoutError.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 2 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.in_flight: Dict[Hashable, _InFlight] = {}
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(key: Hashable, value: Any) -> int:
+        return len(str(key).encode("utf-8")) + len(str(value).encode("utf-8"))
+
+    def _get_locked(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires_at <= time.monotonic():
+            self._remove_locked(key)
+            return False, None
+        self.entries.move_to_end(key)
+        return True, entry.value
+
+    def _remove_locked(self, key: Hashable) -> None:
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry.size
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) for a live entry."""
+        with self.lock:
+            return self._get_locked(key)
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        size = self._sizeof(key, value)
+        with self.lock:
+            if key in self.entries:
+                self._remove_locked(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = CacheEntry(value, time.monotonic() + ttl, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove_locked(oldest)
+                self.evictions += 1
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        ttl: float,
+        should_cache: Callable[[Any], bool] = lambda value: True,
+        wait_timeout: Optional[float] = None
+    ) -> Any:
+        with self.lock:
+            found, value = self._get_locked(key)
+            if found:
+                self.hits += 1
+                return value
+            flight = self.in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self.in_flight[key] = _InFlight()
+                leader = True
+
+        if not leader:
+            if not flight.done.wait(wait_timeout):
+                raise TimeoutError(f"Identical call still running after {wait_timeout}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            if should_cache(flight.value):
+                self.set(key, flight.value, ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            flight.done.set()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes
+            }
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cached(
+    cache: TTLCache,
+    ttl: float,
+    should_cache: Callable[[Any], bool] = lambda value: True,
+    normalize: Iterable[str] = (),
+    wait_timeout: Optional[float] = None
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorate a function so its results are cached in `cache` for `ttl` seconds.
+    Keys are built from the function name and its bound arguments, so `f("Paris")`,
+    `f(city="Paris")` and `f()` with a default of "Paris" share an entry. The
+    arguments named in `normalize` are compared case-insensitively and with
+    whitespace collapsed (`f(city=" paris ")` then shares that entry too), every
+    other argument must match exactly.
+    """
+    normalize = frozenset(normalize)
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        func_signature = signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = func_signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: _normalize(value) if name in normalize else value
+                for name, value in bound.arguments.items()
+            }
+            key = (func.__name__, json.dumps(arguments, sort_keys=True, default=str))
+            return cache.get_or_compute(key, lambda: func(*args, **kwargs), ttl, should_cache, wait_timeout)
+
+        return wrapper
+    return decorator
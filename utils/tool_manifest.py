@@ -0,0 +1,165 @@
+import ast
+import json
+import typing
+from inspect import Parameter, Signature
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from utils.log import print_log
+
+MANIFEST_VERSION = 1
+
+# Names available when evaluating annotation source from the manifest
+_ANNOTATION_NAMESPACE = {**vars(typing), "__builtins__": __builtins__}
+
+
+def _is_register_decorator(node: ast.expr) -> bool:
+    target = node.func if isinstance(node, ast.Call) else node
+    if isinstance(target, ast.Name):
+        return target.id == "register_tool"
+    if isinstance(target, ast.Attribute):
+        return target.attr == "register_tool"
+    return False
+
+
+def _decorator_options(node: ast.expr) -> Dict[str, Any]:
+    if not isinstance(node, ast.Call):
+        return {}
+    options = {}
+    for keyword in node.keywords:
+        try:
+            options[keyword.arg] = ast.literal_eval(keyword.value)
+        except ValueError:
+            print_log(f"Tool option {keyword.arg} is not a literal, ignoring it in the manifest", "red")
+    return options
+
+
+def _source(node: Optional[ast.expr]) -> Optional[str]:
+    return ast.unparse(node) if node is not None else None
+
+
+def scan_tool_module(path: Path) -> List[Dict[str, Any]]:
+    """Find the functions registered with `@register_tool` in a module without importing it."""
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    entries = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        decorators = [d for d in node.decorator_list if _is_register_decorator(d)]
+        if not decorators:
+            continue
+
+        args = node.args
+        positional = args.posonlyargs + args.args
+        defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+        params = [
+            {
+                "name": arg.arg,
+                "kind": "positional_or_keyword",
+                "annotation": _source(arg.annotation),
+                "default": _source(default)
+            }
+            for arg, default in zip(positional, defaults)
+        ]
+        params += [
+            {
+                "name": arg.arg,
+                "kind": "keyword_only",
+                "annotation": _source(arg.annotation),
+                "default": _source(default)
+            }
+            for arg, default in zip(args.kwonlyargs, args.kw_defaults)
+        ]
+
+        entries.append({
+            "name": node.name,
+            "doc": ast.get_docstring(node, clean=False),
+            "params": params,
+            "returns": _source(node.returns),
+            "options": _decorator_options(decorators[0])
+        })
+    return entries
+
+
+def load_manifest(tools_dir: Path, manifest_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the manifest of every tool module in `tools_dir`, keyed by module stem.
+    Modules are re-scanned only when their mtime or size changed since the cached
+    manifest was written.
+    """
+    cached: Dict[str, Any] = {}
+    if manifest_path.exists():
+        try:
+            cached = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except ValueError:
+            cached = {}
+    if cached.get("version") != MANIFEST_VERSION:
+        cached = {}
+    cached_modules = cached.get("modules", {})
+
+    modules = {}
+    changed = False
+    for file in sorted(tools_dir.glob("*.py")):
+        if file.stem == "__init__":
+            continue
+        stat = file.stat()
+        entry = cached_modules.get(file.stem)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            modules[file.stem] = entry
+            continue
+        try:
+            tools = scan_tool_module(file)
+        except SyntaxError as e:
+            print_log(f"Failed to scan tool module {file.name}: {e}", "red")
+            continue
+        modules[file.stem] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "tools": tools}
+        changed = True
+
+    if changed or set(modules) != set(cached_modules):
+        try:
+            manifest_path.write_text(json.dumps({"version": MANIFEST_VERSION, "modules": modules}, indent=2), encoding="utf-8")
+        except OSError as e:
+            print_log(f"Could not write tool manifest: {e}", "red")
+    return modules
+
+
+def _evaluate_annotation(source: Optional[str]) -> Any:
+    if source is None:
+        return Parameter.empty
+    try:
+        return eval(source, _ANNOTATION_NAMESPACE)
+    except Exception:
+        return Any
+
+
+def make_lazy_tool(module_name: str, entry: Dict[str, Any], loader: Callable[[str, str], Callable[..., str]]) -> Callable[..., str]:
+    """
+    Build a stand-in for a tool function from its manifest entry. It exposes the
+    real name, docstring and signature, and only imports the module on first call.
+    """
+    name = entry["name"]
+
+    def lazy_tool(*args, **kwargs):
+        return loader(name, module_name)(*args, **kwargs)
+
+    parameters = []
+    annotations = {}
+    for param in entry["params"]:
+        annotation = _evaluate_annotation(param["annotation"])
+        default = ast.literal_eval(param["default"]) if param["default"] is not None else Parameter.empty
+        kind = Parameter.KEYWORD_ONLY if param["kind"] == "keyword_only" else Parameter.POSITIONAL_OR_KEYWORD
+        parameters.append(Parameter(param["name"], kind, default=default, annotation=annotation))
+        if annotation is not Parameter.empty:
+            annotations[param["name"]] = annotation
+
+    return_annotation = _evaluate_annotation(entry["returns"])
+    if return_annotation is not Parameter.empty:
+        annotations["return"] = return_annotation
+
+    lazy_tool.__name__ = name
+    lazy_tool.__qualname__ = name
+    lazy_tool.__module__ = module_name
+    lazy_tool.__doc__ = entry["doc"]
+    lazy_tool.__signature__ = Signature(parameters, return_annotation=return_annotation)
+    lazy_tool.__annotations__ = annotations
+    lazy_tool.__lazy_tool__ = True
+    return lazy_tool